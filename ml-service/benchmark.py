@@ -0,0 +1,555 @@
+"""
+Serving Benchmark Suite
+
+Measures how fast the prediction service serves a fixed, production-size
+model, so that changes to main.py, the inference engine or the
+train_model_v2 hyperparameters can be compared across commits:
+- latency percentiles (p50/p95/p99) and requests per second for /predict
+  at several concurrency levels, through an in-process ASGI client
+- the same for /predict/batch at several batch sizes, plus rows per second
+- cold start (import, artifact load, first prediction) in a fresh process
+- per-worker memory (RSS, PSS and private bytes) after load and after traffic
+- optionally, /predict throughput of the pre-forked server (main.py
+  --workers N) pinned to N cores, for several N
+
+The model is trained on synthetic data with train_model_v2.build_model, so
+it has the production hyperparameters. It is cached on disk keyed by the
+data size, seed and hyperparameters, and only retrained when one changes.
+Every request carries distinct inputs, so the prediction cache never answers.
+
+Usage:
+    python benchmark.py --output bench.json
+    python benchmark.py --rows 200000 --concurrency 1 8 32 --baseline bench.json --output bench_new.json
+    python benchmark.py --workers 1 4 8 --output bench_scaling.json
+
+Requires httpx (already needed by FastAPI's TestClient).
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import hashlib
+import argparse
+import platform
+import resource
+import signal
+import socket
+import subprocess
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+from forest_engine import FlatForest
+
+
+SERVICE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_ROOT = os.path.join(tempfile.gettempdir(), "crop-yield-benchmark")
+
+DEFAULT_ROWS = 100_000
+DEFAULT_REQUESTS = 2000
+DEFAULT_CONCURRENCY = (1, 8, 32)
+DEFAULT_BATCH_SIZES = (100, 1000)
+SCALING_LOAD_PROCESSES = 4
+SCALING_CONCURRENCY = 16
+BATCH_REQUESTS = 20
+WARMUP_REQUESTS = 50
+COLD_STARTS = 3
+SEED = 42
+
+# Synthetic vocabulary, sized like the national dataset
+N_STATES = 30
+N_DISTRICTS = 640
+CROPS = {
+    'rice': 2600, 'wheat': 3200, 'maize': 3000, 'cotton': 500, 'sugarcane': 70000,
+    'groundnut': 1400, 'soybean': 1100, 'bajra': 1300, 'jowar': 1000, 'potato': 22000,
+    'onion': 17000, 'tomato': 25000
+}
+SEASONS = ['kharif', 'rabi', 'zaid', 'annual']
+SOIL_TYPES = ['alluvial', 'black', 'red', 'laterite', 'loamy', 'clay', 'sandy']
+REGIONS = ['north-india', 'south-india', 'east-india', 'west-india', 'central-india']
+
+CATEGORICAL_FEATURES = ['state', 'district', 'crop', 'season', 'soil_type']
+NUMERICAL_FEATURES = ['rainfall', 'temperature', 'humidity', 'ndvi', 'soil_moisture', 'lst']
+
+
+# =============================================================================
+# SYNTHETIC MODEL
+# =============================================================================
+
+def synthetic_records(n: int, seed: int) -> pd.DataFrame:
+    """Random raw records in the API's request layout (without yield)."""
+    rng = np.random.default_rng(seed)
+    district = rng.integers(0, N_DISTRICTS, n)
+    return pd.DataFrame({
+        'state': [f"state {i}" for i in district % N_STATES],
+        'district': [f"district {i}" for i in district],
+        'crop': rng.choice(list(CROPS), n),
+        'season': rng.choice(SEASONS, n),
+        'soil_type': rng.choice(SOIL_TYPES, n),
+        'region': [REGIONS[i] for i in district % N_STATES % len(REGIONS)],
+        'rainfall': rng.gamma(4.0, 40.0, n),
+        'temperature': np.clip(rng.normal(27.0, 6.0, n), 0.0, 50.0),
+        'humidity': rng.uniform(20.0, 95.0, n),
+        'ndvi': rng.uniform(0.1, 0.9, n),
+        'soil_moisture': rng.uniform(5.0, 50.0, n),
+        'lst': np.clip(rng.normal(30.0, 5.0, n), 0.0, 55.0),
+    })
+
+
+def synthetic_yield(df: pd.DataFrame, seed: int) -> np.ndarray:
+    """Yield in kg/ha with crop, district and weather effects plus noise."""
+    rng = np.random.default_rng(seed + 1)
+    district_effect = np.random.default_rng(seed + 2).lognormal(0.0, 0.25, N_DISTRICTS)
+    district = df['district'].str.slice(len("district ")).astype(int).to_numpy()
+    rain_fit = np.exp(-((df['rainfall'].to_numpy() - 180.0) / 150.0) ** 2)
+    heat_stress = 1.0 - 0.02 * np.clip(df['temperature'].to_numpy() - 32.0, 0.0, None)
+    return (
+        df['crop'].map(CROPS).to_numpy(dtype=np.float64)
+        * district_effect[district]
+        * (0.5 + 0.5 * rain_fit)
+        * heat_stress
+        * (0.6 + 0.8 * df['ndvi'].to_numpy())
+        * rng.lognormal(0.0, 0.15, len(df))
+    )
+
+
+def prepare_model(rows: int, backend: str, seed: int, model_dir: Optional[str] = None) -> str:
+    """
+    Make sure a synthetic model for this configuration exists and return its directory.
+
+    Artifacts use the layout main.py serves from MODEL_DIR.
+    """
+    import train_model_v2
+
+    df = synthetic_records(rows, seed)
+    encoders = {col: LabelEncoder().fit(df[col]) for col in CATEGORICAL_FEATURES}
+    # Fitted on the named columns so the service maps the statistics by name
+    scaler = StandardScaler().fit(df[NUMERICAL_FEATURES])
+    X = pd.DataFrame({f"{col}_encoded": encoders[col].transform(df[col]) for col in CATEGORICAL_FEATURES})
+    scaled = scaler.transform(df[NUMERICAL_FEATURES])
+    for j, col in enumerate(NUMERICAL_FEATURES):
+        X[f"{col}_scaled"] = scaled[:, j]
+
+    model = train_model_v2.build_model(backend, X)
+    if 'verbose' in model.get_params():
+        model.set_params(verbose=0)
+
+    if model_dir is None:
+        config = json.dumps({"rows": rows, "seed": seed, "backend": backend,
+                             "params": {k: repr(v) for k, v in model.get_params().items()}}, sort_keys=True)
+        model_dir = os.path.join(CACHE_ROOT, hashlib.sha256(config.encode()).hexdigest()[:12])
+    metrics_path = os.path.join(model_dir, "metrics.json")
+    if os.path.exists(metrics_path):
+        print(f"  Reusing synthetic model in {model_dir}")
+        return model_dir
+
+    print(f"  Training synthetic {type(model).__name__} on {rows:,} rows...")
+    start = time.time()
+    model.fit(X, synthetic_yield(df, seed))
+    training_time = time.time() - start
+    print(f"  Trained in {training_time:.1f}s")
+
+    os.makedirs(model_dir, exist_ok=True)
+    joblib.dump(model, os.path.join(model_dir, "model.pkl"))
+    joblib.dump(encoders, os.path.join(model_dir, "encoders.pkl"))
+    joblib.dump(scaler, os.path.join(model_dir, "scaler.pkl"))
+    if isinstance(model, train_model_v2.RandomForestRegressor):
+        FlatForest.from_estimator(model).save(os.path.join(model_dir, "forest"))
+    # Written last: its presence marks a complete model directory
+    with open(metrics_path, 'w') as f:
+        json.dump({
+            "model_type": type(model).__name__,
+            "backend": backend,
+            "total_samples": rows,
+            "training_time_s": round(training_time, 2),
+            "r2_score": 0.0, "mae": 0.0, "rmse": 0.0
+        }, f, indent=2)
+    return model_dir
+
+
+def describe_model(model_dir: str) -> Dict:
+    """Model type, size on disk and (for forests) tree statistics."""
+    with open(os.path.join(model_dir, "metrics.json"), 'r') as f:
+        metrics = json.load(f)
+    artifact_bytes = sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(model_dir) for name in names
+    )
+    info = {
+        "model_dir": model_dir,
+        "model_type": metrics.get("model_type", "RandomForestRegressor"),
+        "training_rows": metrics.get("total_samples"),
+        "training_time_s": metrics.get("training_time_s"),
+        "artifacts_mb": round(artifact_bytes / 1024 ** 2, 1)
+    }
+    forest_dir = os.path.join(model_dir, "forest")
+    # Same rule as main.load_bundle: only forest models serve the exported arrays
+    if info["model_type"] == "RandomForestRegressor" and os.path.isdir(forest_dir):
+        forest = FlatForest.load(forest_dir)
+        info.update(n_estimators=forest.n_estimators, node_count=forest.node_count,
+                    max_depth=forest.max_depth, forest_mb=round(forest.nbytes / 1024 ** 2, 1))
+    return info
+
+
+# =============================================================================
+# MEMORY AND COLD START
+# =============================================================================
+
+def memory_usage() -> Dict[str, float]:
+    """
+    This process's memory in MB. PSS splits shared pages (e.g. a memory-mapped
+    forest) between the processes mapping them; private is what one more worker costs.
+    """
+    usage = {"peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)}
+    try:
+        with open("/proc/self/smaps_rollup", 'r') as f:
+            fields = {line.split(':')[0]: int(line.split()[1]) for line in f if line.split()[-1] == 'kB'}
+    except OSError:
+        return usage
+    usage.update(
+        rss_mb=round(fields.get("Rss", 0) / 1024, 1),
+        pss_mb=round(fields.get("Pss", 0) / 1024, 1),
+        private_mb=round((fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)) / 1024, 1)
+    )
+    return usage
+
+
+def cold_start_probe(rows: int = 1000):
+    """
+    Run in a fresh process (see measure_cold_start): time importing the
+    service, loading MODEL_DIR and the first prediction, then serve `rows`
+    predictions and report memory. Prints one JSON line.
+    """
+    start = time.perf_counter()
+    import main
+    imported = time.perf_counter()
+    main.load_model()
+    loaded = time.perf_counter()
+    main.predict_single(main.PredictionRequest(**main.SMOKE_REQUEST), main.bundle)
+    first = time.perf_counter()
+    after_load = memory_usage()
+
+    records = synthetic_records(rows, SEED + 100).to_dict('records')
+    main.predict_batch([main.PredictionRequest(**r) for r in records], main.bundle)
+    print(json.dumps({
+        "import_s": imported - start,
+        "load_s": loaded - imported,
+        "first_prediction_s": first - loaded,
+        "total_s": first - start,
+        "memory_after_load": after_load,
+        "memory_after_traffic": memory_usage()
+    }))
+
+
+def measure_cold_start(model_dir: str, runs: int) -> Dict:
+    """Start `runs` fresh processes on `model_dir` and report each plus the medians."""
+    env = dict(os.environ, MODEL_DIR=model_dir)
+    results = []
+    for _ in range(runs):
+        completed = subprocess.run(
+            [sys.executable, "-c", "import benchmark; benchmark.cold_start_probe()"],
+            cwd=SERVICE_DIR, env=env, capture_output=True, text=True, check=True
+        )
+        results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    median = {
+        key: round(float(np.median([r[key] for r in results])), 4)
+        for key in ("import_s", "load_s", "first_prediction_s", "total_s")
+    }
+    return {"runs": results, "median": median, "worker_memory": results[-1]["memory_after_traffic"]}
+
+
+# =============================================================================
+# LOAD GENERATION
+# =============================================================================
+
+def summarize(latencies: np.ndarray, elapsed: float, concurrency: int, rows_per_request: int) -> Dict:
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+    summary = {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "elapsed_s": round(elapsed, 3),
+        "requests_per_s": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(p50, 3),
+        "p95_ms": round(p95, 3),
+        "p99_ms": round(p99, 3),
+        "mean_ms": round(latencies.mean() * 1000, 3),
+        "max_ms": round(latencies.max() * 1000, 3)
+    }
+    if rows_per_request > 1:
+        summary["batch_size"] = rows_per_request
+        summary["rows_per_s"] = round(len(latencies) * rows_per_request / elapsed, 1)
+    return summary
+
+
+async def run_load(client, path: str, bodies: List[Dict], concurrency: int, rows_per_request: int = 1) -> Dict:
+    """POST every body to `path` from `concurrency` concurrent clients and summarize the latencies."""
+    latencies = np.empty(len(bodies))
+    pending = iter(range(len(bodies)))
+
+    async def worker():
+        for i in pending:
+            start = time.perf_counter()
+            response = await client.post(path, json=bodies[i])
+            latencies[i] = time.perf_counter() - start
+            response.raise_for_status()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - start, concurrency, rows_per_request)
+
+
+async def benchmark_service(n_requests: int, concurrency_levels: List[int], batch_sizes: List[int]) -> Dict:
+    """Drive the app in-process (MODEL_DIR must already be set) and return the latency results."""
+    try:
+        import httpx
+    except ImportError:
+        raise ImportError("The benchmark requires httpx: pip install httpx")
+    import main
+
+    results = {"predict": [], "batch": []}
+    async with main.lifespan(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            warmup = synthetic_records(WARMUP_REQUESTS, SEED + 200).to_dict('records')
+            await run_load(client, "/predict", warmup, 1)
+
+            for k, concurrency in enumerate(concurrency_levels):
+                bodies = synthetic_records(n_requests, SEED + 300 + k).to_dict('records')
+                summary = await run_load(client, "/predict", bodies, concurrency)
+                results["predict"].append(summary)
+                print(f"  /predict        c={concurrency:<3} {summary['requests_per_s']:>9,.0f} req/s  "
+                      f"p50 {summary['p50_ms']:.2f} ms  p95 {summary['p95_ms']:.2f} ms  p99 {summary['p99_ms']:.2f} ms")
+
+            for k, size in enumerate(batch_sizes):
+                records = synthetic_records(size * BATCH_REQUESTS, SEED + 400 + k).to_dict('records')
+                bodies = [{"records": records[i:i + size]} for i in range(0, len(records), size)]
+                summary = await run_load(client, "/predict/batch", bodies, 1, rows_per_request=size)
+                results["batch"].append(summary)
+                print(f"  /predict/batch  n={size:<5} {summary['rows_per_s']:>9,.0f} rows/s  "
+                      f"p50 {summary['p50_ms']:.2f} ms  p99 {summary['p99_ms']:.2f} ms")
+
+    results["benchmark_process_memory"] = memory_usage()
+    return results
+
+
+# =============================================================================
+# WORKER SCALING
+# =============================================================================
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def http_load(url: str, bodies: List[Dict], concurrency: int) -> List[float]:
+    """POST every body to /predict on a running server and return the latencies in seconds."""
+    import httpx
+
+    latencies = [0.0] * len(bodies)
+    pending = iter(range(len(bodies)))
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+        async def worker():
+            for i in pending:
+                start = time.perf_counter()
+                response = await client.post("/predict", json=bodies[i])
+                latencies[i] = time.perf_counter() - start
+                response.raise_for_status()
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies
+
+
+def load_generator(url: str, bodies: List[Dict], concurrency: int, cores: List[int]) -> List[float]:
+    """Entry point of one load-generating process, pinned to `cores`."""
+    os.sched_setaffinity(0, cores)
+    return asyncio.run(http_load(url, bodies, concurrency))
+
+
+def wait_until_healthy(url: str, process: subprocess.Popen, timeout: float = 120.0):
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"server exited with status {process.returncode} during startup")
+        try:
+            if httpx.get(f"{url}/health", timeout=1).json().get("model_loaded"):
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"server did not become healthy within {timeout:g}s")
+
+
+def measure_worker_scaling(model_dir: str, worker_counts: List[int], n_requests: int,
+                           load_processes: int, concurrency: int) -> List[Dict]:
+    """
+    /predict throughput of `python main.py --workers N` pinned to N cores, for
+    each N, driven over TCP by `load_processes` client processes.
+
+    Clients run on the cores the server does not use; when there are none
+    they share the server's cores, which is recorded as `shared_cores`.
+    Worker counts above the cores available to this process are skipped.
+    """
+    cores = sorted(os.sched_getaffinity(0))
+    results = []
+    for k, n in enumerate(worker_counts):
+        if n > len(cores):
+            print(f"  workers={n:<3} skipped: only {len(cores)} core(s) available")
+            results.append({"workers": n, "skipped": f"only {len(cores)} core(s) available"})
+            continue
+
+        server_cores = cores[:n]
+        client_cores = cores[n:] or cores
+        port = free_port()
+        url = f"http://127.0.0.1:{port}"
+        env = dict(os.environ, MODEL_DIR=model_dir)
+        server = subprocess.Popen(
+            [sys.executable, "main.py", "--host", "127.0.0.1", "--port", str(port), "--workers", str(n)],
+            cwd=SERVICE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            preexec_fn=lambda: os.sched_setaffinity(0, server_cores)
+        )
+        try:
+            wait_until_healthy(url, server)
+            asyncio.run(http_load(url, synthetic_records(WARMUP_REQUESTS * n, SEED + 500).to_dict('records'), n))
+
+            records = synthetic_records(n_requests, SEED + 600 + k).to_dict('records')
+            shares = [records[i::load_processes] for i in range(load_processes)]
+            with ProcessPoolExecutor(max_workers=load_processes) as pool:
+                start = time.perf_counter()
+                futures = [pool.submit(load_generator, url, share, concurrency, client_cores) for share in shares]
+                latencies = np.concatenate([future.result() for future in futures])
+                elapsed = time.perf_counter() - start
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=30)
+
+        summary = summarize(latencies, elapsed, concurrency * load_processes, 1)
+        summary.update(workers=n, cores=len(server_cores), shared_cores=not cores[n:])
+        results.append(summary)
+        print(f"  workers={n:<3} {summary['requests_per_s']:>9,.0f} req/s  p50 {summary['p50_ms']:.2f} ms  "
+              f"p99 {summary['p99_ms']:.2f} ms{'  (clients share the cores)' if summary['shared_cores'] else ''}")
+    return results
+
+
+# =============================================================================
+# REPORTING
+# =============================================================================
+
+def git_commit() -> Optional[str]:
+    try:
+        completed = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=SERVICE_DIR,
+                                   capture_output=True, text=True, check=True)
+        return completed.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_results(baseline: Dict, current: Dict):
+    """Print the change of each matching measurement relative to a previous results file."""
+    print(f"\n--- Compared with {baseline.get('commit') or 'baseline'} ---")
+
+    def change(old, new):
+        return f"{old:>10,.2f} -> {new:>10,.2f} ({(new / old - 1) * 100:+.1f}%)" if old else "n/a"
+
+    for section, key, metrics in (("predict", "concurrency", ("requests_per_s", "p50_ms", "p99_ms")),
+                                  ("batch", "batch_size", ("rows_per_s", "p50_ms", "p99_ms")),
+                                  ("worker_scaling", "workers", ("requests_per_s", "p50_ms", "p99_ms"))):
+        previous = {run[key]: run for run in baseline.get(section, []) if "skipped" not in run}
+        for run in current.get(section, []):
+            if run[key] not in previous or "skipped" in run:
+                continue
+            for metric in metrics:
+                print(f"  {section:<8} {key}={run[key]:<5} {metric:<15} {change(previous[run[key]][metric], run[metric])}")
+
+    old_start = baseline.get("cold_start", {}).get("median", {}).get("total_s")
+    if old_start:
+        print(f"  cold start total_s              {change(old_start, current['cold_start']['median']['total_s'])}")
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the prediction service on a synthetic production-size model")
+    parser.add_argument("--output", default="benchmark.json", help="Results JSON file (default: benchmark.json)")
+    parser.add_argument("--model-dir", help="Serve this artifact directory instead of the synthetic model")
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS, help=f"Synthetic training rows (default: {DEFAULT_ROWS:,})")
+    parser.add_argument("--backend", choices=("rf", "hgb"), default="rf", help="Synthetic model backend (default: rf)")
+    parser.add_argument("--requests", type=int, default=DEFAULT_REQUESTS,
+                        help=f"/predict requests per concurrency level (default: {DEFAULT_REQUESTS})")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=list(DEFAULT_CONCURRENCY),
+                        help="Concurrent clients for /predict (default: 1 8 32)")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=list(DEFAULT_BATCH_SIZES),
+                        help="Records per /predict/batch request (default: 100 1000)")
+    parser.add_argument("--cold-starts", type=int, default=COLD_STARTS, help=f"Fresh-process starts (default: {COLD_STARTS})")
+    parser.add_argument("--baseline", help="Earlier results JSON to compare against")
+    parser.add_argument("--workers", type=int, nargs="+", default=[],
+                        help="Also measure `main.py --workers N` pinned to N cores, for each N (e.g. 1 4 8)")
+    parser.add_argument("--load-processes", type=int, default=SCALING_LOAD_PROCESSES,
+                        help=f"Client processes driving the --workers runs (default: {SCALING_LOAD_PROCESSES})")
+    args = parser.parse_args(argv)
+
+    print("\n--- Model ---")
+    model_dir = os.path.abspath(args.model_dir) if args.model_dir else prepare_model(args.rows, args.backend, SEED)
+    model = describe_model(model_dir)
+    # Must be set before main is imported
+    os.environ["MODEL_DIR"] = model_dir
+
+    print("\n--- Cold start ---")
+    cold_start = measure_cold_start(model_dir, args.cold_starts)
+    memory = cold_start["worker_memory"]
+    print(f"  {cold_start['median']['total_s'] * 1000:.0f} ms (import {cold_start['median']['import_s'] * 1000:.0f} ms, "
+          f"load {cold_start['median']['load_s'] * 1000:.0f} ms, first prediction "
+          f"{cold_start['median']['first_prediction_s'] * 1000:.1f} ms)")
+    print(f"  Worker memory: RSS {memory.get('rss_mb', memory['peak_rss_mb'])} MB, "
+          f"PSS {memory.get('pss_mb', 'n/a')} MB, private {memory.get('private_mb', 'n/a')} MB")
+
+    print("\n--- Latency and throughput ---")
+    service = asyncio.run(benchmark_service(args.requests, args.concurrency, args.batch_sizes))
+
+    if args.workers:
+        print("\n--- Worker scaling ---")
+        service["worker_scaling"] = measure_worker_scaling(
+            model_dir, args.workers, args.requests, args.load_processes, SCALING_CONCURRENCY)
+
+    results = {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        "commit": git_commit(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__
+        },
+        "config": {
+            "rows": args.rows, "backend": args.backend, "seed": SEED, "requests": args.requests,
+            "concurrency": args.concurrency, "batch_sizes": args.batch_sizes,
+            "batch_requests": BATCH_REQUESTS, "predict_pool_size": int(os.environ.get("PREDICT_POOL_SIZE", "4")),
+            "workers": args.workers, "load_processes": args.load_processes
+        },
+        "model": model,
+        "cold_start": cold_start,
+        **service
+    }
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\n✓ Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            compare_results(json.load(f), results)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,183 @@
+"""
+Typed Dataset Loader
+
+Reads crop yield CSVs with a declared schema instead of letting pandas
+infer everything as object/float64:
+- only the columns the training pipelines use are parsed
+- string columns become categoricals, measurements float32
+- the pyarrow CSV engine is used when available
+- files too large to parse in one go are read in chunks and combined,
+  so the peak memory is one raw chunk plus the compact result
+
+The label cleaning, category mapping and label encoding helpers live here
+too, so both training scripts encode categories the same way.
+
+Shared by train_model.py and train_model_v2.py.
+"""
+
+import os
+import resource
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+from sklearn.preprocessing import LabelEncoder
+
+
+# Column names below are in normalized form (see normalize_column_name)
+CATEGORICAL_COLUMNS = ['state', 'district', 'crop', 'season', 'region', 'soil_type']
+FLOAT_COLUMNS = [
+    'yield', 'production', 'area', 'area_hectares', 'annual_rainfall', 'rainfall',
+    'fertilizer', 'pesticide', 'temperature', 'humidity', 'ndvi', 'soil_moisture', 'lst'
+]
+INTEGER_COLUMNS = ['year', 'crop_year']
+
+# Files above this size are parsed in chunks of CHUNKSIZE rows
+LARGE_FILE_BYTES = 512 * 1024 * 1024
+CHUNKSIZE = 500_000
+
+
+def normalize_column_name(name: str) -> str:
+    """Match the column normalization applied in preprocess_data."""
+    return name.strip().lower().replace(' ', '_')
+
+
+def resolve_schema(path: str) -> Tuple[List[str], Dict[str, str]]:
+    """
+    Read only the header and return (usecols, dtype) in the file's own column names.
+
+    Integer columns are left to inference and downcast after loading, since
+    a missing value would make a fixed integer dtype fail.
+    """
+    header = pd.read_csv(path, nrows=0).columns
+    usecols, dtype = [], {}
+    for column in header:
+        name = normalize_column_name(column)
+        if name in CATEGORICAL_COLUMNS:
+            dtype[column] = 'category'
+        elif name in FLOAT_COLUMNS:
+            dtype[column] = 'float32'
+        elif name not in INTEGER_COLUMNS:
+            continue
+        usecols.append(column)
+    return usecols, dtype
+
+
+def _pyarrow_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _downcast_integers(df: pd.DataFrame) -> pd.DataFrame:
+    for column in df.columns:
+        if normalize_column_name(column) in INTEGER_COLUMNS and df[column].notna().all():
+            df[column] = pd.to_numeric(df[column], downcast='integer')
+    return df
+
+
+def iter_chunks(path: str, chunksize: int = CHUNKSIZE) -> Iterator[pd.DataFrame]:
+    """Yield typed, column-pruned DataFrames of at most `chunksize` rows."""
+    usecols, dtype = resolve_schema(path)
+    for chunk in pd.read_csv(path, usecols=usecols, dtype=dtype, chunksize=chunksize):
+        yield _downcast_integers(chunk)
+
+
+def concat_chunks(chunks: List[pd.DataFrame]) -> pd.DataFrame:
+    """Concatenate chunks, merging their categories instead of falling back to object dtype."""
+    if len(chunks) == 1:
+        return chunks[0]
+
+    columns = {}
+    for column in chunks[0].columns:
+        parts = [chunk[column] for chunk in chunks]
+        if isinstance(parts[0].dtype, pd.CategoricalDtype):
+            columns[column] = union_categoricals(parts)
+        else:
+            columns[column] = pd.concat(parts, ignore_index=True)
+    return pd.DataFrame(columns)
+
+
+def read_dataset(path: str, chunksize: Optional[int] = None) -> pd.DataFrame:
+    """
+    Load `path` with the declared schema.
+
+    Files larger than LARGE_FILE_BYTES (or any file when `chunksize` is
+    given) are parsed in chunks; otherwise the whole file is parsed at once,
+    with the pyarrow engine when it is installed.
+    """
+    rss_before = peak_rss_mb()
+
+    if chunksize is None and os.path.getsize(path) > LARGE_FILE_BYTES:
+        chunksize = CHUNKSIZE
+
+    if chunksize:
+        df = concat_chunks(list(iter_chunks(path, chunksize)))
+        mode = f"chunked ({chunksize:,} rows)"
+    else:
+        usecols, dtype = resolve_schema(path)
+        engine = 'pyarrow' if _pyarrow_available() else 'c'
+        df = _downcast_integers(pd.read_csv(path, usecols=usecols, dtype=dtype, engine=engine))
+        mode = f"{engine} engine"
+
+    frame_mb = df.memory_usage(deep=True).sum() / 1024 ** 2
+    print(f"  Loaded with {mode}: frame {frame_mb:,.1f} MB, "
+          f"peak RSS {peak_rss_mb():,.1f} MB (+{peak_rss_mb() - rss_before:,.1f} MB)")
+    return df
+
+
+def clean_label(value, default: str = 'unknown') -> str:
+    """Lowercase and strip a raw categorical label, substituting `default` for missing values."""
+    if pd.isna(value):
+        return default
+    return str(value).lower().strip()
+
+
+def map_categories(series: pd.Series, func) -> pd.Series:
+    """
+    Apply `func` once per distinct value and broadcast the results back.
+    
+    Returns a categorical Series whose categories are sorted, so its codes
+    match what LabelEncoder would assign to the same labels.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        uniques = list(series.cat.categories) + [np.nan]
+        codes = series.cat.codes.to_numpy().copy()
+        codes[codes == -1] = len(uniques) - 1
+    else:
+        codes, uniques = pd.factorize(series, use_na_sentinel=False)
+    
+    mapped = [func(value) for value in uniques]
+    categories = sorted(set(mapped))
+    positions = pd.Index(categories).get_indexer(mapped)
+    
+    return pd.Series(
+        pd.Categorical.from_codes(positions[codes], categories=categories),
+        index=series.index,
+        name=series.name
+    )
+
+
+def encode_categorical(series: pd.Series) -> Tuple[LabelEncoder, np.ndarray]:
+    """
+    Build a fitted LabelEncoder and the encoded values from a column.
+    
+    For a categorical column this reads the codes directly instead of
+    re-sorting every value as LabelEncoder.fit_transform would.
+    """
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        series = map_categories(series, str)
+    series = series.cat.remove_unused_categories()
+    
+    le = LabelEncoder()
+    le.classes_ = np.asarray(series.cat.categories, dtype=object)
+    return le, series.cat.codes.to_numpy().astype(np.int64)
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far, in MB."""
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
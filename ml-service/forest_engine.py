@@ -0,0 +1,380 @@
+"""
+Flat Random Forest Inference Engine
+
+Flattens a fitted RandomForestRegressor into contiguous NumPy arrays
+(feature, threshold, left, right, value) and evaluates every tree for a
+whole batch at once with a vectorized traversal. Predictions are
+bit-identical to sklearn's RandomForestRegressor.predict, without the
+per-call input validation and joblib thread dispatch.
+
+The arrays are saved as one .npy file each, so they can be memory-mapped
+read-only: every worker process on a host shares one page-cache copy of
+the trees instead of unpickling its own.
+
+Usage:
+    python forest_engine.py model/model.pkl model/forest
+"""
+
+import os
+import sys
+import json
+import hashlib
+from typing import Dict, Optional
+
+import numpy as np
+
+
+ARRAY_NAMES = ("feature", "threshold", "left", "right", "value", "roots")
+META_FILE = "meta.json"
+
+# Rows traversed together; keeps the (rows, trees) working set cache-resident
+ROW_BLOCK = 256
+
+
+class FlatForest:
+    """
+    Array-backed forest of regression trees.
+
+    All trees share one set of node arrays. Nodes are laid out breadth-first
+    per tree with the right child stored directly after the left one, so a
+    traversal step is `left[node] + (x > threshold[node])`. Leaves point to
+    themselves with an infinite threshold, so a fixed number of steps (the
+    maximum tree depth) lands every row on its leaf.
+    """
+
+    def __init__(self, feature: np.ndarray, threshold: np.ndarray, left: np.ndarray,
+                 right: np.ndarray, value: np.ndarray, roots: np.ndarray, n_features: int,
+                 max_depth: Optional[int] = None, fingerprint: Optional[str] = None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.n_features = int(n_features)
+        self.max_depth = self._compute_max_depth() if max_depth is None else int(max_depth)
+        # Set by load from meta.json; otherwise hashed on first use
+        self._fingerprint = fingerprint
+
+    @property
+    def n_estimators(self) -> int:
+        return len(self.roots)
+
+    @property
+    def node_count(self) -> int:
+        return len(self.feature)
+
+    @classmethod
+    def from_estimator(cls, forest) -> "FlatForest":
+        """Flatten a fitted sklearn RandomForestRegressor."""
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            order = _breadth_first_order(tree.children_left, tree.children_right)
+            n = len(order)
+            # position[old_id] = new id within this tree
+            position = np.empty(n, dtype=np.int64)
+            position[order] = np.arange(n)
+
+            children_left = tree.children_left[order]
+            children_right = tree.children_right[order]
+            is_leaf = children_left == -1
+            own = np.arange(offset, offset + n, dtype=np.int32)
+
+            features.append(np.where(is_leaf, 0, tree.feature[order]).astype(np.int32))
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold[order]).astype(np.float64))
+            lefts.append(np.where(is_leaf, own, position[children_left] + offset).astype(np.int32))
+            rights.append(np.where(is_leaf, own, position[children_right] + offset).astype(np.int32))
+            values.append(tree.value[order, 0, 0].astype(np.float64))
+            roots.append(offset)
+            offset += n
+
+        return cls(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds),
+            left=np.concatenate(lefts),
+            right=np.concatenate(rights),
+            value=np.concatenate(values),
+            roots=np.array(roots, dtype=np.int32),
+            n_features=forest.n_features_in_,
+        )
+
+    def save(self, path: str):
+        """Save the flattened arrays as .npy files plus a meta.json in directory `path`."""
+        os.makedirs(path, exist_ok=True)
+        for name, array in self.arrays().items():
+            np.save(os.path.join(path, f"{name}.npy"), np.ascontiguousarray(array))
+        with open(os.path.join(path, META_FILE), 'w') as f:
+            json.dump({
+                "n_features": self.n_features,
+                "n_estimators": self.n_estimators,
+                "node_count": self.node_count,
+                "max_depth": self.max_depth,
+                "fingerprint": self.fingerprint()
+            }, f, indent=2)
+
+    @classmethod
+    def load(cls, path: str, mmap_mode: Optional[str] = 'r') -> "FlatForest":
+        """
+        Load a forest saved with `save`.
+
+        With the default mmap_mode='r' nothing is read up front; pages are
+        faulted in from the OS page cache on first use and shared between
+        processes. Pass mmap_mode=None to read the arrays into private memory.
+        """
+        with open(os.path.join(path, META_FILE), 'r') as f:
+            meta = json.load(f)
+        # np.asarray drops the np.memmap subclass (and its per-op overhead) but keeps the mapping
+        arrays = {
+            name: np.asarray(np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode))
+            for name in ARRAY_NAMES
+        }
+        # Forests saved before fingerprints were stored are hashed on first use
+        return cls(n_features=meta["n_features"], max_depth=meta["max_depth"],
+                   fingerprint=meta.get("fingerprint"), **arrays)
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        return {name: getattr(self, name) for name in ARRAY_NAMES}
+
+    @property
+    def nbytes(self) -> int:
+        return sum(array.nbytes for array in self.arrays().values())
+
+    def fingerprint(self) -> str:
+        """
+        SHA-256 of the node arrays: equal only for the same trees, splits and
+        leaf values. Computed once and stored in meta.json by `save`, so a
+        memory-mapped forest is not read in full to check it.
+        """
+        if self._fingerprint is None:
+            digest = hashlib.sha256()
+            for name, array in self.arrays().items():
+                array = np.ascontiguousarray(array)
+                digest.update(f"{name}:{array.dtype.str}:{array.shape};".encode())
+                digest.update(array)
+            self._fingerprint = digest.hexdigest()
+        return self._fingerprint
+
+    def select_trees(self, indices) -> "FlatForest":
+        """Return a forest made of the trees at `indices`, in that order."""
+        bounds = np.append(self.roots, self.node_count)
+        nodes = np.concatenate([np.arange(bounds[t], bounds[t + 1]) for t in indices])
+        return self._take(nodes, self.roots[np.asarray(indices)])
+
+    def cap_depth(self, depth: int) -> "FlatForest":
+        """
+        Return a forest whose trees stop at `depth`: internal nodes at that
+        depth become leaves predicting their own (training mean) value.
+        """
+        left, right = self.left.copy(), self.right.copy()
+        feature, threshold = self.feature.copy(), self.threshold.copy()
+
+        nodes = self.roots
+        for _ in range(depth):
+            internal = nodes[left[nodes] != nodes]
+            nodes = np.concatenate([left[internal], right[internal]])
+        cut = nodes[left[nodes] != nodes]
+        left[cut] = right[cut] = cut
+        feature[cut] = 0
+        threshold[cut] = np.inf
+
+        capped = FlatForest(feature, threshold, left, right, self.value, self.roots, self.n_features)
+        return capped._compact()
+
+    def merge_leaves(self, tolerance: float) -> "FlatForest":
+        """
+        Repeatedly collapse sibling leaves whose values differ by at most
+        `tolerance` into their parent, which predicts the weighted mean of both.
+        """
+        left, right = self.left.copy(), self.right.copy()
+        feature, threshold = self.feature.copy(), self.threshold.copy()
+        own = np.arange(self.node_count)
+
+        while True:
+            is_leaf = left == own
+            internal = np.flatnonzero(~is_leaf)
+            mergeable = internal[
+                is_leaf[left[internal]] & is_leaf[right[internal]]
+                & (np.abs(self.value[left[internal]] - self.value[right[internal]]) <= tolerance)
+            ]
+            if len(mergeable) == 0:
+                break
+            left[mergeable] = right[mergeable] = mergeable
+            feature[mergeable] = 0
+            threshold[mergeable] = np.inf
+
+        merged = FlatForest(feature, threshold, left, right, self.value, self.roots, self.n_features)
+        return merged._compact()
+
+    def _compact(self) -> "FlatForest":
+        """Drop nodes no longer reachable from a root (e.g. below new leaves)."""
+        reachable = np.zeros(self.node_count, dtype=bool)
+        nodes = self.roots
+        while len(nodes):
+            reachable[nodes] = True
+            internal = nodes[self.left[nodes] != nodes]
+            nodes = np.concatenate([self.left[internal], self.right[internal]])
+        # Original order keeps each tree contiguous and siblings adjacent
+        return self._take(np.flatnonzero(reachable), self.roots)
+
+    def _take(self, nodes: np.ndarray, roots: np.ndarray) -> "FlatForest":
+        """New forest from the old node ids `nodes` (in their new order), renumbering links."""
+        new_id = np.full(self.node_count, -1, dtype=np.int64)
+        new_id[nodes] = np.arange(len(nodes))
+        return FlatForest(
+            feature=self.feature[nodes],
+            threshold=self.threshold[nodes],
+            left=new_id[self.left[nodes]].astype(np.int32),
+            right=new_id[self.right[nodes]].astype(np.int32),
+            value=self.value[nodes],
+            roots=new_id[roots].astype(np.int32),
+            n_features=self.n_features,
+        )
+
+    def _compute_max_depth(self) -> int:
+        """Depth of the deepest leaf, found by walking all trees level by level."""
+        nodes = self.roots
+        depth = 0
+        while True:
+            internal = nodes[self.left[nodes] != nodes]
+            if len(internal) == 0:
+                return depth
+            nodes = np.concatenate([self.left[internal], self.right[internal]])
+            depth += 1
+
+    def apply(self, X) -> np.ndarray:
+        """Return the (n_samples, n_estimators) matrix of leaf node indices."""
+        # sklearn compares float32 features against float64 thresholds
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Expected input of shape (n_samples, {self.n_features}), got {X.shape}")
+
+        leaves = np.empty((X.shape[0], self.n_estimators), dtype=np.int32)
+        for start in range(0, X.shape[0], ROW_BLOCK):
+            block = X[start:start + ROW_BLOCK]
+            leaves[start:start + len(block)] = self._apply_block(block)
+        return leaves
+
+    def _apply_block(self, X: np.ndarray) -> np.ndarray:
+        X_flat = X.ravel()
+        row_offsets = (np.arange(X.shape[0], dtype=np.int32) * self.n_features)[:, None]
+        nodes = np.repeat(self.roots[None, :], X.shape[0], axis=0)
+
+        for _ in range(self.max_depth):
+            go_right = X_flat[row_offsets + self.feature[nodes]] > self.threshold[nodes]
+            nodes = self.left[nodes]
+            nodes += go_right
+
+        return nodes
+
+    def explain(self, X):
+        """
+        Return (prediction, bias, contributions) with per-feature contributions
+        from the tree paths (Saabas): every split a row passes credits the
+        change in node value to the split feature, averaged over trees.
+
+        bias is the mean root value (the training mean) and, up to rounding,
+        prediction == bias + contributions.sum(axis=1). The walk is the same
+        fixed-depth traversal as `apply`, so it costs one extra bincount per level.
+        """
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Expected input of shape (n_samples, {self.n_features}), got {X.shape}")
+
+        leaves = np.empty((X.shape[0], self.n_estimators), dtype=np.int32)
+        contributions = np.empty((X.shape[0], self.n_features), dtype=np.float64)
+        for start in range(0, X.shape[0], ROW_BLOCK):
+            block = X[start:start + ROW_BLOCK]
+            rows = slice(start, start + len(block))
+            leaves[rows], contributions[rows] = self._explain_block(block)
+
+        bias = np.full(X.shape[0], self.value[self.roots].mean())
+        return self.predict_leaves(leaves), bias, contributions / self.n_estimators
+
+    def _explain_block(self, X: np.ndarray):
+        X_flat = X.ravel()
+        row_offsets = (np.arange(X.shape[0], dtype=np.int32) * self.n_features)[:, None]
+        nodes = np.repeat(self.roots[None, :], X.shape[0], axis=0)
+        totals = np.zeros(X.size, dtype=np.float64)
+
+        for _ in range(self.max_depth):
+            feature_ids = row_offsets + self.feature[nodes]
+            go_right = X_flat[feature_ids] > self.threshold[nodes]
+            children = self.left[nodes] + go_right
+            # Leaves step onto themselves and add nothing
+            totals += np.bincount(
+                feature_ids.ravel(),
+                weights=(self.value[children] - self.value[nodes]).ravel(),
+                minlength=X.size
+            )
+            nodes = children
+
+        return nodes, totals.reshape(X.shape)
+
+    def predict_trees(self, X) -> np.ndarray:
+        """Return the (n_samples, n_estimators) matrix of per-tree predictions."""
+        return self.value[self.apply(X)]
+
+    def predict(self, X) -> np.ndarray:
+        """Predict the forest mean, matching RandomForestRegressor.predict bit for bit."""
+        return self._mean(self.predict_trees(X))
+
+    def predict_leaves(self, leaves: np.ndarray) -> np.ndarray:
+        """Forest mean for a leaf matrix already computed with `apply`."""
+        return self._mean(self.value[leaves])
+
+    def predict_interval(self, X, percentiles=(10.0, 90.0)):
+        """
+        Return (mean, lower, upper): the forest prediction plus the given
+        percentiles of the individual tree predictions, from a single traversal.
+        """
+        per_tree = self.predict_trees(X)
+        lower, upper = _row_percentiles(per_tree, percentiles)
+        return self._mean(per_tree), lower, upper
+
+    def _mean(self, per_tree: np.ndarray) -> np.ndarray:
+        # sklearn accumulates tree outputs one after another and divides once;
+        # cumsum keeps that summation order where a plain sum would not.
+        return np.cumsum(per_tree, axis=1)[:, -1] / self.n_estimators
+
+
+def _row_percentiles(values: np.ndarray, percentiles):
+    """
+    Per-row percentiles with np.percentile's linear interpolation, using a
+    partial sort (np.partition) instead of np.percentile's full machinery.
+    """
+    n = values.shape[1]
+    position = np.asarray(percentiles, dtype=np.float64) / 100 * (n - 1)
+    below = np.floor(position).astype(np.int64)
+    above = np.minimum(below + 1, n - 1)
+    ordered = np.partition(values, np.unique(np.concatenate([below, above])), axis=1)
+    return [
+        ordered[:, lo] + frac * (ordered[:, hi] - ordered[:, lo])
+        for lo, hi, frac in zip(below, above, position - below)
+    ]
+
+
+def _breadth_first_order(children_left: np.ndarray, children_right: np.ndarray) -> np.ndarray:
+    """Order the nodes of one sklearn tree level by level, keeping siblings adjacent."""
+    order = [np.array([0])]
+    level = order[0]
+    while True:
+        internal = level[children_left[level] != -1]
+        if len(internal) == 0:
+            break
+        level = np.column_stack([children_left[internal], children_right[internal]]).ravel()
+        order.append(level)
+    return np.concatenate(order)
+
+
+if __name__ == "__main__":
+    import joblib
+
+    if len(sys.argv) != 3:
+        print("Usage: python forest_engine.py <model.pkl> <forest_dir>")
+        sys.exit(1)
+
+    FlatForest.from_estimator(joblib.load(sys.argv[1])).save(sys.argv[2])
+    print(f"Flattened forest saved to {sys.argv[2]}")
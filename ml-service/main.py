@@ -5,31 +5,117 @@ This API serves predictions from the trained Random Forest model.
 """
 
 import os
+import sys
 import json
-from typing import Optional
+import time
+import signal
+import socket
+import asyncio
+import threading
+import functools
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
 from contextlib import asynccontextmanager
 
 import joblib
 import numpy as np
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
+from fastapi.responses import Response
+from pydantic import BaseModel, Field, ValidationError, field_validator, model_validator
+from sklearn import config_context
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.preprocessing import StandardScaler
 
+from forest_engine import FlatForest
+from quantile_index import QuantileIndex
+from yield_surface import YieldSurface, SURFACE_FEATURES, COMBINATION_FEATURES, default_axes, grid_points
+from prediction_cache import LRUCache
+from service_metrics import REGISTRY, CONTENT_TYPE, MetricsMiddleware, record_stage, mark_submitted, mark_completed
 
-# Paths
-MODEL_DIR = os.path.join(os.path.dirname(__file__), "model")
-MODEL_PATH = os.path.join(MODEL_DIR, "model.pkl")
-ENCODERS_PATH = os.path.join(MODEL_DIR, "encoders.pkl")
+
+# Paths (MODEL_DIR can point the service at another artifact directory)
+MODEL_DIR = os.environ.get("MODEL_DIR", os.path.join(os.path.dirname(__file__), "model"))
 MODEL_PATH = os.path.join(MODEL_DIR, "model.pkl")
 ENCODERS_PATH = os.path.join(MODEL_DIR, "encoders.pkl")
 SCALER_PATH = os.path.join(MODEL_DIR, "scaler.pkl")
 METRICS_PATH = os.path.join(MODEL_DIR, "metrics.json")
+FOREST_DIR = os.path.join(MODEL_DIR, "forest")
+QUANTILE_INDEX_DIR = os.path.join(MODEL_DIR, "quantile_index")
+YIELD_SURFACE_DIR = os.path.join(MODEL_DIR, "yield_surface")
+
+# Feature layout aligned with train_model_v2.py 'Golden List'
+CATEGORICAL_FEATURES = ['state', 'district', 'crop', 'season', 'soil_type']
+NUMERICAL_FEATURES = ['rainfall', 'temperature', 'humidity', 'ndvi', 'soil_moisture', 'lst']
+# Column order train_model_v2.py fits the scaler on, for scalers saved without feature names
+SCALER_FIT_ORDER = ['rainfall', 'ndvi', 'soil_moisture', 'lst', 'temperature', 'humidity']
+
+# Upper bound on records accepted by /predict/batch in a single call
+MAX_BATCH_SIZE = 10000
+
+# Per-tree percentiles reported as the prediction interval (an 80% band)
+INTERVAL_PERCENTILES = (10.0, 90.0)
+
+# Quantile levels returned by /predict/quantiles unless the request lists its own
+DEFAULT_QUANTILES = [0.1, 0.5, 0.9]
+MAX_QUANTILES = 99
+
+# Values per swept feature accepted by /predict/surface (a 2-D sweep is also capped at MAX_BATCH_SIZE points)
+MAX_SWEEP_POINTS = 200
+
+# Serving configuration (overridable on the command line)
+WORKERS = int(os.environ.get("WORKERS", "1"))
+PREDICT_POOL_SIZE = int(os.environ.get("PREDICT_POOL_SIZE", "4"))
+
+# Worker supervision: a crashed worker is restarted after a per-worker backoff
+# (doubling up to the cap while it keeps crashing); more than WORKER_MAX_RESTARTS
+# restarts within WORKER_RESTART_WINDOW seconds stops the server
+WORKER_RESTART_BACKOFF = float(os.environ.get("WORKER_RESTART_BACKOFF", "1"))
+WORKER_RESTART_BACKOFF_MAX = float(os.environ.get("WORKER_RESTART_BACKOFF_MAX", "30"))
+WORKER_MAX_RESTARTS = int(os.environ.get("WORKER_MAX_RESTARTS", "10"))
+WORKER_RESTART_WINDOW = float(os.environ.get("WORKER_RESTART_WINDOW", "60"))
+
+# Prediction cache bounds (a TTL of 0 keeps entries until evicted or the model reloads)
+PREDICTION_CACHE_SIZE = int(os.environ.get("PREDICTION_CACHE_SIZE", "10000"))
+PREDICTION_CACHE_TTL = float(os.environ.get("PREDICTION_CACHE_TTL", "3600"))
+
+# Hot reload: poll MODEL_DIR every N seconds (0 disables); token required by /admin/reload if set
+MODEL_WATCH_INTERVAL = float(os.environ.get("MODEL_WATCH_INTERVAL", "0"))
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
 
-# Global variables for model and encoders
-model = None
-encoders = None
-scaler = None
-metrics = None
+DEFAULT_METRICS = {"r2_score": 0.85, "mae": 250.0, "rmse": 320.0}
+
+# Operational metrics served by /metrics (HTTP and per-stage latency live in service_metrics)
+BATCH_SIZE = REGISTRY.histogram(
+    "prediction_batch_size", "Records per batch request", buckets=(1, 10, 50, 100, 500, 1000, 5000, 10000))
+BATCH_INVALID_RECORDS = REGISTRY.counter(
+    "prediction_batch_invalid_records_total", "Batch records rejected by validation")
+BATCH_FAILED_RECORDS = REGISTRY.counter(
+    "prediction_batch_failed_records_total", "Valid batch records whose prediction failed")
+FALLBACKS = REGISTRY.counter(
+    "prediction_fallbacks_total", "Predictions served by a fallback or degraded path, by reason", ("reason",))
+UNKNOWN_CATEGORIES = REGISTRY.counter(
+    "prediction_unknown_categories_total", "Categorical values not seen in training (encoded as 0), by feature",
+    ("feature",))
+for _reason in ("model_not_loaded", "prediction_error", "scaling_error", "missing_encoder"):
+    FALLBACKS.labels(_reason)
+for _feature in CATEGORICAL_FEATURES:
+    UNKNOWN_CATEGORIES.labels(_feature)
+SURFACE_QUERIES = REGISTRY.counter(
+    "yield_surface_queries_total", "/predict/surface queries by source (surface index or model)", ("source",))
+for _source in ("surface", "model"):
+    SURFACE_QUERIES.labels(_source)
+MODEL_LOAD_SECONDS = REGISTRY.gauge("model_load_duration_seconds", "Duration of the last model load")
+MODEL_VERSION = REGISTRY.gauge("model_version", "Version of the served model, incremented on every load")
+MODEL_LOADED_AT = REGISTRY.gauge("model_loaded_timestamp_seconds", "Unix time the served model was loaded")
+
+# Set when serve() loaded the model in the parent before forking workers
+model_preloaded = False
+
+# Bounded pool that runs CPU-bound prediction work off the event loop
+predict_executor: Optional[ThreadPoolExecutor] = None
 
 
 class PredictionRequest(BaseModel):
@@ -63,11 +149,230 @@ class PredictionRequest(BaseModel):
         }
 
 
+class PredictionInterval(BaseModel):
+    """Spread of the individual tree predictions around the forest mean."""
+    lower: float = Field(..., description="10th percentile of the per-tree predictions in kg/ha")
+    upper: float = Field(..., description="90th percentile of the per-tree predictions in kg/ha")
+
+
 class PredictionResponse(BaseModel):
     """Response schema for yield prediction."""
     predicted_yield: float = Field(..., description="Predicted yield in kg/ha")
     confidence: float = Field(..., description="Prediction confidence percentage")
     model_accuracy: dict = Field(..., description="Model accuracy metrics")
+    prediction_interval: Optional[PredictionInterval] = Field(
+        None, description="P10-P90 band of the forest's trees (forest models only)"
+    )
+
+
+def check_quantile_levels(levels: List[float]) -> List[float]:
+    if any(not 0 < q < 1 for q in levels):
+        raise ValueError("quantile levels must be strictly between 0 and 1")
+    return levels
+
+
+class QuantilePredictionRequest(PredictionRequest):
+    """Request schema for quantile yield prediction."""
+    quantiles: List[float] = Field(
+        default=DEFAULT_QUANTILES, min_length=1, max_length=MAX_QUANTILES,
+        description="Quantile levels between 0 and 1 (default: P10, P50, P90)"
+    )
+    
+    _check_quantiles = field_validator("quantiles")(check_quantile_levels)
+
+
+class QuantilePredictionResponse(BaseModel):
+    """Response schema for quantile yield prediction."""
+    predicted_yield: float = Field(..., description="Predicted (mean) yield in kg/ha")
+    quantiles: Dict[str, float] = Field(..., description="Yield in kg/ha per quantile level, keyed p10, p50, ...")
+    model_accuracy: dict = Field(..., description="Model accuracy metrics")
+
+
+# Accepted range of each numerical feature, taken from the PredictionRequest field constraints
+NUMERICAL_BOUNDS = {
+    name: tuple(
+        next(getattr(m, bound) for m in PredictionRequest.model_fields[name].metadata if hasattr(m, bound))
+        for bound in ("ge", "le")
+    )
+    for name in NUMERICAL_FEATURES
+}
+
+
+def check_sweep(sweep: Dict[str, List[float]]) -> Dict[str, List[float]]:
+    unknown = sorted(set(sweep) - set(SURFACE_FEATURES))
+    if unknown:
+        raise ValueError(f"only {', '.join(SURFACE_FEATURES)} can be swept, got {unknown}")
+    if len(sweep) > 2:
+        raise ValueError("at most two features can be swept")
+    points = 1
+    for name, values in sweep.items():
+        low, high = NUMERICAL_BOUNDS[name]
+        if len(values) > MAX_SWEEP_POINTS:
+            raise ValueError(f"at most {MAX_SWEEP_POINTS} {name} values can be swept")
+        if any(not low <= v <= high for v in values):
+            raise ValueError(f"{name} values must be between {low:g} and {high:g}")
+        points *= max(len(values), 1)
+    if points > MAX_BATCH_SIZE:
+        raise ValueError(f"a sweep can cover at most {MAX_BATCH_SIZE} points")
+    return sweep
+
+
+class SurfaceRequest(PredictionRequest):
+    """Request schema for yield surface queries."""
+    sweep: Dict[str, List[float]] = Field(
+        default_factory=dict,
+        description="Up to two of rainfall, temperature and humidity, each mapped to the values to evaluate "
+                    "(an empty list uses the surface's grid points). Without a sweep a single point is returned"
+    )
+    
+    _check_sweep = field_validator("sweep")(check_sweep)
+
+
+class SurfaceResponse(BaseModel):
+    """Response schema for yield surface queries."""
+    axes: Dict[str, List[float]] = Field(..., description="Values of each swept feature, in the order of the dimensions of `yields`")
+    yields: Union[float, List[float], List[List[float]]] = Field(
+        ..., description="Predicted yield in kg/ha: a number for a point, a curve for one swept feature, "
+                         "one row per value of the first feature for two"
+    )
+    source: str = Field(..., description="'surface' if interpolated from the precomputed index, 'model' if scored by the model")
+
+
+class Perturbation(BaseModel):
+    """How one numerical feature is varied: exactly one of values, range, deltas or percent."""
+    values: Optional[List[float]] = Field(
+        None, min_length=1, max_length=MAX_SWEEP_POINTS, description="Absolute values to evaluate")
+    range: Optional[Tuple[float, float]] = Field(None, description="(start, stop) evaluated at `points` evenly spaced values")
+    points: int = Field(11, ge=2, le=MAX_SWEEP_POINTS, description="Number of values for `range`")
+    deltas: Optional[List[float]] = Field(
+        None, min_length=1, max_length=MAX_SWEEP_POINTS, description="Offsets added to the base value, e.g. [-2, 2] °C")
+    percent: Optional[List[float]] = Field(
+        None, min_length=1, max_length=MAX_SWEEP_POINTS, description="Relative changes of the base value in %, e.g. [-10, 10]")
+    
+    @model_validator(mode="after")
+    def check_one_kind(self) -> "Perturbation":
+        given = [kind for kind in ("values", "range", "deltas", "percent") if getattr(self, kind) is not None]
+        if len(given) != 1:
+            raise ValueError(f"give exactly one of values, range, deltas or percent, got {given or 'none'}")
+        return self
+    
+    def resolve(self, base: float) -> np.ndarray:
+        """Feature values to evaluate for a record whose own value is `base`."""
+        if self.values is not None:
+            values = np.asarray(self.values, dtype=np.float64)
+        elif self.range is not None:
+            values = np.linspace(self.range[0], self.range[1], self.points)
+        elif self.deltas is not None:
+            values = base + np.asarray(self.deltas, dtype=np.float64)
+        else:
+            values = base * (1.0 + np.asarray(self.percent, dtype=np.float64) / 100.0)
+        # Drop float noise such as 150 * 1.1 = 165.00000000000003
+        return np.round(values, 9)
+
+
+class SensitivityRequest(PredictionRequest):
+    """Request schema for sensitivity analysis around one record."""
+    perturbations: Dict[str, Perturbation] = Field(
+        ..., min_length=1, description="Numerical features to vary, each with its perturbation"
+    )
+    
+    @model_validator(mode="after")
+    def check_perturbations(self) -> "SensitivityRequest":
+        for name, perturbation in self.perturbations.items():
+            if name not in NUMERICAL_FEATURES:
+                raise ValueError(f"only {', '.join(NUMERICAL_FEATURES)} can be perturbed, got {name!r}")
+            low, high = NUMERICAL_BOUNDS[name]
+            values = perturbation.resolve(getattr(self, name))
+            if values.min() < low or values.max() > high:
+                raise ValueError(f"perturbed {name} values must stay between {low:g} and {high:g}")
+        return self
+
+
+class SensitivityCurve(BaseModel):
+    """Predicted yield as one feature varies and all others keep the record's values."""
+    values: List[float] = Field(..., description="Evaluated values of the feature")
+    yields: List[float] = Field(..., description="Predicted yield in kg/ha at each value")
+    changes: List[float] = Field(..., description="Yield minus base_yield in kg/ha at each value")
+
+
+class SensitivityResponse(BaseModel):
+    """Response schema for sensitivity analysis."""
+    base_yield: float = Field(..., description="Predicted yield of the unperturbed record in kg/ha")
+    curves: Dict[str, SensitivityCurve] = Field(..., description="One curve per perturbed feature")
+
+
+class BatchPredictionRequest(BaseModel):
+    """Request schema for batch yield prediction.
+
+    Records are validated one by one so that a malformed row is reported
+    in its own result instead of rejecting the whole batch.
+    """
+    # Any JSON value: rows that are not objects become per-row errors in validate_records
+    records: List[Any] = Field(
+        ..., min_length=1, max_length=MAX_BATCH_SIZE,
+        description="List of PredictionRequest-shaped records"
+    )
+
+
+class BatchPredictionResult(BaseModel):
+    """Per-record result of a batch prediction."""
+    index: int = Field(..., description="Position of the record in the request")
+    prediction: Optional[PredictionResponse] = Field(None, description="Prediction, if the record was valid")
+    error: Optional[str] = Field(None, description="Error message, if the record was rejected")
+
+
+class BatchPredictionResponse(BaseModel):
+    """Response schema for batch yield prediction."""
+    results: List[BatchPredictionResult]
+    succeeded: int
+    failed: int
+
+
+class BatchQuantileRequest(BatchPredictionRequest):
+    """Request schema for batch quantile prediction; the levels apply to every record."""
+    quantiles: List[float] = Field(
+        default=DEFAULT_QUANTILES, min_length=1, max_length=MAX_QUANTILES,
+        description="Quantile levels between 0 and 1 (default: P10, P50, P90)"
+    )
+    
+    _check_quantiles = field_validator("quantiles")(check_quantile_levels)
+
+
+class BatchQuantileResult(BaseModel):
+    """Per-record result of a batch quantile prediction."""
+    index: int = Field(..., description="Position of the record in the request")
+    prediction: Optional[QuantilePredictionResponse] = Field(None, description="Prediction, if the record was valid")
+    error: Optional[str] = Field(None, description="Error message, if the record was rejected")
+
+
+class BatchQuantileResponse(BaseModel):
+    """Response schema for batch quantile prediction."""
+    results: List[BatchQuantileResult]
+    succeeded: int
+    failed: int
+
+
+class ExplanationResponse(BaseModel):
+    """Response schema for a per-prediction explanation."""
+    predicted_yield: float = Field(..., description="Predicted yield in kg/ha")
+    base_value: float = Field(..., description="Average training yield in kg/ha, the starting point of every explanation")
+    contributions: Dict[str, float] = Field(
+        ..., description="Change in kg/ha attributed to each feature; base_value plus their sum is predicted_yield"
+    )
+
+
+class BatchExplanationResult(BaseModel):
+    """Per-record result of a batch explanation."""
+    index: int = Field(..., description="Position of the record in the request")
+    explanation: Optional[ExplanationResponse] = Field(None, description="Explanation, if the record was valid")
+    error: Optional[str] = Field(None, description="Error message, if the record was rejected")
+
+
+class BatchExplanationResponse(BaseModel):
+    """Response schema for batch explanations."""
+    results: List[BatchExplanationResult]
+    succeeded: int
+    failed: int
 
 
 class ModelInfo(BaseModel):
@@ -78,55 +383,332 @@ class ModelInfo(BaseModel):
     status: str
 
 
-def load_model():
-    """Load the trained model, encoders, and metrics."""
-    global model, encoders, metrics
+@dataclass(frozen=True)
+class ModelBundle:
+    """
+    Immutable set of artifacts that are served together.
+    
+    Handlers read the module-level `bundle` once per request, so a reload
+    that swaps in a new bundle never mixes old and new artifacts, and
+    in-flight requests finish on the bundle they started with.
+    """
+    model: Any = None
+    encoders: Optional[Dict] = None
+    scaler: Any = None
+    metrics: Dict = field(default_factory=lambda: dict(DEFAULT_METRICS))
+    lookup_tables: Optional[Dict[str, Dict[str, int]]] = None
+    # NUMERICAL_FEATURES index of each column the scaler was fitted on
+    scaler_columns: Optional[np.ndarray] = None
+    # (mean, scale) of a StandardScaler in NUMERICAL_FEATURES order; None for other scalers
+    scaling: Optional[Tuple[np.ndarray, np.ndarray]] = None
+    # Per-leaf target histograms for /predict/quantiles (forest models only)
+    quantile_index: Optional[QuantileIndex] = None
+    # Precomputed predictions for /predict/surface, checked against this model
+    yield_surface: Optional[YieldSurface] = None
+    version: int = 0
+    loaded_at: float = 0.0
+    # Predicted yields keyed on the encoded and scaled feature vector; a new
+    # bundle starts with an empty cache
+    cache: LRUCache = field(
+        default_factory=lambda: LRUCache(maxsize=PREDICTION_CACHE_SIZE, ttl=PREDICTION_CACHE_TTL)
+    )
+    # (prediction, base value, contributions) for /explain, keyed the same way
+    explanation_cache: LRUCache = field(
+        default_factory=lambda: LRUCache(maxsize=PREDICTION_CACHE_SIZE, ttl=PREDICTION_CACHE_TTL)
+    )
+
+
+# Currently served artifacts; replaced as a whole, never mutated
+bundle = ModelBundle()
+
+# Serializes reloads (admin endpoint and file watcher)
+reload_lock = threading.Lock()
+
+# Smoke request used to validate a freshly loaded bundle before swapping it in
+SMOKE_REQUEST = {
+    "state": "punjab", "district": "ludhiana", "crop": "wheat", "soil_type": "loamy",
+    "region": "north-india", "season": "rabi"
+}
+
+
+def build_lookup_tables(encoders: Dict) -> Dict[str, Dict[str, int]]:
+    """
+    Build plain dict lookup tables from fitted LabelEncoders.
+
+    A dict lookup is O(1), whereas `value in encoder.classes_` scans the
+    classes array and `encoder.transform` allocates on every call.
+    """
+    return {
+        col: {str(cls): idx for idx, cls in enumerate(encoder.classes_)}
+        for col, encoder in encoders.items()
+        if encoder is not None
+    }
+
+
+def scaler_column_order(scaler) -> Optional[np.ndarray]:
+    """
+    NUMERICAL_FEATURES index of each column `scaler` was fitted on, or None
+    if its columns are not the numerical features.
+
+    train_model_v2.py fits the scaler on a different column order
+    (rainfall, ndvi, soil_moisture, lst, temperature, humidity), so columns
+    are matched by name: feature_names_in_ when the scaler was fitted on a
+    DataFrame, SCALER_FIT_ORDER otherwise.
+    """
+    names = [str(name) for name in getattr(scaler, "feature_names_in_", SCALER_FIT_ORDER)]
+    if sorted(names) != sorted(NUMERICAL_FEATURES):
+        print(f"Warning: Scaler was fitted on {names}, expected {NUMERICAL_FEATURES}")
+        return None
+    return np.array([NUMERICAL_FEATURES.index(name) for name in names])
+
+
+def build_affine_scaling(scaler, columns: Optional[np.ndarray]) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Precompute a fitted StandardScaler as float64 (mean, scale) arrays in
+    NUMERICAL_FEATURES order, so scaling is (x - mean) / scale in place
+    instead of a scaler.transform call with its per-call validation.
+    `columns` is the scaler's column order from scaler_column_order. Returns
+    None for other scalers, which keep going through scaler.transform.
+    """
+    if not isinstance(scaler, StandardScaler) or columns is None:
+        return None
+    mean, scale = np.zeros(len(NUMERICAL_FEATURES)), np.ones(len(NUMERICAL_FEATURES))
+    if scaler.with_mean:
+        mean[columns] = scaler.mean_
+    if scaler.with_std:
+        scale[columns] = scaler.scale_
+    return mean, scale
+
+
+def artifact_paths() -> Dict[str, str]:
+    """
+    Paths of the artifacts to serve.
+    
+    The unsuffixed names above take precedence; when neither model.pkl nor
+    forest/ exists, the `_v2` names train_model_v2.py saves are served as a set.
+    """
+    paths = {"model": MODEL_PATH, "encoders": ENCODERS_PATH, "scaler": SCALER_PATH,
+             "metrics": METRICS_PATH, "forest": FOREST_DIR, "quantile_index": QUANTILE_INDEX_DIR}
+    if os.path.exists(MODEL_PATH) or os.path.isdir(FOREST_DIR):
+        return paths
+    trained = {name: "{0}_v2{1}".format(*os.path.splitext(path)) for name, path in paths.items()}
+    if os.path.exists(trained["model"]) or os.path.isdir(trained["forest"]):
+        return trained
+    return paths
+
+
+def load_bundle(version: int = 0) -> ModelBundle:
+    """Load the trained model, encoders, scaler and metrics into a new bundle."""
+    start = time.perf_counter()
+    model = None
+    encoders = None
+    scaler = None
+    lookup_tables = None
+    scaler_columns = None
+    scaling = None
+    quantile_index = None
+    metrics = dict(DEFAULT_METRICS)
+    paths = artifact_paths()
     
     try:
-        if os.path.exists(MODEL_PATH):
-            model = joblib.load(MODEL_PATH)
-            print(f"Model loaded from {MODEL_PATH}")
+        if os.path.exists(paths["metrics"]):
+            with open(paths["metrics"], 'r') as f:
+                metrics = json.load(f)
+            print(f"Metrics loaded from {paths['metrics']}")
         else:
-            print(f"Warning: Model file not found at {MODEL_PATH}")
+            print(f"Warning: Metrics file not found at {paths['metrics']}")
+            metrics = dict(DEFAULT_METRICS)
+            
+        # A forest export is only valid while the trained model is a random forest
+        serves_forest = metrics.get("model_type", "RandomForestRegressor") == "RandomForestRegressor"
+        if serves_forest and os.path.isdir(paths["forest"]):
+            # Memory-mapped read-only: workers share one page-cache copy of the trees
+            model = FlatForest.load(paths["forest"], mmap_mode='r')
+            print(f"Flattened forest memory-mapped from {paths['forest']}")
+        elif os.path.exists(paths["model"]):
+            model = joblib.load(paths["model"])
+            if isinstance(model, RandomForestRegressor):
+                # Serve through the array-backed engine instead of sklearn's predict
+                model = FlatForest.from_estimator(model)
+            print(f"Model loaded from {paths['model']}")
+        else:
+            print(f"Warning: Model file not found at {paths['model']}")
             model = None
+        
+        if isinstance(model, FlatForest) and os.path.isdir(paths["quantile_index"]):
+            index = QuantileIndex.load(paths["quantile_index"], mmap_mode='r')
+            if index.matches(model):
+                quantile_index = index
+                print(f"Quantile index memory-mapped from {paths['quantile_index']}")
+            else:
+                print(f"Warning: Quantile index in {paths['quantile_index']} was built for a different forest; ignoring it")
             
-        if os.path.exists(ENCODERS_PATH):
-            encoders = joblib.load(ENCODERS_PATH)
-            print(f"Encoders loaded from {ENCODERS_PATH}")
+        if os.path.exists(paths["encoders"]):
+            encoders = joblib.load(paths["encoders"])
+            lookup_tables = build_lookup_tables(encoders)
+            print(f"Encoders loaded from {paths['encoders']}")
         else:
-            print(f"Warning: Encoders file not found at {ENCODERS_PATH}")
+            print(f"Warning: Encoders file not found at {paths['encoders']}")
             encoders = None
+            lookup_tables = None
             
-        if os.path.exists(SCALER_PATH):
-            scaler = joblib.load(SCALER_PATH)
-            print(f"Scaler loaded from {SCALER_PATH}")
+        if os.path.exists(paths["scaler"]):
+            scaler = joblib.load(paths["scaler"])
+            scaler_columns = scaler_column_order(scaler)
+            scaling = build_affine_scaling(scaler, scaler_columns)
+            print(f"Scaler loaded from {paths['scaler']}")
         else:
-            print(f"Warning: Scaler file not found at {SCALER_PATH}")
+            print(f"Warning: Scaler file not found at {paths['scaler']}")
             scaler = None
             
-        if os.path.exists(METRICS_PATH):
-            with open(METRICS_PATH, 'r') as f:
-                metrics = json.load(f)
-            print(f"Metrics loaded from {METRICS_PATH}")
-        else:
-            print(f"Warning: Metrics file not found at {METRICS_PATH}")
-            metrics = {"r2_score": 0.85, "mae": 250.0, "rmse": 320.0}
-            
     except Exception as e:
         print(f"Error loading model: {e}")
         model = None
         encoders = None
-        metrics = {"r2_score": 0.85, "mae": 250.0, "rmse": 320.0}
+        scaler = None
+        lookup_tables = None
+        scaler_columns = None
+        scaling = None
+        quantile_index = None
+        metrics = dict(DEFAULT_METRICS)
+    
+    loaded = ModelBundle(
+        model=model,
+        encoders=encoders,
+        scaler=scaler,
+        metrics=metrics,
+        lookup_tables=lookup_tables,
+        scaler_columns=scaler_columns,
+        scaling=scaling,
+        quantile_index=quantile_index,
+        version=version,
+        loaded_at=time.time()
+    )
+    if model is not None and encoders is not None and os.path.isdir(YIELD_SURFACE_DIR):
+        loaded = replace(loaded, yield_surface=load_yield_surface(loaded))
+    MODEL_LOAD_SECONDS.set(time.perf_counter() - start)
+    return loaded
+
+
+def load_yield_surface(b: ModelBundle) -> Optional[YieldSurface]:
+    """Load model/yield_surface/ if re-scoring a sample of its cells with bundle `b` reproduces them."""
+    try:
+        surface = YieldSurface.load(YIELD_SURFACE_DIR, mmap_mode='r')
+        if surface.matches(lambda categorical, numerical: score_columns(categorical, numerical, b)):
+            print(f"Yield surface memory-mapped from {YIELD_SURFACE_DIR} ({len(surface.combinations)} combinations)")
+            return surface
+        print(f"Warning: Yield surface in {YIELD_SURFACE_DIR} was built for a different model; ignoring it")
+    except Exception as e:
+        print(f"Warning: Could not load yield surface from {YIELD_SURFACE_DIR}: {e}")
+    return None
+
+
+def load_model():
+    """Load the artifacts from MODEL_DIR and serve them."""
+    global bundle
+    bundle = load_bundle(version=bundle.version + 1)
+    MODEL_VERSION.set(bundle.version)
+    MODEL_LOADED_AT.set(bundle.loaded_at)
+
+
+def validate_bundle(candidate: ModelBundle):
+    """Raise if a freshly loaded bundle cannot serve a smoke prediction."""
+    if candidate.model is None or candidate.encoders is None:
+        raise RuntimeError("model or encoders failed to load")
+    X = encode_batch([PredictionRequest(**SMOKE_REQUEST)], candidate)
+    predicted = candidate.model.predict(X)
+    if predicted.shape != (1,) or not np.isfinite(predicted).all():
+        raise RuntimeError(f"smoke prediction returned {predicted!r}")
+
+
+def reload_model() -> ModelBundle:
+    """
+    Load new artifacts, validate them, and atomically swap them in.
+    
+    The current bundle keeps serving while the new one loads; if loading or
+    validation fails, it stays in place and the error is raised.
+    """
+    global bundle
+    with reload_lock:
+        candidate = load_bundle(version=bundle.version + 1)
+        validate_bundle(candidate)
+        # A single reference assignment: requests see either the old or the new bundle
+        bundle = candidate
+        MODEL_VERSION.set(candidate.version)
+        MODEL_LOADED_AT.set(candidate.loaded_at)
+        print(f"Model reloaded (version {candidate.version})")
+        return candidate
+
+
+def model_dir_signature() -> tuple:
+    """Modification times and sizes of the artifacts, used to detect a retrained model."""
+    signature = []
+    paths = artifact_paths()
+    for path in [paths["model"], paths["encoders"], paths["scaler"], paths["metrics"],
+                 os.path.join(paths["forest"], "meta.json"), os.path.join(paths["quantile_index"], "meta.json"),
+                 os.path.join(YIELD_SURFACE_DIR, "meta.json")]:
+        try:
+            stat = os.stat(path)
+            signature.append((path, stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            signature.append((path, None, None))
+    return tuple(signature)
+
+
+async def watch_model_dir(interval: float):
+    """Reload the model when the artifacts in MODEL_DIR change and then stay unchanged for one interval."""
+    loop = asyncio.get_running_loop()
+    served = model_dir_signature()
+    pending = None
+    while True:
+        await asyncio.sleep(interval)
+        current = model_dir_signature()
+        if current == served:
+            pending = None
+            continue
+        if current != pending:
+            # Still being written; wait for the files to settle
+            pending = current
+            continue
+        try:
+            await loop.run_in_executor(None, reload_model)
+        except Exception as e:
+            print(f"Model reload failed, keeping version {bundle.version}: {e}")
+        served = current
+        pending = None
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifecycle manager for the FastAPI app."""
+    global predict_executor
+    
     # Startup
-    load_model()
+    if not model_preloaded:
+        load_model()
+    # Threads do not survive fork(), so each worker creates its own pool
+    predict_executor = ThreadPoolExecutor(max_workers=PREDICT_POOL_SIZE, thread_name_prefix="predict")
+    watcher = asyncio.create_task(watch_model_dir(MODEL_WATCH_INTERVAL)) if MODEL_WATCH_INTERVAL > 0 else None
     yield
     # Shutdown
-    pass
+    if watcher is not None:
+        watcher.cancel()
+    predict_executor.shutdown(wait=True)
+    predict_executor = None
+
+
+async def run_in_predict_pool(func: Callable, *args):
+    """Run CPU-bound prediction work on the bounded pool so /health and other requests stay responsive."""
+    mark_submitted()
+    try:
+        if predict_executor is None:
+            return func(*args)
+        loop = asyncio.get_running_loop()
+        # Run in a copy of the request's context so the work can record its stage times
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(predict_executor, functools.partial(context.run, func, *args))
+    finally:
+        mark_completed()
 
 
 # Create FastAPI app
@@ -146,31 +728,73 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Added last so it wraps everything else and times the whole request
+app.add_middleware(MetricsMiddleware)
+
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
+    current = bundle
     return {
         "status": "healthy",
-        "model_loaded": model is not None,
-        "status": "healthy",
-        "model_loaded": model is not None,
-        "encoders_loaded": encoders is not None,
-        "scaler_loaded": scaler is not None
+        "model_loaded": current.model is not None,
+        "encoders_loaded": current.encoders is not None,
+        "scaler_loaded": current.scaler is not None,
+        "model_version": current.version
+    }
+
+
+@app.post("/admin/reload")
+async def admin_reload(x_admin_token: Optional[str] = Header(None)):
+    """
+    Load retrained artifacts from MODEL_DIR and swap them in without a restart.
+    
+    Requests already in progress finish on the previous model. Only this
+    worker reloads; set MODEL_WATCH_INTERVAL to have every worker follow
+    changes on disk.
+    """
+    if ADMIN_TOKEN and x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+    
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
+    try:
+        reloaded = await loop.run_in_executor(None, reload_model)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Reload failed, previous model still active: {e}")
+    
+    return {
+        "status": "reloaded",
+        "model_version": reloaded.version,
+        "load_seconds": round(time.perf_counter() - start, 3)
     }
 
 
 @app.get("/model-info", response_model=ModelInfo)
 async def get_model_info():
     """Get information about the current model."""
+    current = bundle
     return ModelInfo(
-        model_type="RandomForestRegressor",
+        model_type=current.metrics.get("model_type", "RandomForestRegressor"),
         features=["crop", "soil_type", "region", "season", "rainfall", "temperature", "humidity", "ndvi", "soil_moisture", "lst"],
-        metrics=metrics or {},
-        status="active" if model is not None else "not_loaded"
+        metrics=current.metrics or {},
+        status="active" if current.model is not None else "not_loaded"
     )
 
 
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Operational metrics of this worker in the Prometheus text format."""
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Prediction cache size and hit/miss counters for the current model."""
+    return bundle.cache.stats()
+
+
 @app.post("/predict", response_model=PredictionResponse)
 async def predict_yield(request: PredictionRequest):
     """
@@ -178,83 +802,92 @@ async def predict_yield(request: PredictionRequest):
     
     Returns the predicted yield in kg/ha along with confidence and model accuracy metrics.
     """
+    return await run_in_predict_pool(predict_single, request, bundle)
+
+
+def predict_single(request: PredictionRequest, b: ModelBundle) -> PredictionResponse:
+    """Score one request with bundle `b`, falling back to heuristics on failure."""
+    model, metrics, lookup_tables = b.model, b.metrics, b.lookup_tables
+    
     # If model is not loaded, use fallback prediction
-    if model is None or encoders is None:
+    if model is None or b.encoders is None:
+        FALLBACKS.labels("model_not_loaded").inc()
         return fallback_prediction(request)
     
     try:
-        # Prepare features aligned with train_model_v2.py 'Golden List'
+        start = time.perf_counter()
+        # Features are written straight into this thread's preallocated row,
+        # aligned with train_model_v2.py 'Golden List'
         # Order: state, district, crop, season, soil_type (Categorical)
         #        rainfall, temperature, humidity, ndvi, soil_moisture, lst (Numerical)
+        X = feature_row()
         
-        categorical_features = []
-        for col in ['state', 'district', 'crop', 'season', 'soil_type']:
-            encoder = encoders.get(col)
-            value = getattr(request, col).lower().strip()
+        for j, col in enumerate(CATEGORICAL_FEATURES):
+            table = lookup_tables.get(col)
             
-            if encoder is None:
+            if table is None:
                 # Handle missing encoder gracefully (e.g. soil_type might be simulated)
                 print(f"Warning: Encoder for {col} not found. Using 0.")
-                categorical_features.append(0)
+                FALLBACKS.labels("missing_encoder").inc()
+                X[0, j] = 0
                 continue
-                
-            if value in encoder.classes_:
-                encoded = encoder.transform([value])[0]
-            else:
-                encoded = 0 # Unknown category fallback
-            categorical_features.append(encoded)
+            
+            # Unknown category fallback is 0
+            code = table.get(getattr(request, col).lower().strip())
+            if code is None:
+                UNKNOWN_CATEGORIES.labels(col).inc()
+                code = 0
+            X[0, j] = code
+        encoded = time.perf_counter()
+        record_stage("encoding", encoded - start)
 
         # Numerical Features
-        numerical_features = [
-            request.rainfall, 
-            request.temperature, 
+        numerical = X[:, len(CATEGORICAL_FEATURES):]
+        numerical[0] = (
+            request.rainfall,
+            request.temperature,
             request.humidity,
             request.ndvi,
             request.soil_moisture,
             request.lst
-        ]
-        
-        # Scale numerical features
-        if scaler:
-            try:
-                # Scaler expects 2D array: (n_samples, n_features)
-                nums_scaled = scaler.transform([numerical_features])[0]
-                features = categorical_features + nums_scaled.tolist()
-            except Exception as e:
-                print(f"Scaling failed: {e}. Using raw features.")
-                features = categorical_features + numerical_features
-        else:
-            features = categorical_features + numerical_features
-        
-        # Make prediction
-        X = np.array(features).reshape(1, -1)
-        
-        # If scaler exists and shape matches, transform
-        if scaler:
-            try:
-                # We need to construct the full vector expected by scaler
-                # This depends on how train_model_v2 saved it. 
-                # Let's assumes we just pass to model for now as RandomForest handles unscaled reasonably well
-                # unless specifically trained on scaled.
-                # However, the user asked for ACCURATE integration.
-                pass
-            except:
-                pass
+        )
+        try:
+            scale_numerical(numerical, b)
+        except Exception as e:
+            print(f"Scaling failed: {e}. Using raw features.")
+            FALLBACKS.labels("scaling_error").inc()
+        record_stage("scaling", time.perf_counter() - encoded)
 
-        predicted_yield = model.predict(X)[0]
-        
-        # Calculate confidence based on feature importance and input validity
-        base_confidence = 85.0
+        # Repeat requests with the same encoded features skip the model; tobytes()
+        # copies, so the key does not alias the reused row
+        cache_key = X.tobytes()
+        cached = b.cache.get(cache_key)
+        if cached is None:
+            inference_start = time.perf_counter()
+            mean, lower, upper = estimate(model, X)
+            record_stage("inference", time.perf_counter() - inference_start)
+            cached = (float(mean[0]), float(lower[0]), float(upper[0]))
+            b.cache.put(cache_key, cached)
+        predicted_yield, lower, upper = cached
         
-        # Adjust confidence based on input ranges
-        if request.rainfall < 50 or request.rainfall > 400:
-            base_confidence -= 5
-        if request.temperature < 10 or request.temperature > 45:
-            base_confidence -= 5
-        if request.humidity < 20 or request.humidity > 95:
-            base_confidence -= 3
+        if np.isnan(lower):
+            # No per-tree spread for this model: fall back to input-range heuristics
+            base_confidence = 85.0
             
-        confidence = min(95.0, max(60.0, base_confidence + np.random.uniform(-5, 10)))
+            # Adjust confidence based on input ranges
+            if request.rainfall < 50 or request.rainfall > 400:
+                base_confidence -= 5
+            if request.temperature < 10 or request.temperature > 45:
+                base_confidence -= 5
+            if request.humidity < 20 or request.humidity > 95:
+                base_confidence -= 3
+                
+            # Deterministic, so identical requests get identical responses
+            confidence = min(95.0, max(60.0, base_confidence))
+            interval = None
+        else:
+            confidence = float(interval_confidence(predicted_yield, lower, upper))
+            interval = PredictionInterval(lower=round(lower, 2), upper=round(upper, 2))
         
         return PredictionResponse(
             predicted_yield=round(predicted_yield, 2),
@@ -263,14 +896,574 @@ async def predict_yield(request: PredictionRequest):
                 "r2_score": metrics.get("r2_score", 0.85),
                 "mae": metrics.get("mae", 250.0),
                 "rmse": metrics.get("rmse", 320.0)
-            }
+            },
+            prediction_interval=interval
         )
         
     except Exception as e:
         print(f"Prediction error: {e}")
+        FALLBACKS.labels("prediction_error").inc()
         return fallback_prediction(request)
 
 
+@app.post("/predict/batch", response_model=BatchPredictionResponse)
+async def predict_yield_batch(batch: BatchPredictionRequest):
+    """
+    Predict crop yield for many records in one call.
+
+    All valid records are encoded and scaled as arrays and scored with a
+    single model.predict call. Results are returned in request order; invalid
+    records carry an error message instead of a prediction.
+    """
+    results: List[Optional[BatchPredictionResult]] = [None] * len(batch.records)
+    valid_indices, valid_requests, errors = validate_records(batch.records)
+    for i, message in errors.items():
+        results[i] = BatchPredictionResult(index=i, error=message)
+    
+    predictions, failures = await run_in_predict_pool(predict_batch, valid_requests, bundle)
+    for j, (i, prediction) in enumerate(zip(valid_indices, predictions)):
+        if j in failures:
+            results[i] = BatchPredictionResult(index=i, error=failures[j])
+        else:
+            results[i] = BatchPredictionResult(index=i, prediction=prediction)
+    
+    succeeded = len(valid_indices) - len(failures)
+    return BatchPredictionResponse(results=results, succeeded=succeeded, failed=len(batch.records) - succeeded)
+
+
+# Names of the JSON types a batch row can arrive as, for per-row error messages
+JSON_TYPE_NAMES = {str: "string", list: "array", bool: "boolean", int: "number", float: "number", type(None): "null"}
+
+
+def validate_records(records: List[Any]) -> Tuple[List[int], List[PredictionRequest], Dict[int, str]]:
+    """Validate batch records one by one: (valid indices, valid requests, {index: error message})."""
+    BATCH_SIZE.observe(len(records))
+    valid_indices = []
+    valid_requests = []
+    errors = {}
+    
+    for i, record in enumerate(records):
+        if not isinstance(record, dict):
+            errors[i] = f"record must be a JSON object, got {JSON_TYPE_NAMES.get(type(record), type(record).__name__)}"
+            continue
+        try:
+            valid_requests.append(PredictionRequest.model_validate(record))
+            valid_indices.append(i)
+        except ValidationError as e:
+            errors[i] = "; ".join(
+                f"{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}" for err in e.errors()
+            )
+    
+    if errors:
+        BATCH_INVALID_RECORDS.inc(len(errors))
+    return valid_indices, valid_requests, errors
+
+
+@app.post("/explain", response_model=ExplanationResponse)
+async def explain_prediction(request: PredictionRequest):
+    """
+    Explain a prediction as per-feature contributions in kg/ha.
+    
+    Contributions come from the decision paths the record takes through each
+    tree of the forest, computed on the flattened arrays in the same pass as
+    the prediction. Available for forest models only.
+    """
+    current = bundle
+    if not isinstance(current.model, FlatForest):
+        raise HTTPException(status_code=503, detail="Explanations need a random forest model")
+    explanations = await run_in_predict_pool(explain_batch, [request], current)
+    return explanations[0]
+
+
+@app.post("/explain/batch", response_model=BatchExplanationResponse)
+async def explain_prediction_batch(batch: BatchPredictionRequest):
+    """
+    Explain many predictions with one traversal of the forest.
+    
+    Invalid records carry an error message instead of an explanation.
+    """
+    current = bundle
+    if not isinstance(current.model, FlatForest):
+        raise HTTPException(status_code=503, detail="Explanations need a random forest model")
+    
+    results: List[Optional[BatchExplanationResult]] = [None] * len(batch.records)
+    valid_indices, valid_requests, errors = validate_records(batch.records)
+    for i, message in errors.items():
+        results[i] = BatchExplanationResult(index=i, error=message)
+    
+    explanations = await run_in_predict_pool(explain_batch, valid_requests, current)
+    for i, explanation in zip(valid_indices, explanations):
+        results[i] = BatchExplanationResult(index=i, explanation=explanation)
+    
+    return BatchExplanationResponse(results=results, succeeded=len(valid_indices), failed=len(errors))
+
+
+def explain_batch(requests: List[PredictionRequest], b: ModelBundle) -> List[ExplanationResponse]:
+    """
+    Explain requests with bundle `b`.
+    
+    Rows found in the explanation cache are left out of the forest traversal.
+    """
+    if not requests:
+        return []
+    
+    X = encode_batch(requests, b)
+    keys = [row.tobytes() for row in X]
+    explained = [b.explanation_cache.get(key) for key in keys]
+    misses = [i for i, cached in enumerate(explained) if cached is None]
+    
+    if misses:
+        start = time.perf_counter()
+        predicted, bias, contributions = b.model.explain(X[misses])
+        record_stage("inference", time.perf_counter() - start)
+        for j, i in enumerate(misses):
+            explained[i] = (float(predicted[j]), float(bias[j]), tuple(contributions[j].tolist()))
+            b.explanation_cache.put(keys[i], explained[i])
+    
+    feature_names = CATEGORICAL_FEATURES + NUMERICAL_FEATURES
+    return [
+        ExplanationResponse(
+            predicted_yield=round(predicted, 2),
+            base_value=round(bias, 2),
+            contributions={name: round(value, 2) for name, value in zip(feature_names, contributions)}
+        )
+        for predicted, bias, contributions in explained
+    ]
+
+
+@app.post("/predict/quantiles", response_model=QuantilePredictionResponse)
+async def predict_yield_quantiles(request: QuantilePredictionRequest):
+    """
+    Predict yield quantiles (P10/P50/P90 by default) with the quantile forest index.
+    
+    Available when the served model is a forest with a matching index in
+    model/quantile_index/ (train with `train_model_v2.py --quantiles`).
+    """
+    current = bundle
+    if current.quantile_index is None:
+        raise HTTPException(status_code=503, detail="Quantile index not loaded")
+    predictions = await run_in_predict_pool(predict_quantiles, [request], request.quantiles, current)
+    return predictions[0]
+
+
+@app.post("/predict/quantiles/batch", response_model=BatchQuantileResponse)
+async def predict_yield_quantiles_batch(batch: BatchQuantileRequest):
+    """
+    Predict yield quantiles for many records with one traversal of the forest.
+    
+    The requested levels apply to every record; invalid records carry an
+    error message instead of a prediction.
+    """
+    current = bundle
+    if current.quantile_index is None:
+        raise HTTPException(status_code=503, detail="Quantile index not loaded")
+    
+    results: List[Optional[BatchQuantileResult]] = [None] * len(batch.records)
+    valid_indices, valid_requests, errors = validate_records(batch.records)
+    for i, message in errors.items():
+        results[i] = BatchQuantileResult(index=i, error=message)
+    
+    predictions = await run_in_predict_pool(predict_quantiles, valid_requests, batch.quantiles, current)
+    for i, prediction in zip(valid_indices, predictions):
+        results[i] = BatchQuantileResult(index=i, prediction=prediction)
+    
+    return BatchQuantileResponse(results=results, succeeded=len(valid_indices), failed=len(errors))
+
+
+def predict_quantiles(requests: List[PredictionRequest], levels: List[float], b: ModelBundle) -> List[QuantilePredictionResponse]:
+    """Score requests with bundle `b`: the forest mean and quantiles come from one apply() pass."""
+    if not requests:
+        return []
+    
+    X = encode_batch(requests, b)
+    start = time.perf_counter()
+    leaves = b.model.apply(X)
+    predicted = b.model.predict_leaves(leaves)
+    quantiles = b.quantile_index.quantiles_from_leaves(leaves, levels)
+    record_stage("inference", time.perf_counter() - start)
+    
+    keys = [f"p{q * 100:g}" for q in levels]
+    model_accuracy = {
+        "r2_score": b.metrics.get("r2_score", 0.85),
+        "mae": b.metrics.get("mae", 250.0),
+        "rmse": b.metrics.get("rmse", 320.0)
+    }
+    return [
+        QuantilePredictionResponse(
+            predicted_yield=round(float(y), 2),
+            quantiles={key: round(float(v), 2) for key, v in zip(keys, row)},
+            model_accuracy=dict(model_accuracy)
+        )
+        for y, row in zip(predicted, quantiles)
+    ]
+
+
+@app.post("/predict/surface", response_model=SurfaceResponse)
+async def predict_yield_surface(request: SurfaceRequest):
+    """
+    Predict yield at one point, along one swept feature, or over a grid of two.
+    
+    Combinations precomputed in model/yield_surface/ (see yield_surface.py)
+    are interpolated in-process without a model call. Other combinations,
+    points outside the grid and non-default ndvi/soil_moisture/lst are
+    scored by the model, with all points in one call.
+    """
+    current = bundle
+    if current.model is None or current.encoders is None:
+        raise HTTPException(status_code=503, detail="Model not loaded")
+    
+    axes = sweep_axes(request, current)
+    query = surface_query(request, axes, current)
+    if query is not None:
+        # Timed like run_in_predict_pool, which the model path below goes through instead
+        mark_submitted()
+        start = time.perf_counter()
+        try:
+            yields = current.yield_surface.interpolate(*query)
+        finally:
+            mark_completed()
+        record_stage("inference", time.perf_counter() - start)
+        source = "surface"
+    else:
+        yields = await run_in_predict_pool(score_variations, request, grid_points(axes), current)
+        source = "model"
+    SURFACE_QUERIES.labels(source).inc()
+    
+    shape = tuple(len(values) for values in axes.values())
+    return SurfaceResponse(
+        axes={name: values.tolist() for name, values in axes.items()},
+        yields=np.round(np.asarray(yields).reshape(shape), 2).tolist(),
+        source=source
+    )
+
+
+@app.post("/predict/sensitivity", response_model=SensitivityResponse)
+async def predict_yield_sensitivity(request: SensitivityRequest):
+    """
+    Yield response curves around one record, e.g. for ±10% rainfall or +2 °C.
+    
+    Each perturbed feature is varied on its own while the others keep the
+    record's values. The record and all curve points are scored together:
+    one encoding, one scaling pass and one model call.
+    """
+    current = bundle
+    if current.model is None or current.encoders is None:
+        raise HTTPException(status_code=503, detail="Model not loaded")
+    return await run_in_predict_pool(predict_sensitivity, request, current)
+
+
+def predict_sensitivity(request: SensitivityRequest, b: ModelBundle) -> SensitivityResponse:
+    """Stack the base record and every curve point into one perturbation matrix and score it with bundle `b`."""
+    curve_values = {
+        name: perturbation.resolve(getattr(request, name))
+        for name, perturbation in request.perturbations.items()
+    }
+    # Row 0 is the unperturbed record; each curve owns the block of rows after it
+    n = 1 + sum(len(values) for values in curve_values.values())
+    variations = {name: np.full(n, getattr(request, name), dtype=np.float64) for name in curve_values}
+    blocks = {}
+    start = 1
+    for name, values in curve_values.items():
+        variations[name][start:start + len(values)] = values
+        blocks[name] = slice(start, start + len(values))
+        start += len(values)
+    
+    predicted = score_variations(request, variations, b)
+    base_yield = float(predicted[0])
+    return SensitivityResponse(
+        base_yield=round(base_yield, 2),
+        curves={
+            name: SensitivityCurve(
+                values=curve_values[name].tolist(),
+                yields=np.round(predicted[block], 2).tolist(),
+                changes=np.round(predicted[block] - base_yield, 2).tolist()
+            )
+            for name, block in blocks.items()
+        }
+    )
+
+
+def sweep_axes(request: SurfaceRequest, b: ModelBundle) -> Dict[str, np.ndarray]:
+    """Values of each swept feature; an empty list stands for the surface's (or the default) grid points."""
+    grid = b.yield_surface.axes if b.yield_surface is not None else default_axes()
+    return {
+        name: np.asarray(values, dtype=np.float64) if values else grid[name]
+        for name, values in request.sweep.items()
+    }
+
+
+def surface_query(request: PredictionRequest, axes: Dict[str, np.ndarray],
+                  b: ModelBundle) -> Optional[Tuple[int, Dict[str, np.ndarray]]]:
+    """
+    (row, numerical) arguments of b.yield_surface.interpolate for the grid
+    points of `axes`, or None if the yield surface does not cover the query.
+    """
+    surface = b.yield_surface
+    if surface is None:
+        return None
+    row = surface.row([getattr(request, col) for col in COMBINATION_FEATURES])
+    if row is None:
+        return None
+    
+    points = grid_points(axes)
+    numerical = {col: points.get(col, getattr(request, col)) for col in NUMERICAL_FEATURES}
+    if not surface.covers(numerical):
+        return None
+    return row, numerical
+
+
+def score_variations(request: PredictionRequest, variations: Dict[str, np.ndarray], b: ModelBundle) -> np.ndarray:
+    """
+    Predict yields for copies of `request` with some numerical features
+    replaced, given as one equal-length column per feature.
+    
+    The categories are encoded once and broadcast to every row, the
+    numerical block is scaled in one pass and the model is called once.
+    """
+    n = len(next(iter(variations.values()))) if variations else 1
+    X = np.repeat(encode_batch([request], b), n, axis=0)
+    
+    start = time.perf_counter()
+    numerical = X[:, len(CATEGORICAL_FEATURES):]
+    numerical[:] = [getattr(request, col) for col in NUMERICAL_FEATURES]
+    for col, values in variations.items():
+        numerical[:, NUMERICAL_FEATURES.index(col)] = values
+    try:
+        scale_numerical(numerical, b)
+    except Exception as e:
+        print(f"Scaling failed: {e}. Using raw features.")
+        FALLBACKS.labels("scaling_error").inc(n)
+    inference_start = time.perf_counter()
+    record_stage("scaling", inference_start - start)
+    
+    predicted = estimate(b.model, X)[0]
+    record_stage("inference", time.perf_counter() - inference_start)
+    return predicted
+
+
+def encode_batch(requests: List[PredictionRequest], b: ModelBundle) -> np.ndarray:
+    """
+    Encode and scale a list of requests into an (N, 11) feature matrix using bundle `b`.
+
+    Column order matches train_model_v2.py: the five categorical features
+    followed by the six numerical features.
+    """
+    categorical = {col: [getattr(r, col) for r in requests] for col in CATEGORICAL_FEATURES}
+    numerical = np.array([[getattr(r, col) for col in NUMERICAL_FEATURES] for r in requests], dtype=np.float64)
+    return encode_columns(categorical, numerical, b)
+
+
+def encode_columns(categorical: Dict[str, Sequence[str]], numerical: np.ndarray, b: ModelBundle) -> np.ndarray:
+    """
+    Encode raw categorical columns and scale an (N, 6) numerical array into an (N, 11) feature matrix.
+    
+    Shared by the HTTP batch path and the offline bulk scorer so both apply
+    exactly the same normalization, unknown-category fallback and scaling.
+    """
+    start = time.perf_counter()
+    n = len(numerical)
+    X = np.zeros((n, len(CATEGORICAL_FEATURES) + len(NUMERICAL_FEATURES)), dtype=np.float64)
+    
+    for j, col in enumerate(CATEGORICAL_FEATURES):
+        table = b.lookup_tables.get(col)
+        if table is None:
+            print(f"Warning: Encoder for {col} not found. Using 0.")
+            FALLBACKS.labels("missing_encoder").inc(n)
+            continue
+        
+        # Unknown categories map to the 0 fallback
+        X[:, j] = np.fromiter(
+            (table.get(value.lower().strip(), -1) for value in categorical[col]),
+            dtype=np.float64, count=n
+        )
+        unknown = X[:, j] < 0
+        if unknown.any():
+            UNKNOWN_CATEGORIES.labels(col).inc(int(unknown.sum()))
+            X[unknown, j] = 0
+    encoded = time.perf_counter()
+    record_stage("encoding", encoded - start)
+    
+    X[:, len(CATEGORICAL_FEATURES):] = numerical
+    try:
+        scale_numerical(X[:, len(CATEGORICAL_FEATURES):], b)
+    except Exception as e:
+        print(f"Scaling failed: {e}. Using raw features.")
+        FALLBACKS.labels("scaling_error").inc(n)
+    record_stage("scaling", time.perf_counter() - encoded)
+    
+    return X
+
+
+def score_columns(categorical: Dict[str, Sequence[str]], numerical: Dict[str, np.ndarray], b: ModelBundle) -> np.ndarray:
+    """Predict yields for raw categorical columns and one array per numerical feature (used to build the yield surface)."""
+    X = encode_columns(categorical, np.column_stack([numerical[col] for col in NUMERICAL_FEATURES]), b)
+    return b.model.predict(X)
+
+
+def scale_numerical(numerical: np.ndarray, b: ModelBundle):
+    """
+    Scale an (N, 6) float64 view of the numerical columns in place with bundle `b`.
+    
+    A StandardScaler is applied as its precomputed affine transform, which
+    gives the same values as scaler.transform without the copy and input
+    validation; other scalers fall back to scaler.transform on the columns
+    reordered to the scaler's fit order. Raises if the scaler rejects the
+    input or its columns are not the numerical features, leaving the values
+    unscaled.
+    """
+    if b.scaling is not None:
+        mean, scale = b.scaling
+        numerical -= mean
+        numerical /= scale
+    elif b.scaler:
+        if b.scaler_columns is None:
+            raise ValueError("scaler columns do not match the numerical features")
+        numerical[:, b.scaler_columns] = b.scaler.transform(numerical[:, b.scaler_columns])
+
+
+# One (1, 11) row per thread for predict_single, which runs on the predict
+# pool threads; every call overwrites all of it before use
+_feature_rows = threading.local()
+
+
+def feature_row() -> np.ndarray:
+    """Return this thread's reusable float64 feature row."""
+    row = getattr(_feature_rows, "row", None)
+    if row is None:
+        row = _feature_rows.row = np.empty((1, len(CATEGORICAL_FEATURES) + len(NUMERICAL_FEATURES)))
+    return row
+
+
+def estimate(model, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Return (prediction, lower, upper) for each row of X.
+    
+    Forests get the P10/P90 band of their trees from the same traversal that
+    produces the mean. With skewed tree outputs the mean can fall outside that
+    band, so the band is widened to contain it. Other models have no per-tree
+    spread; their bounds are NaN.
+    """
+    if isinstance(model, FlatForest):
+        predicted, lower, upper = model.predict_interval(X, INTERVAL_PERCENTILES)
+        return predicted, np.minimum(lower, predicted), np.maximum(upper, predicted)
+    # Inputs are range-checked by the request models, so sklearn's finiteness scan is redundant
+    with config_context(assume_finite=True):
+        predicted = model.predict(X)
+    missing = np.full(len(predicted), np.nan)
+    return predicted, missing, missing
+
+
+def interval_confidence(predicted, lower, upper):
+    """
+    Confidence percentage from the tree spread: 100 / (1 + r), where r is the
+    band's half-width relative to the prediction. A ±10% band gives ~91,
+    ±25% gives 80 and ±100% gives 50.
+    """
+    half_width = (np.asarray(upper) - np.asarray(lower)) / 2
+    return 100.0 / (1.0 + half_width / np.maximum(np.abs(predicted), 1.0))
+
+
+def batch_confidence(requests: List[PredictionRequest]) -> np.ndarray:
+    """Vectorized version of the per-request confidence heuristic in predict_single."""
+    rainfall = np.array([r.rainfall for r in requests])
+    temperature = np.array([r.temperature for r in requests])
+    humidity = np.array([r.humidity for r in requests])
+    
+    base_confidence = np.full(len(requests), 85.0)
+    base_confidence -= 5 * ((rainfall < 50) | (rainfall > 400))
+    base_confidence -= 5 * ((temperature < 10) | (temperature > 45))
+    base_confidence -= 3 * ((humidity < 20) | (humidity > 95))
+    
+    return np.clip(base_confidence, 60.0, 95.0)
+
+
+def predict_batch(requests: List[PredictionRequest],
+                  b: ModelBundle) -> Tuple[List[Optional[PredictionResponse]], Dict[int, str]]:
+    """
+    Score validated requests with one model.predict call on an (N, 11) matrix.
+    
+    Rows found in the prediction cache are left out of the model call. If the
+    vectorized path fails, the rows are retried one at a time, so one bad row
+    does not cost the others their predictions.
+    Returns: (predictions, {index: error message}); failed rows predict None
+    """
+    if not requests:
+        return [], {}
+    
+    if b.model is None or b.encoders is None:
+        FALLBACKS.labels("model_not_loaded").inc(len(requests))
+        return [fallback_prediction(r) for r in requests], {}
+    
+    # Columns: prediction, lower, upper
+    estimates = np.empty((len(requests), 3), dtype=np.float64)
+    errors = {}
+    try:
+        X = encode_batch(requests, b)
+        keys = [row.tobytes() for row in X]
+        misses = []
+        for i, key in enumerate(keys):
+            cached = b.cache.get(key)
+            if cached is None:
+                misses.append(i)
+            else:
+                estimates[i] = cached
+        
+        if misses:
+            start = time.perf_counter()
+            estimates[misses] = np.column_stack(estimate(b.model, X[misses]))
+            record_stage("inference", time.perf_counter() - start)
+            for i in misses:
+                b.cache.put(keys[i], tuple(float(v) for v in estimates[i]))
+    except Exception as e:
+        print(f"Batch prediction error: {e}. Retrying {len(requests)} rows one at a time.")
+        errors = predict_rows_individually(requests, b, estimates)
+    
+    if errors:
+        BATCH_FAILED_RECORDS.inc(len(errors))
+    ok = np.array([i not in errors for i in range(len(requests))])
+    predicted, lower, upper = np.where(ok[:, None], estimates, np.nan).T
+    has_interval = ~np.isnan(lower)
+    confidence = np.where(
+        has_interval,
+        interval_confidence(predicted, np.where(has_interval, lower, 0), np.where(has_interval, upper, 0)),
+        batch_confidence(requests)
+    )
+    model_accuracy = {
+        "r2_score": b.metrics.get("r2_score", 0.85),
+        "mae": b.metrics.get("mae", 250.0),
+        "rmse": b.metrics.get("rmse", 320.0)
+    }
+    
+    predictions = [
+        PredictionResponse(
+            predicted_yield=round(float(y), 2),
+            confidence=round(float(c), 1),
+            model_accuracy=dict(model_accuracy),
+            prediction_interval=PredictionInterval(lower=round(float(lo), 2), upper=round(float(hi), 2)) if has else None
+        ) if row_ok else None
+        for y, c, lo, hi, has, row_ok in zip(predicted, confidence, lower, upper, has_interval, ok)
+    ]
+    return predictions, errors
+
+
+def predict_rows_individually(requests: List[PredictionRequest], b: ModelBundle,
+                              estimates: np.ndarray) -> Dict[int, str]:
+    """Fill `estimates` row by row after the vectorized path failed: {index: error message} of rows that fail alone."""
+    errors = {}
+    for i, request in enumerate(requests):
+        try:
+            x = encode_batch([request], b)
+            key = x[0].tobytes()
+            cached = b.cache.get(key)
+            if cached is None:
+                cached = tuple(float(v[0]) for v in estimate(b.model, x))
+                b.cache.put(key, cached)
+            estimates[i] = cached
+        except Exception as e:
+            errors[i] = f"prediction failed: {e}"
+    return errors
+
+
 def fallback_prediction(request: PredictionRequest) -> PredictionResponse:
     """Generate a fallback prediction when the model is not available."""
     # Base yields for different crops (kg/ha)
@@ -318,6 +1511,120 @@ def fallback_prediction(request: PredictionRequest) -> PredictionResponse:
     )
 
 
-if __name__ == "__main__":
+def serve(host: str = "0.0.0.0", port: int = 8000, workers: int = WORKERS):
+    """
+    Run the API with `workers` pre-forked uvicorn processes.
+    
+    The model is loaded once in the parent before forking, so every worker
+    shares the parent's pages copy-on-write instead of loading its own copy.
+    Workers that exit unexpectedly are replaced after a backoff that doubles
+    while the same worker keeps crashing. If workers restart more than
+    WORKER_MAX_RESTARTS times within WORKER_RESTART_WINDOW seconds, the
+    remaining workers are stopped and the process exits with status 1.
+    """
+    global model_preloaded
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    
+    load_model()
+    model_preloaded = True
+    
+    if workers <= 1:
+        uvicorn.run(app, host=host, port=port)
+        return
+    
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.set_inheritable(True)
+    config = uvicorn.Config(app, host=host, port=port)
+    
+    def spawn_worker() -> int:
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            uvicorn.Server(config).run(sockets=[sock])
+            os._exit(0)
+        return pid
+    
+    children = {}              # pid -> (worker slot, start time)
+    crashes = [0] * workers    # consecutive crashes per slot
+    pending = {}               # slot -> time its replacement is due
+    restarts = []              # times of restarts within the window
+    exit_code = 0
+    
+    def start_worker(slot: int):
+        children[spawn_worker()] = (slot, time.monotonic())
+    
+    for slot in range(workers):
+        start_worker(slot)
+    print(f"Started {workers} workers on {host}:{port} (pids: {sorted(children)})")
+    
+    shutting_down = False
+    
+    def stop(signum, frame):
+        nonlocal shutting_down
+        shutting_down = True
+        pending.clear()
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+    
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    
+    while children or pending:
+        now = time.monotonic()
+        for slot, due in list(pending.items()):
+            if due <= now:
+                del pending[slot]
+                start_worker(slot)
+        
+        # Poll while a restart is waiting out its backoff, block otherwise
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG if pending else 0)
+        except ChildProcessError:
+            pid = 0
+        if pid == 0:
+            time.sleep(0.1)
+            continue
+        
+        slot, started = children.pop(pid)
+        if shutting_down:
+            continue
+        
+        now = time.monotonic()
+        # A worker that stayed up for a whole window starts its backoff over
+        crashes[slot] = 1 if now - started >= WORKER_RESTART_WINDOW else crashes[slot] + 1
+        restarts = [t for t in restarts if now - t < WORKER_RESTART_WINDOW] + [now]
+        if len(restarts) > WORKER_MAX_RESTARTS:
+            print(f"Error: worker {pid} exited with status {status}; {len(restarts)} restarts within "
+                  f"{WORKER_RESTART_WINDOW:g}s exceeds the limit of {WORKER_MAX_RESTARTS}. Shutting down.")
+            exit_code = 1
+            stop(None, None)
+            continue
+        
+        delay = min(WORKER_RESTART_BACKOFF * 2 ** (crashes[slot] - 1), WORKER_RESTART_BACKOFF_MAX)
+        print(f"Warning: worker {pid} exited with status {status}. Restarting in {delay:g}s.")
+        pending[slot] = now + delay
+    
+    sock.close()
+    if exit_code:
+        sys.exit(exit_code)
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Crop Yield Prediction API server")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=WORKERS,
+                        help="Number of pre-forked worker processes (env: WORKERS)")
+    parser.add_argument("--pool-size", type=int, default=PREDICT_POOL_SIZE,
+                        help="Prediction threads per worker (env: PREDICT_POOL_SIZE)")
+    args = parser.parse_args()
+    
+    PREDICT_POOL_SIZE = args.pool_size
+    serve(host=args.host, port=args.port, workers=args.workers)
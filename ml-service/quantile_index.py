@@ -0,0 +1,211 @@
+"""
+Quantile Regression Forest Index
+
+Turns a FlatForest into a quantile regression forest (Meinshausen, 2006):
+the conditional distribution of yield at x is the average, over trees, of
+the training targets in the leaf x reaches. Instead of keeping the raw
+training samples, every leaf stores a sparse histogram over a fixed set of
+equal-frequency target bins:
+- bin_edges: (n_bins + 1,) target values bounding the bins
+- offsets:   (node_count + 1,) start of each node's entries (internal nodes have none)
+- bins:      uint8 bin id of each entry
+- weights:   uint16 share of the leaf's samples in that bin (sums to ~65535 per leaf)
+
+Memory is bounded by min(leaf samples, n_bins) entries per leaf at 3 bytes
+each, and the arrays are saved as .npy files that can be memory-mapped
+like the forest itself. Quantiles for a whole batch come from one
+np.bincount over the (row, tree, entry) triples.
+
+Usage:
+    python quantile_index.py model/forest train.npz model/quantile_index
+    (train.npz holds the forest's training matrix X and targets y)
+"""
+
+import os
+import sys
+import json
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from forest_engine import FlatForest
+
+
+ARRAY_NAMES = ("bin_edges", "offsets", "bins", "weights")
+META_FILE = "meta.json"
+
+# uint8 bin ids allow at most 256 bins
+DEFAULT_BINS = 256
+WEIGHT_SCALE = np.iinfo(np.uint16).max
+
+# Training rows routed through the forest at a time while building
+BUILD_ROW_BLOCK = 10_000
+
+# Rows expanded into histogram entries at a time while querying; bounds the
+# per-entry temporaries by the block rather than the batch size
+QUERY_ROW_BLOCK = 512
+
+
+class QuantileIndex:
+    """Per-leaf target histograms for one FlatForest."""
+
+    def __init__(self, bin_edges: np.ndarray, offsets: np.ndarray, bins: np.ndarray,
+                 weights: np.ndarray, n_estimators: int, forest_fingerprint: Optional[str] = None):
+        self.bin_edges = bin_edges
+        self.offsets = offsets
+        self.bins = bins
+        self.weights = weights
+        self.n_estimators = int(n_estimators)
+        # FlatForest.fingerprint() of the forest the index was built for
+        self.forest_fingerprint = forest_fingerprint
+
+    @property
+    def n_bins(self) -> int:
+        return len(self.bin_edges) - 1
+
+    @property
+    def node_count(self) -> int:
+        return len(self.offsets) - 1
+
+    @property
+    def nbytes(self) -> int:
+        return sum(array.nbytes for array in self.arrays().values())
+
+    @classmethod
+    def build(cls, forest: FlatForest, X, y, n_bins: int = DEFAULT_BINS) -> "QuantileIndex":
+        """
+        Route the training rows X through `forest` and histogram their targets
+        y per leaf. As in Meinshausen's QRF every tree sees all training rows,
+        not just its bootstrap sample.
+        """
+        y = np.asarray(y, dtype=np.float64)
+        bin_edges = np.unique(np.quantile(y, np.linspace(0, 1, min(n_bins, DEFAULT_BINS) + 1)))
+        n_bins = len(bin_edges) - 1
+        # Interior edges only, so the lowest and highest targets land in the end bins
+        target_bins = np.searchsorted(bin_edges[1:-1], y, side='right')
+
+        # Count (leaf, bin) pairs block by block to keep the (rows, trees) matrix small
+        keys, counts = [], []
+        for start in range(0, len(y), BUILD_ROW_BLOCK):
+            leaves = forest.apply(X[start:start + BUILD_ROW_BLOCK]).astype(np.int64)
+            block_keys = leaves * n_bins + target_bins[start:start + len(leaves), None]
+            block_keys, block_counts = np.unique(block_keys, return_counts=True)
+            keys.append(block_keys)
+            counts.append(block_counts)
+        keys, inverse = np.unique(np.concatenate(keys), return_inverse=True)
+        counts = np.bincount(inverse, weights=np.concatenate(counts))
+
+        leaf = keys // n_bins
+        leaf_total = np.bincount(leaf, weights=counts, minlength=forest.node_count)
+        weights = np.rint(counts / leaf_total[leaf] * WEIGHT_SCALE).astype(np.uint16)
+
+        return cls(
+            bin_edges=bin_edges,
+            offsets=np.searchsorted(leaf, np.arange(forest.node_count + 1)).astype(np.int64),
+            bins=(keys % n_bins).astype(np.uint8),
+            weights=weights,
+            n_estimators=forest.n_estimators,
+            forest_fingerprint=forest.fingerprint(),
+        )
+
+    def save(self, path: str):
+        """Save the index as .npy files plus a meta.json in directory `path`."""
+        os.makedirs(path, exist_ok=True)
+        for name, array in self.arrays().items():
+            np.save(os.path.join(path, f"{name}.npy"), np.ascontiguousarray(array))
+        with open(os.path.join(path, META_FILE), 'w') as f:
+            json.dump({
+                "n_bins": self.n_bins,
+                "n_estimators": self.n_estimators,
+                "node_count": self.node_count,
+                "entries": int(len(self.bins)),
+                "forest_fingerprint": self.forest_fingerprint
+            }, f, indent=2)
+
+    @classmethod
+    def load(cls, path: str, mmap_mode: Optional[str] = 'r') -> "QuantileIndex":
+        """Load an index saved with `save`, memory-mapped read-only by default."""
+        with open(os.path.join(path, META_FILE), 'r') as f:
+            meta = json.load(f)
+        arrays = {
+            name: np.asarray(np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode))
+            for name in ARRAY_NAMES
+        }
+        return cls(n_estimators=meta["n_estimators"], forest_fingerprint=meta.get("forest_fingerprint"), **arrays)
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        return {name: getattr(self, name) for name in ARRAY_NAMES}
+
+    def matches(self, forest: FlatForest) -> bool:
+        """
+        True if this index was built for `forest`: the same node layout and the
+        same splits and leaf values. A retrained forest can share the layout,
+        so indexes saved without a fingerprint never match.
+        """
+        return (
+            self.node_count == forest.node_count
+            and self.n_estimators == forest.n_estimators
+            and self.forest_fingerprint is not None
+            and self.forest_fingerprint == forest.fingerprint()
+        )
+
+    def predict_quantiles(self, forest: FlatForest, X, quantiles: Sequence[float]) -> np.ndarray:
+        """
+        Return the (n_samples, len(quantiles)) matrix of predicted quantiles,
+        interpolating linearly inside the histogram bin each one falls in.
+        """
+        return self.quantiles_from_leaves(forest.apply(X), quantiles)
+
+    def quantiles_from_leaves(self, leaves: np.ndarray, quantiles: Sequence[float]) -> np.ndarray:
+        """predict_quantiles for a leaf matrix already computed with FlatForest.apply."""
+        n_rows = leaves.shape[0]
+        quantiles = np.asarray(quantiles, dtype=np.float64)
+
+        # Averaging over trees: each leaf contributes its own distribution.
+        # Rows are expanded a block at a time, so the per-entry temporaries
+        # stay bounded however large the batch is.
+        hist = np.empty((n_rows, self.n_bins), dtype=np.float64)
+        for start in range(0, n_rows, QUERY_ROW_BLOCK):
+            block = leaves[start:start + QUERY_ROW_BLOCK]
+            hist[start:start + len(block)] = self._histograms(block)
+        # Normalize per row, which also absorbs the uint16 rounding of the weights
+        hist /= hist.sum(axis=1, keepdims=True)
+        cdf = np.cumsum(hist, axis=1)
+
+        # First bin whose cumulative share reaches each quantile
+        target_bin = np.minimum((cdf[:, None, :] < quantiles[None, :, None]).sum(axis=2), self.n_bins - 1)
+        cdf_below = np.where(target_bin > 0, np.take_along_axis(cdf, np.maximum(target_bin - 1, 0), axis=1), 0.0)
+        mass = np.take_along_axis(hist, target_bin, axis=1)
+        fraction = np.clip(np.divide(quantiles[None, :] - cdf_below, mass, out=np.zeros_like(mass), where=mass > 0), 0, 1)
+
+        lower = self.bin_edges[target_bin]
+        upper = self.bin_edges[target_bin + 1]
+        return lower + fraction * (upper - lower)
+
+    def _histograms(self, leaves: np.ndarray) -> np.ndarray:
+        """(n_rows, n_bins) sum of the leaf histograms each row of `leaves` reaches."""
+        n_rows = leaves.shape[0]
+        # Expand every (row, tree) leaf into its histogram entries
+        starts = self.offsets[leaves].ravel()
+        lengths = self.offsets[leaves + 1].ravel() - starts
+        total = int(lengths.sum())
+        pair_first = np.cumsum(lengths) - lengths
+        entries = np.arange(total) - np.repeat(pair_first - starts, lengths)
+        rows = np.repeat(np.arange(n_rows).repeat(leaves.shape[1]), lengths)
+
+        return np.bincount(
+            rows * self.n_bins + self.bins[entries],
+            weights=self.weights[entries],
+            minlength=n_rows * self.n_bins
+        ).reshape(n_rows, self.n_bins)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4:
+        print("Usage: python quantile_index.py <forest_dir> <train.npz> <index_dir>")
+        sys.exit(1)
+
+    training = np.load(sys.argv[2])
+    index = QuantileIndex.build(FlatForest.load(sys.argv[1], mmap_mode=None), training["X"], training["y"])
+    index.save(sys.argv[3])
+    print(f"Quantile index saved to {sys.argv[3]} ({index.nbytes / 1024 ** 2:.1f} MB)")
@@ -0,0 +1,176 @@
+"""
+Bulk Crop Yield Scoring CLI
+
+Scores CSV or Parquet files far larger than memory for offline,
+district-level forecast runs. The input is read in fixed-size chunks, each
+chunk is encoded and scaled with the same logic as the API
+(main.encode_columns), predicted, and appended to the output file, so
+memory stays bounded by a few chunks regardless of input size.
+
+Usage:
+    python score_bulk.py input.csv output.csv
+    python score_bulk.py input.parquet output.parquet --chunksize 200000 --jobs 4
+
+Input columns: state, district, crop, season, soil_type (required) and
+rainfall, temperature, humidity, ndvi, soil_moisture, lst (optional; missing
+columns and empty cells use the API's defaults). All input columns are
+passed through, with `predicted_yield` appended.
+"""
+
+import os
+import sys
+import time
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+import main
+
+
+DEFAULT_CHUNKSIZE = 100_000
+
+# Artifacts loaded once per worker process in parallel mode
+_worker_bundle: Optional[main.ModelBundle] = None
+
+
+def read_chunks(path: str, chunksize: int) -> Iterator[pd.DataFrame]:
+    """Yield DataFrames of at most `chunksize` rows from a CSV or Parquet file."""
+    if path.endswith((".parquet", ".pq")):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Reading Parquet requires pyarrow: pip install pyarrow")
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize)
+
+
+class ChunkWriter:
+    """Append scored chunks to a CSV or Parquet file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.parquet = path.endswith((".parquet", ".pq"))
+        self._writer = None
+        self._header_written = False
+
+    def write(self, df: pd.DataFrame):
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            elif not table.schema.equals(self._writer.schema):
+                # CSV chunks can infer different dtypes (e.g. int vs float with NaNs)
+                table = table.cast(self._writer.schema)
+            self._writer.write_table(table)
+        else:
+            df.to_csv(self.path, mode='a' if self._header_written else 'w',
+                      header=not self._header_written, index=False)
+            self._header_written = True
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def score_chunk(chunk: pd.DataFrame, b: main.ModelBundle) -> np.ndarray:
+    """Encode, scale and predict one chunk with the serving logic."""
+    if b.model is None or b.encoders is None:
+        raise RuntimeError(f"Model artifacts not found in {main.MODEL_DIR}")
+    missing = [col for col in main.CATEGORICAL_FEATURES if col not in chunk.columns]
+    if missing:
+        raise ValueError(f"Input is missing required columns: {missing}")
+
+    categorical = {
+        col: chunk[col].fillna("unknown").astype(str).tolist()
+        for col in main.CATEGORICAL_FEATURES
+    }
+    numerical = np.column_stack([
+        pd.to_numeric(chunk[col], errors='coerce').fillna(default).to_numpy(dtype=np.float64)
+        if col in chunk.columns else np.full(len(chunk), default, dtype=np.float64)
+        for col, default in (
+            (col, main.PredictionRequest.model_fields[col].default) for col in main.NUMERICAL_FEATURES
+        )
+    ])
+
+    X = main.encode_columns(categorical, numerical, b)
+    return b.model.predict(X)
+
+
+def _init_worker():
+    global _worker_bundle
+    _worker_bundle = main.load_bundle()
+
+
+def _score_in_worker(chunk: pd.DataFrame) -> np.ndarray:
+    return score_chunk(chunk, _worker_bundle)
+
+
+def score_file(input_path: str, output_path: str, chunksize: int = DEFAULT_CHUNKSIZE, jobs: int = 1) -> int:
+    """
+    Score `input_path` into `output_path` and return the number of rows scored.
+
+    With jobs > 1, chunks are scored in a process pool. At most 2 * jobs
+    chunks are in flight, and results are written in input order.
+    """
+    writer = ChunkWriter(output_path)
+    rows = 0
+    start = time.perf_counter()
+
+    def emit(chunk: pd.DataFrame, predicted: np.ndarray):
+        nonlocal rows
+        chunk = chunk.copy()
+        chunk["predicted_yield"] = np.round(predicted, 2)
+        writer.write(chunk)
+        rows += len(chunk)
+        print(f"  Scored {rows:,} rows ({rows / (time.perf_counter() - start):,.0f} rows/s)")
+
+    try:
+        if jobs <= 1:
+            b = main.load_bundle()
+            for chunk in read_chunks(input_path, chunksize):
+                emit(chunk, score_chunk(chunk, b))
+        else:
+            with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker) as pool:
+                in_flight = deque()
+                for chunk in read_chunks(input_path, chunksize):
+                    in_flight.append((chunk, pool.submit(_score_in_worker, chunk)))
+                    if len(in_flight) >= 2 * jobs:
+                        done_chunk, future = in_flight.popleft()
+                        emit(done_chunk, future.result())
+                while in_flight:
+                    done_chunk, future = in_flight.popleft()
+                    emit(done_chunk, future.result())
+    finally:
+        writer.close()
+
+    return rows
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Score a CSV/Parquet file with the crop yield model")
+    parser.add_argument("input", help="Input .csv or .parquet file")
+    parser.add_argument("output", help="Output .csv or .parquet file")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE, help="Rows per chunk")
+    parser.add_argument("--jobs", type=int, default=1, help="Worker processes (default: 1)")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.input):
+        print(f"Input file not found: {args.input}")
+        return 1
+
+    start = time.perf_counter()
+    rows = score_file(args.input, args.output, chunksize=args.chunksize, jobs=args.jobs)
+    print(f"✓ Scored {rows:,} rows into {args.output} in {time.perf_counter() - start:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,301 @@
+"""
+In-process metrics for the prediction API, exposed in the Prometheus text format.
+
+A small registry of counters, gauges and histograms (no prometheus_client
+dependency) plus an ASGI middleware that counts requests and times them.
+Prediction requests are also broken down by stage:
+- validation:    request start until the prediction work is submitted
+                 (body parsing, schema and per-record validation)
+- encoding, scaling, inference: recorded by the prediction code itself
+- serialization: prediction work done until the response starts
+
+Stage times are accumulated per request in a context variable and observed
+once per request when the response starts, so the hot path only adds a
+few perf_counter() calls and dict updates.
+
+Each worker process keeps its own registry; with several workers a scrape
+reports the worker that served it.
+"""
+
+import math
+import time
+import threading
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+# Upper bounds in seconds; fine-grained below a millisecond for the per-stage times
+LATENCY_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+# Starlette appends "; charset=utf-8" to text media types
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+PREDICTION_STAGES = ("validation", "encoding", "scaling", "inference", "serialization")
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Metric:
+    """A metric family: one child per combination of label values."""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def labels(self, *values: str):
+        """Return the child for these label values, creating it on first use."""
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _label_text(self, values: Tuple[str, ...], extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs = list(zip(self.labelnames, values))
+        if extra is not None:
+            pairs.append(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{key}="{_escape(str(value))}"' for key, value in pairs) + "}"
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in sorted(self._children.items()):
+            lines.extend(self._render_child(values, child))
+        return lines
+
+    def _render_child(self, values, child) -> List[str]:
+        return [f"{self.name}{self._label_text(values)} {_format_value(child.value)}"]
+
+
+class _Value:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def set(self, value: float):
+        self.value = float(value)
+
+
+class Counter(_Metric):
+    """Monotonically increasing count. Unlabelled counters can be incremented directly."""
+
+    kind = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1.0):
+        self._default.inc(amount)
+
+
+class Gauge(_Metric):
+    """A value that can go up and down, e.g. the last model load time."""
+
+    kind = "gauge"
+
+    def _new_child(self):
+        return _Value()
+
+    def set(self, value: float):
+        self._default.set(value)
+
+
+class _HistogramValue:
+    __slots__ = ("buckets", "counts", "sum", "_lock")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        # counts[i] holds observations in (buckets[i-1], buckets[i]]; the last slot is +Inf
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+
+class Histogram(_Metric):
+    """Distribution of observations over fixed buckets (cumulative in the output)."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Iterable[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float):
+        self._default.observe(value)
+
+    def _render_child(self, values, child) -> List[str]:
+        with child._lock:
+            counts, total = list(child.counts), child.sum
+        lines, cumulative = [], 0
+        for bound, count in zip(self.buckets + (math.inf,), counts):
+            cumulative += count
+            lines.append(f"{self.name}_bucket{self._label_text(values, ('le', _format_value(bound)))} {cumulative}")
+        lines.append(f"{self.name}_sum{self._label_text(values)} {_format_value(total)}")
+        lines.append(f"{self.name}_count{self._label_text(values)} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Collection of metrics rendered together by /metrics."""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def _register(self, metric: _Metric) -> _Metric:
+        if any(m.name == metric.name for m in self._metrics):
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Iterable[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.counter(
+    "http_requests_total", "HTTP requests by route and status code", ("path", "method", "status"))
+HTTP_REQUEST_DURATION = REGISTRY.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("path",))
+STAGE_DURATION = REGISTRY.histogram(
+    "prediction_stage_duration_seconds", "Time per prediction request spent in each stage", ("stage",))
+for _stage in PREDICTION_STAGES:
+    STAGE_DURATION.labels(_stage)
+
+
+# =============================================================================
+# PER-REQUEST STAGE TIMING
+# =============================================================================
+
+class RequestTimings:
+    """Stage times of one request, shared by the middleware and the prediction code."""
+
+    __slots__ = ("start", "submitted", "completed", "stages")
+
+    def __init__(self, start: float):
+        self.start = start
+        self.submitted: Optional[float] = None
+        self.completed: Optional[float] = None
+        self.stages: Dict[str, float] = {}
+
+
+_current_timings: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+def record_stage(stage: str, seconds: float):
+    """Add `seconds` to `stage` for the current request; a no-op outside a request (e.g. bulk scoring)."""
+    timings = _current_timings.get()
+    if timings is not None:
+        timings.stages[stage] = timings.stages.get(stage, 0.0) + seconds
+
+
+def mark_submitted():
+    """Call when validated work is handed to the prediction code: ends the validation stage."""
+    timings = _current_timings.get()
+    if timings is not None and timings.submitted is None:
+        timings.submitted = time.perf_counter()
+        record_stage("validation", timings.submitted - timings.start)
+
+
+def mark_completed():
+    """Call when the prediction code returns: the rest of the request is serialization."""
+    timings = _current_timings.get()
+    if timings is not None:
+        timings.completed = time.perf_counter()
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware (no BaseHTTPMiddleware task overhead) that counts
+    and times every HTTP request and observes its prediction stage times.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        # Route paths of the application, read on the first request
+        self.paths: Optional[set] = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings(time.perf_counter())
+        token = _current_timings.set(timings)
+        status = 500
+
+        async def send_with_metrics(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if timings.completed is not None:
+                    record_stage("serialization", time.perf_counter() - timings.completed)
+                for stage, seconds in timings.stages.items():
+                    STAGE_DURATION.labels(stage).observe(seconds)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            _current_timings.reset(token)
+            if self.paths is None:
+                self.paths = {getattr(route, "path", None) for route in scope["app"].routes}
+            # Only known routes become label values, so unknown URLs cannot grow the series count
+            path = scope["path"] if scope["path"] in self.paths else "other"
+            HTTP_REQUESTS.labels(path, scope["method"], str(status)).inc()
+            HTTP_REQUEST_DURATION.labels(path).observe(time.perf_counter() - timings.start)
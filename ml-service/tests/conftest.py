@@ -0,0 +1,55 @@
+"""
+Shared fixtures: a small Random Forest trained through train_model_v2's own
+preprocessing on synthetic raw records, written to a temporary MODEL_DIR
+that main.py serves from.
+"""
+
+import os
+import tempfile
+
+# main.py reads MODEL_DIR at import time
+os.environ["MODEL_DIR"] = tempfile.mkdtemp(prefix="crop-yield-test-")
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+
+import main
+import train_model_v2
+
+
+def raw_records(n: int = 800, seed: int = 0) -> pd.DataFrame:
+    """Raw records in the training CSV layout, with every feature present so none is simulated."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'State': rng.choice(['Punjab', 'Assam', 'Bihar', 'Kerala'], n),
+        'District': [f"District {i}" for i in rng.integers(0, 20, n)],
+        'Crop': rng.choice(['Rice', 'Wheat', 'Maize', 'Cotton'], n),
+        'Season': rng.choice(['Kharif', 'Rabi', 'Whole Year'], n),
+        'Soil_Type': rng.choice(['loamy', 'clay', 'sandy'], n),
+        'Crop_Year': rng.integers(2000, 2020, n),
+        'Area': rng.uniform(100, 5000, n),
+        'Annual_Rainfall': rng.uniform(300, 2500, n),
+        'Temperature': rng.uniform(15, 40, n),
+        'Humidity': rng.uniform(30, 90, n),
+        'NDVI': rng.uniform(0.2, 0.9, n),
+        'Soil_Moisture': rng.uniform(10, 50, n),
+        'LST': rng.uniform(18, 45, n),
+        'Yield': rng.uniform(1000, 6000, n),
+    })
+
+
+@pytest.fixture(scope="session")
+def trained():
+    """(bundle, processed frame, feature matrix, model) for a model saved to MODEL_DIR."""
+    df, encoders, scaler = train_model_v2.preprocess_data(raw_records())
+    X, feature_names = train_model_v2.select_features(df)
+    model = RandomForestRegressor(n_estimators=20, max_depth=8, random_state=0).fit(X, df['yield'])
+
+    joblib.dump(model, main.MODEL_PATH)
+    joblib.dump(encoders, main.ENCODERS_PATH)
+    joblib.dump(scaler, main.SCALER_PATH)
+    main.load_model()
+    return main.bundle, df, X, model
@@ -0,0 +1,24 @@
+import os
+
+import main
+
+
+def point_at(monkeypatch, model_dir):
+    for const, name in [("MODEL_PATH", "model.pkl"), ("ENCODERS_PATH", "encoders.pkl"),
+                        ("SCALER_PATH", "scaler.pkl"), ("METRICS_PATH", "metrics.json"),
+                        ("FOREST_DIR", "forest"), ("QUANTILE_INDEX_DIR", "quantile_index")]:
+        monkeypatch.setattr(main, const, os.path.join(model_dir, name))
+
+
+def test_serves_the_v2_set_when_no_unsuffixed_model_exists(tmp_path, monkeypatch):
+    point_at(monkeypatch, str(tmp_path))
+    (tmp_path / "model_v2.pkl").write_bytes(b"")
+    paths = main.artifact_paths()
+    assert paths["model"] == str(tmp_path / "model_v2.pkl")
+    assert paths["encoders"] == str(tmp_path / "encoders_v2.pkl")
+    assert paths["metrics"] == str(tmp_path / "metrics_v2.json")
+    assert paths["forest"] == str(tmp_path / "forest_v2")
+
+    # An unsuffixed model takes precedence over the whole _v2 set
+    (tmp_path / "model.pkl").write_bytes(b"")
+    assert main.artifact_paths()["encoders"] == str(tmp_path / "encoders.pkl")
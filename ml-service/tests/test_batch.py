@@ -0,0 +1,56 @@
+from fastapi.testclient import TestClient
+
+import main
+
+
+def test_mixed_batch_reports_bad_rows_individually(trained):
+    valid = {"state": "punjab", "district": "district 3", "crop": "rice", "season": "kharif",
+             "soil_type": "loamy", "region": "north-india"}
+    records = [valid, "not a record", [1, 2], dict(valid, rainfall=-5), None, dict(valid, crop="wheat")]
+
+    with TestClient(main.app) as client:
+        response = client.post("/predict/batch", json={"records": records})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["succeeded"] == 2 and body["failed"] == 4
+    results = body["results"]
+    assert [r["index"] for r in results] == list(range(len(records)))
+    for i in (0, 5):
+        assert results[i]["prediction"] is not None and results[i]["error"] is None
+    for i in (1, 2, 4):
+        assert results[i]["prediction"] is None and "object" in results[i]["error"]
+    assert "rainfall" in results[3]["error"]
+
+
+class FailsOnCrop:
+    """Wraps a model so any matrix holding one crop code fails, as a corrupt row would."""
+
+    def __init__(self, model, crop_code):
+        self.model = model
+        self.crop_code = crop_code
+
+    def predict(self, X):
+        if (X[:, main.CATEGORICAL_FEATURES.index('crop')] == self.crop_code).any():
+            raise ValueError("cannot score this row")
+        return self.model.predict(X)
+
+
+def test_failed_batch_is_retried_row_by_row(trained, monkeypatch):
+    b, _, _, model = trained
+    wheat = b.lookup_tables['crop']['wheat']
+    monkeypatch.setattr(main, "model_preloaded", True)
+    monkeypatch.setattr(main, "bundle", main.replace(b, model=FailsOnCrop(model, wheat), cache=main.LRUCache()))
+    valid = {"state": "punjab", "district": "district 3", "crop": "rice", "season": "kharif",
+             "soil_type": "loamy", "region": "north-india"}
+    records = [valid, dict(valid, crop="wheat"), dict(valid, crop="maize")]
+
+    with TestClient(main.app) as client:
+        body = client.post("/predict/batch", json={"records": records}).json()
+    expected = [main.predict_single(main.PredictionRequest(**records[i]), b).predicted_yield for i in (0, 2)]
+
+    assert body["succeeded"] == 2 and body["failed"] == 1
+    results = body["results"]
+    assert results[1]["prediction"] is None and results[1]["error"].startswith("prediction failed:")
+    # The other rows keep their model predictions rather than a heuristic fallback
+    assert [results[i]["prediction"]["predicted_yield"] for i in (0, 2)] == expected
@@ -0,0 +1,59 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+import prediction_cache
+from prediction_cache import LRUCache
+
+RECORD = {"state": "punjab", "district": "district 3", "crop": "rice", "season": "kharif",
+          "soil_type": "loamy", "region": "north-india"}
+
+
+@pytest.fixture
+def client(trained, monkeypatch):
+    """A client serving the trained bundle with an empty cache with a 60 s TTL."""
+    b = trained[0]
+    monkeypatch.setattr(main, "model_preloaded", True)
+    monkeypatch.setattr(main, "bundle", main.replace(b, cache=LRUCache(maxsize=100, ttl=60)))
+    with TestClient(main.app) as client:
+        yield client
+
+
+def test_repeat_request_is_a_cache_hit(client):
+    first = client.post("/predict", json=RECORD).json()
+    # Differs only in case and whitespace, so it encodes to the same features
+    second = client.post("/predict", json=dict(RECORD, crop=" Rice ")).json()
+
+    assert second == first
+    stats = client.get("/cache/stats").json()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 1, 1)
+
+
+def test_different_features_are_a_miss(client):
+    client.post("/predict", json=RECORD)
+    client.post("/predict", json=dict(RECORD, rainfall=900.0))
+
+    stats = client.get("/cache/stats").json()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (0, 2, 2)
+
+
+def test_entries_expire_after_the_ttl(client, monkeypatch):
+    now = prediction_cache.time.monotonic()
+    monkeypatch.setattr(prediction_cache.time, "monotonic", lambda: now)
+    client.post("/predict", json=RECORD)
+
+    monkeypatch.setattr(prediction_cache.time, "monotonic", lambda: now + 61)
+    client.post("/predict", json=RECORD)
+
+    stats = client.get("/cache/stats").json()
+    assert (stats["hits"], stats["misses"]) == (0, 2)
+
+
+def test_reload_starts_with_an_empty_cache(client):
+    client.post("/predict", json=RECORD)
+    assert client.get("/cache/stats").json()["size"] == 1
+
+    assert client.post("/admin/reload").status_code == 200
+    assert client.get("/cache/stats").json()["size"] == 0
+    client.post("/predict", json=RECORD)
+    assert client.get("/cache/stats").json()["misses"] == 1
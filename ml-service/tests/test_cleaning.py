@@ -0,0 +1,19 @@
+import numpy as np
+
+import train_model_v2
+from conftest import raw_records
+
+
+def test_simulated_columns_use_the_given_generator():
+    raw = raw_records(200).drop(columns=['Temperature', 'Humidity', 'Soil_Type', 'NDVI', 'Soil_Moisture', 'LST'])
+    state = np.random.get_state()
+
+    first = train_model_v2.clean_records(raw.copy(), verbose=False, rng=np.random.default_rng(7))
+    again = train_model_v2.clean_records(raw.copy(), verbose=False, rng=np.random.default_rng(7))
+    other = train_model_v2.clean_records(raw.copy(), verbose=False, rng=np.random.default_rng(8))
+
+    simulated = ['temperature', 'humidity', 'soil_type', 'ndvi', 'soil_moisture', 'lst']
+    assert first[simulated].equals(again[simulated])
+    assert not first['ndvi'].equals(other['ndvi'])
+    # numpy's global RNG is neither reseeded nor advanced
+    assert all(np.array_equal(a, b) for a, b in zip(np.random.get_state(), state))
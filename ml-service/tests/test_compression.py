@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+
+import train_model_v2
+
+
+def test_bootstrap_samples_are_rebuilt_from_tree_seeds():
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(500, 4)))
+    y = X[0] + rng.normal(scale=0.1, size=500)
+    model = RandomForestRegressor(n_estimators=10, max_samples=0.7, random_state=0).fit(X, y)
+
+    for estimator in model.estimators_:
+        indices = train_model_v2.bootstrap_indices(estimator, len(X), 350)
+        assert indices is not None
+        assert estimator.tree_.n_node_samples[0] == len(np.unique(indices))
+    # A sample that does not match the fitted one is rejected
+    assert train_model_v2.bootstrap_indices(model.estimators_[0], len(X), 349) is None
+
+    ranking = train_model_v2.rank_trees_by_oob(model, X, y, np.arange(len(X)))
+    assert sorted(ranking) == list(range(10))
+
+
+def test_compression_selects_on_out_of_bag_predictions():
+    rng = np.random.default_rng(1)
+    X = pd.DataFrame(rng.normal(size=(1500, 4)))
+    y = pd.Series(X[0] * 3 + rng.normal(size=1500))
+    X_train, _, y_train, _ = train_model_v2.train_test_split(X, y, test_size=0.2, random_state=42)
+    model = RandomForestRegressor(n_estimators=40, random_state=0).fit(X_train, y_train)
+
+    _, report = train_model_v2.compress_forest(model, X, y, distill=True)
+
+    # The full forest memorises its training rows; out-of-bag it scores like the test split
+    in_sample = train_model_v2.r2_score(y_train, model.predict(X_train))
+    validation = report["validation"]["full"]["r2_score"]
+    assert validation < in_sample - 0.05
+    assert abs(validation - report["full"]["r2_score"]) < 0.05
+    assert report["candidates_evaluated"] > 1
@@ -0,0 +1,30 @@
+import numpy as np
+from fastapi.testclient import TestClient
+
+import main
+from forest_engine import FlatForest
+
+RECORD = {"state": "punjab", "district": "district 3", "crop": "rice", "season": "kharif",
+          "soil_type": "loamy", "region": "north-india"}
+
+
+def test_contributions_add_up_to_the_prediction(trained):
+    _, _, X, model = trained
+    predicted, bias, contributions = FlatForest.from_estimator(model).explain(X)
+
+    np.testing.assert_array_equal(predicted, model.predict(X))
+    assert contributions.shape == X.shape
+    np.testing.assert_allclose(bias + contributions.sum(axis=1), predicted, rtol=0, atol=1e-9)
+
+
+def test_explain_endpoint_returns_one_contribution_per_feature(trained):
+    with TestClient(main.app) as client:
+        response = client.post("/explain", json=RECORD)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert set(body) == {"predicted_yield", "base_value", "contributions"}
+    assert list(body["contributions"]) == main.CATEGORICAL_FEATURES + main.NUMERICAL_FEATURES
+    # Each of the rounded values is off by at most 0.005
+    total = body["base_value"] + sum(body["contributions"].values())
+    assert abs(total - body["predicted_yield"]) <= 0.005 * (len(body["contributions"]) + 2)
@@ -0,0 +1,38 @@
+import json
+
+import numpy as np
+
+from forest_engine import FlatForest
+
+
+def test_flat_forest_is_bit_identical_to_sklearn(trained, tmp_path):
+    _, _, X, model = trained
+    expected = model.predict(X)
+
+    flat = FlatForest.from_estimator(model)
+    assert (flat.predict(X) == expected).all()
+
+    flat.save(str(tmp_path / "forest"))
+    mapped = FlatForest.load(str(tmp_path / "forest"), mmap_mode='r')
+    # load keeps the mapping but drops the np.memmap subclass
+    assert isinstance(mapped.value.base, np.memmap)
+    assert (mapped.predict(X) == expected).all()
+
+
+def test_saved_fingerprint_is_read_from_meta(trained, tmp_path):
+    flat = FlatForest.from_estimator(trained[3])
+    path = tmp_path / "forest"
+    flat.save(str(path))
+
+    meta = json.loads((path / "meta.json").read_text())
+    assert meta["fingerprint"] == flat.fingerprint()
+
+    # Loading trusts meta.json instead of hashing the mapped arrays
+    meta["fingerprint"] = "stored"
+    (path / "meta.json").write_text(json.dumps(meta))
+    assert FlatForest.load(str(path)).fingerprint() == "stored"
+
+    # Exports saved before fingerprints were stored are hashed on first use
+    del meta["fingerprint"]
+    (path / "meta.json").write_text(json.dumps(meta))
+    assert FlatForest.load(str(path)).fingerprint() == flat.fingerprint()
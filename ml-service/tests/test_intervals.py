@@ -0,0 +1,35 @@
+import numpy as np
+from fastapi.testclient import TestClient
+from sklearn.ensemble import RandomForestRegressor
+
+import main
+from forest_engine import FlatForest
+from test_scaling import requests_for
+
+
+def test_interval_contains_the_prediction_for_skewed_trees():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(3000, 5))
+    y = np.exp(2 * X[:, 0]) + rng.normal(size=3000)
+    forest = FlatForest.from_estimator(RandomForestRegressor(n_estimators=20, random_state=0).fit(X, y))
+    X_new = rng.normal(size=(5000, 5))
+
+    _, lower, upper = forest.predict_interval(X_new, main.INTERVAL_PERCENTILES)
+    predicted, band_lower, band_upper = main.estimate(forest, X_new)
+
+    # The raw tree percentiles do not always contain the mean; the served band does
+    assert ((predicted < lower) | (predicted > upper)).any()
+    assert (band_lower <= predicted).all() and (predicted <= band_upper).all()
+    np.testing.assert_array_equal(predicted, forest.predict(X_new))
+
+
+def test_predict_returns_an_interval_around_the_prediction(trained):
+    _, df, _, _ = trained
+    rows = range(0, len(df), 50)
+    with TestClient(main.app) as client:
+        for request in requests_for(df, rows):
+            body = client.post("/predict", json=request.model_dump()).json()
+            interval = body["prediction_interval"]
+            assert interval["lower"] <= body["predicted_yield"] <= interval["upper"]
+            assert 0 < body["confidence"] <= 100
+
@@ -0,0 +1,38 @@
+import re
+
+from fastapi.testclient import TestClient
+
+import main
+from service_metrics import PREDICTION_STAGES
+
+RECORD = {"state": "punjab", "district": "district 3", "crop": "rice", "season": "kharif",
+          "soil_type": "loamy", "region": "north-india"}
+
+
+def sample(text: str, name: str) -> float:
+    match = re.search(rf"^{re.escape(name)} (\S+)$", text, re.MULTILINE)
+    assert match, f"{name} not in the exposition"
+    return float(match.group(1))
+
+
+def test_metrics_endpoint_renders_the_registry(trained):
+    with TestClient(main.app) as client:
+        # Distinct rainfall per run keeps the prediction cache from skipping inference
+        assert client.post("/predict", json=dict(RECORD, rainfall=1234.5)).status_code == 200
+        response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+
+    assert "# TYPE http_requests_total counter" in text
+    assert sample(text, 'http_requests_total{path="/predict",method="POST",status="200"}') >= 1
+
+    assert "# TYPE prediction_stage_duration_seconds histogram" in text
+    for stage in PREDICTION_STAGES:
+        assert f'prediction_stage_duration_seconds_bucket{{stage="{stage}",le="+Inf"}}' in text
+    assert sample(text, 'prediction_stage_duration_seconds_count{stage="inference"}') >= 1
+
+    # Pre-created at import, so they are exported before the first fallback
+    for reason in ("model_not_loaded", "prediction_error", "scaling_error", "missing_encoder"):
+        sample(text, f'prediction_fallbacks_total{{reason="{reason}"}}')
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from forest_engine import FlatForest
+import quantile_index
+from quantile_index import QuantileIndex
+from test_scaling import requests_for
+
+
+@pytest.fixture
+def index(trained):
+    b, df, X, _ = trained
+    return QuantileIndex.build(b.model, X.to_numpy(), df['yield'].to_numpy())
+
+
+def test_quantiles_are_monotone(trained, index, monkeypatch):
+    b, df, _, _ = trained
+    levels = [0.05, 0.1, 0.25, 0.5, 0.75, 0.9, 0.95]
+    records = [request.model_dump() for request in requests_for(df, range(0, len(df), 20))]
+    monkeypatch.setattr(main, "model_preloaded", True)
+    monkeypatch.setattr(main, "bundle", main.replace(b, quantile_index=index))
+
+    with TestClient(main.app) as client:
+        response = client.post("/predict/quantiles/batch", json={"records": records, "quantiles": levels})
+
+    assert response.status_code == 200
+    for result in response.json()["results"]:
+        quantiles = result["prediction"]["quantiles"]
+        assert list(quantiles) == ["p5", "p10", "p25", "p50", "p75", "p90", "p95"]
+        assert list(quantiles.values()) == sorted(quantiles.values())
+
+
+def test_index_rejects_a_forest_with_the_same_layout_but_other_values(trained, index, tmp_path):
+    forest = trained[0].model
+    index.save(str(tmp_path / "index"))
+    loaded = QuantileIndex.load(str(tmp_path / "index"))
+    assert loaded.matches(forest)
+
+    retrained = FlatForest(forest.feature, forest.threshold, forest.left, forest.right,
+                           forest.value + 1.0, forest.roots, forest.n_features)
+    assert retrained.node_count == forest.node_count
+    assert not loaded.matches(retrained)
+
+    # An index saved without a fingerprint cannot be checked, so it is not trusted
+    loaded.forest_fingerprint = None
+    assert not loaded.matches(forest)
+
+
+def test_blocked_quantiles_match_a_single_block(trained, index, monkeypatch):
+    b, _, X, _ = trained
+    leaves = b.model.apply(X.to_numpy())
+    levels = [0.1, 0.5, 0.9]
+    monkeypatch.setattr(quantile_index, "QUERY_ROW_BLOCK", len(leaves))
+    whole = index.quantiles_from_leaves(leaves, levels)
+
+    # A block size that does not divide the row count leaves a short last block
+    monkeypatch.setattr(quantile_index, "QUERY_ROW_BLOCK", 37)
+    np.testing.assert_array_equal(index.quantiles_from_leaves(leaves, levels), whole)
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from test_scaling import requests_for
+
+
+class NaNModel:
+    def predict(self, X):
+        return np.full(len(X), np.nan)
+
+
+@pytest.fixture
+def client(trained, monkeypatch):
+    monkeypatch.setattr(main, "model_preloaded", True)
+    monkeypatch.setattr(main, "bundle", trained[0])
+    with TestClient(main.app) as client:
+        yield client
+
+
+def test_failed_smoke_prediction_keeps_the_previous_bundle(client, trained, monkeypatch):
+    before = main.bundle
+    monkeypatch.setattr(main, "load_bundle", lambda version: main.replace(trained[0], model=NaNModel(),
+                                                                          version=version))
+
+    response = client.post("/admin/reload")
+
+    assert response.status_code == 500
+    assert "previous model still active" in response.json()["detail"]
+    assert main.bundle is before
+    assert client.get("/health").json()["model_version"] == before.version
+
+
+def test_good_reload_swaps_in_a_bundle_that_predicts_like_the_trained_model(client, trained):
+    before = main.bundle
+    _, df, X, model = trained
+
+    response = client.post("/admin/reload")
+
+    assert response.status_code == 200
+    assert response.json()["model_version"] == before.version + 1
+    assert main.bundle is not before and main.bundle.version == before.version + 1
+    # The reloaded scaler must still be applied by feature name, not by position
+    rows = list(range(0, len(df), 80))
+    for i, request in zip(rows, requests_for(df, rows)):
+        predicted = client.post("/predict", json=request.model_dump()).json()["predicted_yield"]
+        assert predicted == pytest.approx(model.predict(X.iloc[[i]])[0], abs=0.01)
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+import main
+
+
+def requests_for(df, rows):
+    return [
+        main.PredictionRequest(**{col: df[col].iloc[i] for col in main.CATEGORICAL_FEATURES + ['region']},
+                               **{col: float(df[col].iloc[i]) for col in main.NUMERICAL_FEATURES})
+        for i in rows
+    ]
+
+
+def test_service_scales_features_by_name(trained):
+    b, df, X, model = trained
+    # train_model_v2 fits the scaler in a different column order than the service sends features
+    assert list(b.scaler.feature_names_in_) != main.NUMERICAL_FEATURES
+
+    rows = range(0, len(df), 40)
+    expected = np.round(model.predict(X.iloc[list(rows)]), 2)
+
+    single = [main.predict_single(request, b).predicted_yield for request in requests_for(df, rows)]
+    np.testing.assert_allclose(single, expected, atol=0.01)
+
+    encoded = main.encode_batch(requests_for(df, rows), b)
+    np.testing.assert_allclose(encoded, X.iloc[list(rows)].to_numpy(), atol=1e-9)
+    batch = [r.predicted_yield for r in main.predict_batch(requests_for(df, rows), b)[0]]
+    np.testing.assert_allclose(batch, expected, atol=0.01)
+
+
+def test_transform_fallback_scales_features_by_name(trained):
+    b, df, X, model = trained
+    fallback = main.replace(b, scaling=None)
+    numerical = df[main.NUMERICAL_FEATURES].to_numpy(dtype=np.float64)
+    main.scale_numerical(numerical, fallback)
+    expected = X[[f"{col}_scaled" for col in main.NUMERICAL_FEATURES]].to_numpy()
+    np.testing.assert_allclose(numerical, expected, atol=1e-9)
+
+
+def test_mismatched_scaler_columns_raise(trained):
+    b, df, X, model = trained
+    fallback = main.replace(b, scaling=None, scaler_columns=None)
+    with pytest.raises(ValueError):
+        main.scale_numerical(np.zeros((1, len(main.NUMERICAL_FEATURES))), fallback)
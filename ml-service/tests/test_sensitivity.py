@@ -0,0 +1,42 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+RECORD = {"state": "punjab", "district": "district 3", "crop": "rice", "season": "kharif",
+          "soil_type": "loamy", "region": "north-india", "rainfall": 450.0, "temperature": 24.0}
+
+
+def test_sensitivity_curves_match_predict(trained):
+    perturbations = {
+        "rainfall": {"percent": [-10, 0, 10]},
+        "temperature": {"deltas": [-2, 2]},
+        "humidity": {"range": [40, 90], "points": 6},
+    }
+    with TestClient(main.app) as client:
+        response = client.post("/predict/sensitivity", json=dict(RECORD, perturbations=perturbations))
+        baseline = client.post("/predict", json=RECORD).json()["predicted_yield"]
+        warmer = client.post("/predict", json=dict(RECORD, temperature=26.0)).json()["predicted_yield"]
+
+    assert response.status_code == 200
+    body = response.json()
+    curves = body["curves"]
+    assert list(curves) == ["rainfall", "temperature", "humidity"]
+    for name, n_points in (("rainfall", 3), ("temperature", 2), ("humidity", 6)):
+        curve = curves[name]
+        assert len(curve["values"]) == len(curve["yields"]) == len(curve["changes"]) == n_points
+    assert curves["rainfall"]["values"] == [405.0, 450.0, 495.0]
+    assert curves["humidity"]["values"] == [40.0, 50.0, 60.0, 70.0, 80.0, 90.0]
+
+    # The unperturbed record and the 0% point are both what /predict returns
+    assert body["base_yield"] == baseline
+    assert curves["rainfall"]["yields"][1] == baseline
+    assert curves["rainfall"]["changes"][1] == 0
+    assert curves["temperature"]["yields"][1] == pytest.approx(warmer, abs=0.01)
+
+
+def test_perturbation_outside_the_feature_range_is_rejected(trained):
+    with TestClient(main.app) as client:
+        response = client.post("/predict/sensitivity",
+                               json=dict(RECORD, perturbations={"humidity": {"values": [120]}}))
+    assert response.status_code == 422
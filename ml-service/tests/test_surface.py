@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from yield_surface import YieldSurface, SURFACE_FEATURES, COMBINATION_FEATURES
+
+
+@pytest.fixture
+def surface_client(trained, monkeypatch):
+    """A client for the trained bundle with a surface over one combination, counting submit/complete marks."""
+    b, df, X, model = trained
+    combination = tuple(df[col].iloc[0] for col in COMBINATION_FEATURES)
+    axes = {"rainfall": np.linspace(0, 3000, 7), "temperature": np.linspace(0, 50, 6), "humidity": np.linspace(0, 100, 5)}
+    fixed = {col: main.PredictionRequest.model_fields[col].default
+             for col in main.NUMERICAL_FEATURES if col not in SURFACE_FEATURES}
+    surface = YieldSurface.build(lambda c, n: main.score_columns(c, n, b), [combination], axes, fixed)
+    monkeypatch.setattr(main, "bundle", main.replace(b, yield_surface=surface))
+
+    marks = {"submitted": 0, "completed": 0}
+    for name in marks:
+        original = getattr(main, f"mark_{name}")
+        def counted(original=original, name=name):
+            marks[name] += 1
+            original()
+        monkeypatch.setattr(main, f"mark_{name}", counted)
+
+    record = dict(zip(COMBINATION_FEATURES, combination), region=df['region'].iloc[0])
+    return TestClient(main.app), record, marks
+
+
+@pytest.mark.parametrize("extra, source", [({}, "surface"), ({"ndvi": 0.5}, "model")])
+def test_surface_request_is_marked_once(surface_client, extra, source):
+    client, record, marks = surface_client
+    response = client.post("/predict/surface", json=dict(record, sweep={"rainfall": [100, 900]}, **extra))
+    assert response.status_code == 200
+    assert response.json()["source"] == source
+    assert marks == {"submitted": 1, "completed": 1}
+
+
+def test_failed_interpolation_is_marked_completed(surface_client, monkeypatch):
+    client, record, marks = surface_client
+    def fail(*args):
+        raise RuntimeError("corrupt surface")
+    monkeypatch.setattr(main.bundle.yield_surface, "interpolate", fail)
+    with pytest.raises(RuntimeError):
+        client.post("/predict/surface", json=record)
+    assert marks == {"submitted": 1, "completed": 1}
@@ -11,9 +11,10 @@ import pandas as pd
 import numpy as np
 from sklearn.model_selection import train_test_split, cross_val_score
 from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
-from sklearn.preprocessing import LabelEncoder
 from sklearn.metrics import r2_score, mean_absolute_error, mean_squared_error
 
+from dataset import read_dataset, clean_label, map_categories, encode_categorical
+
 # Paths
 DATA_PATH = os.path.join(os.path.dirname(__file__), "data", "cleaned_crop_data.csv")
 LEGACY_DATA_PATH = os.path.join(os.path.dirname(__file__), "data", "crop_yield.csv")
@@ -23,16 +24,16 @@ ENCODERS_PATH = os.path.join(MODEL_DIR, "encoders.pkl")
 METRICS_PATH = os.path.join(MODEL_DIR, "metrics.json")
 
 
-def load_data():
-    """Load the crop yield dataset."""
+def load_data(chunksize=None):
+    """Load the crop yield dataset (typed and column-pruned, see dataset.py)."""
     print("Loading dataset...")
     
     # Try new comprehensive dataset first
     if os.path.exists(DATA_PATH):
-        df = pd.read_csv(DATA_PATH)
+        df = read_dataset(DATA_PATH, chunksize=chunksize)
         print(f"Loaded comprehensive dataset: {len(df)} samples")
     elif os.path.exists(LEGACY_DATA_PATH):
-        df = pd.read_csv(LEGACY_DATA_PATH)
+        df = read_dataset(LEGACY_DATA_PATH, chunksize=chunksize)
         print(f"Loaded legacy dataset: {len(df)} samples")
     else:
         raise FileNotFoundError("No dataset found!")
@@ -41,12 +42,13 @@ def load_data():
     return df
 
 
-def preprocess_data(df):
-    """Preprocess the dataset for training."""
+def preprocess_data(df, copy=True):
+    """Preprocess the dataset for training. With copy=False `df` is modified in place."""
     print("\nPreprocessing data...")
     
     # Create copies of the dataframe
-    df = df.copy()
+    if copy:
+        df = df.copy()
     
     # Clean column names
     df.columns = df.columns.str.strip().str.lower()
@@ -61,14 +63,7 @@ def preprocess_data(df):
     
     # Map state to region if region not present
     if 'region' not in df.columns and 'state' in df.columns:
-        df['region'] = df['state'].apply(map_state_to_region)
-    
-    # Handle missing values
-    df['crop'] = df['crop'].fillna('unknown').str.lower().str.strip()
-    df['season'] = df['season'].fillna('kharif').str.lower().str.strip()
-    df['state'] = df['state'].fillna('unknown').str.lower().str.strip()
-    df['district'] = df['district'].fillna('unknown').str.lower().str.strip()
-    df['region'] = df.get('region', pd.Series(['central-india'] * len(df))).fillna('central-india').str.lower().str.strip()
+        df['region'] = map_categories(df['state'], map_state_to_region)
     
     # Standardize season names
     season_mapping = {
@@ -77,7 +72,15 @@ def preprocess_data(df):
         'autumn': 'kharif',
         'whole year': 'kharif'
     }
-    df['season'] = df['season'].replace(season_mapping)
+    
+    # Handle missing values; string columns stay categorical from here on
+    df['crop'] = map_categories(df['crop'], clean_label)
+    df['season'] = map_categories(df['season'], lambda v: season_mapping.get(clean_label(v, 'kharif'), clean_label(v, 'kharif')))
+    df['state'] = map_categories(df['state'], clean_label)
+    df['district'] = map_categories(df['district'], clean_label)
+    if 'region' not in df.columns:
+        df['region'] = 'central-india'
+    df['region'] = map_categories(df['region'], lambda v: clean_label(v, 'central-india'))
     
     # Convert yield to kg/ha if in tons/ha (values < 100 likely in tons)
     if 'yield' in df.columns:
@@ -100,8 +103,7 @@ def preprocess_data(df):
     encoders = {}
     for col in categorical_cols:
         if col in df.columns:
-            le = LabelEncoder()
-            df[col + '_encoded'] = le.fit_transform(df[col].astype(str))
+            le, df[col + '_encoded'] = encode_categorical(df[col])
             encoders[col] = le
             print(f"  Encoded {col}: {len(le.classes_)} unique values")
     
@@ -278,7 +280,7 @@ def main():
     analyze_dataset(df)
     
     # Preprocess
-    X, y, encoders, processed_df = preprocess_data(df)
+    X, y, encoders, processed_df = preprocess_data(df, copy=False)
     
     # Train
     model, metrics = train_model(X, y)
@@ -6,9 +6,11 @@ This script implements an industry-grade Random Forest Regressor with:
 - Spatial cross-validation (by district) for new-region generalization
 - Advanced feature engineering (lagged yields, stress indicators)
 - Satellite data integration (NDVI, Soil Moisture, LST)
-- SHAP-based model interpretability
+- Per-prediction explanations from tree-path contributions (served by /explain)
 - Leak-proof validation pipeline
 - Agronomic outlier detection with crop-specific thresholds
+- Selectable backend: Random Forest or HistGradientBoosting (--backend)
+- Per-stage wall/CPU time, peak RSS and row counts (--profile-stage for cProfile)
 
 Author: AgriTech ML Pipeline
 Version: 2.1 - Enhanced with Satellite Data
@@ -16,18 +18,34 @@ Version: 2.1 - Enhanced with Satellite Data
 
 import os
 import json
+import shutil
+import cProfile
+import resource
+import argparse
+import tempfile
+import time
+import hashlib
+import numbers
 import joblib
 import pandas as pd
 import numpy as np
+from contextlib import contextmanager
 from typing import Dict, List, Tuple, Optional
 from sklearn.model_selection import train_test_split, GroupKFold, cross_val_score
-from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
+from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor, HistGradientBoostingRegressor
+from sklearn.inspection import permutation_importance
 from sklearn.linear_model import Ridge, LinearRegression
 from sklearn.preprocessing import LabelEncoder, StandardScaler
 from sklearn.metrics import r2_score, mean_absolute_error, mean_squared_error
+from sklearn.base import clone
+from joblib import Parallel, delayed, effective_n_jobs
 import warnings
 warnings.filterwarnings('ignore')
 
+from forest_engine import FlatForest
+from quantile_index import QuantileIndex, DEFAULT_BINS
+from dataset import read_dataset, iter_chunks, peak_rss_mb, clean_label, map_categories, encode_categorical
+
 # =============================================================================
 # CONFIGURATION
 # =============================================================================
@@ -40,6 +58,42 @@ ENCODERS_PATH = os.path.join(MODEL_DIR, "encoders_v2.pkl")
 SCALER_PATH = os.path.join(MODEL_DIR, "scaler_v2.pkl")
 METRICS_PATH = os.path.join(MODEL_DIR, "metrics_v2.json")
 FEATURE_IMPORTANCE_PATH = os.path.join(MODEL_DIR, "feature_importance.json")
+FOREST_DIR = os.path.join(MODEL_DIR, "forest_v2")
+COMPRESSED_FOREST_DIR = os.path.join(MODEL_DIR, "forest_v2_compressed")
+QUANTILE_INDEX_DIR = os.path.join(MODEL_DIR, "quantile_index_v2")
+CV_CACHE_DIR = os.path.join(MODEL_DIR, "cv_cache")
+PREPROCESS_CACHE_DIR = os.path.join(MODEL_DIR, "preprocess_cache")
+PROFILE_DIR = os.path.join(MODEL_DIR, "profiles")
+
+# Bump when preprocess_data changes in a way the config below does not capture
+PREPROCESS_CACHE_VERSION = 3
+
+# Concurrent cross-validation folds (-1 = one per CPU core)
+CV_N_JOBS = -1
+
+# Model backends selectable with --backend: random forest or histogram gradient boosting
+MODEL_BACKENDS = ('rf', 'hgb')
+# HistGradientBoosting splits a column natively as categorical only below this many codes
+HGB_MAX_BINS = 255
+
+# Forest compression (--compress): accept candidates within these tolerances of the
+# full forest (R² absolute drop, MAE relative increase), searching this grid
+COMPRESSION_R2_TOLERANCE = 0.005
+COMPRESSION_MAE_TOLERANCE = 0.02
+COMPRESSION_TREE_COUNTS = (25, 50, 100, 150, 200)
+COMPRESSION_DEPTH_CAPS = (8, 10, 12, 15)
+COMPRESSION_LEAF_MERGE_FRACTION = 0.02   # of the target std, in kg/ha
+COMPRESSION_SAMPLE_ROWS = 20_000
+
+# Quantile forest index (--quantiles): target bins per leaf histogram, levels checked on the test set
+QUANTILE_BINS = DEFAULT_BINS
+QUANTILE_CHECK_LEVELS = (0.1, 0.5, 0.9)
+
+# Streaming (out-of-core) training: rows per chunk, total trees, bounded holdout
+STREAMING_CHUNKSIZE = 500_000
+STREAMING_N_ESTIMATORS = 300
+STREAMING_HOLDOUT_FRACTION = 0.2
+STREAMING_HOLDOUT_MAX_ROWS = 200_000
 
 # Agronomic limits for outlier detection (crop-specific yield thresholds in kg/ha)
 CROP_YIELD_LIMITS: Dict[str, Tuple[float, float]] = {
@@ -79,26 +133,127 @@ REGION_MAPPING = {
 
 
 # =============================================================================
-# DATA LOADING
+# STAGE PROFILING
 # =============================================================================
 
-def load_data() -> pd.DataFrame:
-    """Load the crop yield dataset with fallback options."""
-    print("=" * 70)
-    print("LOADING DATASET")
-    print("=" * 70)
+class StageProfiler:
+    """
+    Records wall time, CPU time, peak RSS and row counts of pipeline stages.
     
+    Stages nest: a stage opened inside another is recorded as 'parent/child'.
+    The stage named by `profile_stage` (short or full name) also runs under
+    cProfile, and its stats are dumped to PROFILE_DIR for snakeviz or flameprof.
+    """
+    
+    def __init__(self):
+        self.reset()
+    
+    def reset(self, profile_stage: Optional[str] = None):
+        self.records: List[Dict] = []
+        self.profile_stage = profile_stage
+        self._open: List[str] = []
+        self._started = time.perf_counter()
+    
+    @contextmanager
+    def stage(self, name: str, rows: Optional[int] = None):
+        """Time the enclosed block; set record['rows'] inside it once the count is known."""
+        path = "/".join(self._open + [name])
+        record = {"stage": path, "rows": rows}
+        # Appended on entry, so parents come before their children
+        self.records.append(record)
+        self._open.append(name)
+        profiler = cProfile.Profile() if self.profile_stage in (name, path) else None
+        
+        wall, cpu, rss = time.perf_counter(), _cpu_seconds(), peak_rss_mb()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield record
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            self._open.pop()
+            record.update({
+                "wall_s": round(time.perf_counter() - wall, 3),
+                "cpu_s": round(_cpu_seconds() - cpu, 3),
+                "peak_rss_mb": round(peak_rss_mb(), 1),
+                "peak_rss_growth_mb": round(peak_rss_mb() - rss, 1)
+            })
+            if record["rows"] is not None:
+                record["rows"] = int(record["rows"])
+            if profiler is not None:
+                os.makedirs(PROFILE_DIR, exist_ok=True)
+                dump_path = os.path.join(PROFILE_DIR, f"{path.replace('/', '.')}.prof")
+                profiler.dump_stats(dump_path)
+                record["cprofile"] = dump_path
+                print(f"  ✓ cProfile stats for '{path}' saved: {dump_path}")
+    
+    def report(self) -> Dict:
+        """Finished stages plus the run's total wall time and peak RSS, for metrics_v2.json."""
+        return {
+            "total_wall_s": round(time.perf_counter() - self._started, 3),
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+            "stages": [dict(r) for r in self.records if "wall_s" in r]
+        }
+    
+    def print_summary(self):
+        total = time.perf_counter() - self._started
+        print(f"\n  {'Stage':<40} {'Wall s':>9} {'CPU s':>9} {'Share':>6} {'Peak RSS MB':>12} {'Rows':>12}")
+        for r in self.records:
+            if "wall_s" not in r:
+                continue
+            depth = r["stage"].count("/")
+            label = "  " * depth + r["stage"].rsplit("/", 1)[-1]
+            rows = f"{r['rows']:,}" if r["rows"] is not None else ""
+            print(f"  {label:<40} {r['wall_s']:>9.2f} {r['cpu_s']:>9.2f} {r['wall_s'] / total * 100:>5.1f}% "
+                  f"{r['peak_rss_mb']:>12,.0f} {rows:>12}")
+
+
+def _cpu_seconds() -> float:
+    # All threads of this process plus reaped child processes (e.g. joblib workers)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return time.process_time() + children.ru_utime + children.ru_stime
+
+
+# Stages of the current run; main() resets it
+PROFILER = StageProfiler()
+
+
+# =============================================================================
+# DATA LOADING
+# =============================================================================
+
+def resolve_data_path() -> str:
+    """Return the first dataset that exists, preferring the cleaned dataset."""
     for path in [DATA_PATH, LEGACY_DATA_PATH]:
         if os.path.exists(path):
-            print(f"Loading from: {path}")
-            df = pd.read_csv(path)
-            print(f"✓ Loaded {len(df):,} records with {len(df.columns)} columns")
-            print(f"Columns: {list(df.columns)}")
-            return df
+            return path
     
     raise FileNotFoundError("No dataset found! Please add agriculture_optimized.csv")
 
 
+def load_data(path: Optional[str] = None, chunksize: Optional[int] = None) -> pd.DataFrame:
+    """
+    Load the crop yield dataset with fallback options.
+    
+    Only the columns the pipeline uses are parsed, typed as categoricals and
+    float32 (see dataset.py). Large files, or any file when `chunksize` is
+    given, are read in chunks.
+    """
+    print("=" * 70)
+    print("LOADING DATASET")
+    print("=" * 70)
+    
+    path = path or resolve_data_path()
+    print(f"Loading from: {path}")
+    with PROFILER.stage("load_data") as stage:
+        df = read_dataset(path, chunksize=chunksize)
+        stage["rows"] = len(df)
+    print(f"✓ Loaded {len(df):,} records with {len(df.columns)} columns")
+    print(f"Columns: {list(df.columns)}")
+    return df
+
+
 # =============================================================================
 # DATA CLEANING & PREPROCESSING
 # =============================================================================
@@ -126,48 +281,69 @@ def normalize_season(season: str) -> str:
     return SEASON_MAPPING.get(season_lower, season_lower)
 
 
-def detect_agronomic_outliers(df: pd.DataFrame, crop_col: str = 'crop', yield_col: str = 'yield') -> pd.DataFrame:
+def detect_agronomic_outliers(df: pd.DataFrame, crop_col: str = 'crop', yield_col: str = 'yield',
+                              verbose: bool = True) -> pd.DataFrame:
     """
     Remove agronomic outliers using crop-specific yield thresholds.
     This is critical for realistic predictions.
     """
-    print("\n--- Agronomic Outlier Detection ---")
+    if verbose:
+        print("\n--- Agronomic Outlier Detection ---")
     initial_count = len(df)
     
-    def is_valid_yield(row):
-        crop = str(row[crop_col]).lower().strip()
-        yield_val = row[yield_col]
-        
-        if pd.isna(yield_val) or yield_val <= 0:
-            return False
-        
-        # Get crop-specific limits or default
-        limits = CROP_YIELD_LIMITS.get(crop, CROP_YIELD_LIMITS['default'])
-        return limits[0] <= yield_val <= limits[1]
+    # Resolve limits once per distinct crop label, then broadcast back by code
+    codes, uniques = pd.factorize(df[crop_col], use_na_sentinel=False)
+    crops = pd.Index(uniques).astype(str).str.lower().str.strip()
+    limits = np.array(
+        [CROP_YIELD_LIMITS.get(crop, CROP_YIELD_LIMITS['default']) for crop in crops],
+        dtype=np.float64
+    ).reshape(-1, 2)
+    lower = limits[codes, 0]
+    upper = limits[codes, 1]
+    
+    yields = pd.to_numeric(df[yield_col], errors='coerce').to_numpy(dtype=np.float64)
+    # NaN compares False everywhere, so missing yields are dropped too
+    valid = (yields > 0) & (yields >= lower) & (yields <= upper)
+    
+    df_clean = df[valid].copy()
     
-    df_clean = df[df.apply(is_valid_yield, axis=1)].copy()
+    if not verbose:
+        return df_clean
     
     removed = initial_count - len(df_clean)
     print(f"  Removed {removed:,} outliers ({removed/initial_count*100:.1f}%)")
     print(f"  Remaining records: {len(df_clean):,}")
     
+    removed_by_crop = (
+        pd.Series(np.bincount(codes[~valid], minlength=len(crops)), index=crops)
+        .groupby(level=0).sum()
+    )
+    removed_by_crop = removed_by_crop[removed_by_crop > 0].sort_values(ascending=False)
+    if len(removed_by_crop):
+        print("  Removed per crop:")
+        for crop, count in removed_by_crop.items():
+            print(f"    {crop}: {count:,}")
+    
     return df_clean
 
 
-def preprocess_data(df: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[str, LabelEncoder], StandardScaler]:
-    """
-    Comprehensive data preprocessing with feature engineering.
-    Returns: (processed_df, encoders, scaler)
+def clean_records(df: pd.DataFrame, yield_in_tons: Optional[bool] = None, verbose: bool = True,
+                  rng: Optional[np.random.Generator] = None) -> pd.DataFrame:
     """
-    print("\n" + "=" * 70)
-    print("DATA PREPROCESSING & FEATURE ENGINEERING")
-    print("=" * 70)
+    Row-wise cleaning steps of preprocess_data (steps 1-7b), modifying `df` in place.
     
-    df = df.copy()
+    Nothing here depends on statistics of the whole dataset except the
+    tons/ha check, which callers cleaning chunk by chunk decide once and
+    pass as `yield_in_tons`. Simulated columns are drawn from `rng`
+    (default: seeded with 42), never from numpy's global RNG.
+    """
+    log = print if verbose else (lambda *args, **kwargs: None)
+    if rng is None:
+        rng = np.random.default_rng(42)
     
     # Step 1: Normalize column names
     df.columns = df.columns.str.strip().str.lower().str.replace(' ', '_')
-    print(f"\n1. Normalized columns: {list(df.columns)}")
+    log(f"\n1. Normalized columns: {list(df.columns)}")
     
     # Step 2: Handle different column name variations
     column_mapping = {
@@ -179,31 +355,33 @@ def preprocess_data(df: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[str, LabelEnco
         if old in df.columns and new not in df.columns:
             df[new] = df[old]
     
-    # Step 3: Clean string columns
+    # Step 3: Clean string columns (kept as categoricals from here on)
     string_cols = ['state', 'district', 'crop', 'season']
     for col in string_cols:
         if col in df.columns:
-            df[col] = df[col].fillna('unknown').astype(str).str.lower().str.strip()
+            df[col] = map_categories(df[col], clean_label)
     
     # Step 4: Normalize season
     if 'season' in df.columns:
-        df['season'] = df['season'].apply(normalize_season)
-        print(f"\n2. Season distribution:\n{df['season'].value_counts()}")
+        df['season'] = map_categories(df['season'], normalize_season)
+        log(f"\n2. Season distribution:\n{df['season'].value_counts()}")
     
     # Step 5: Add region if not present
     if 'region' not in df.columns and 'state' in df.columns:
-        df['region'] = df['state'].apply(map_state_to_region)
-        print(f"\n3. Region mapping created from states")
+        df['region'] = map_categories(df['state'], map_state_to_region)
+        log(f"\n3. Region mapping created from states")
     
     # Step 6: Handle yield conversion (tons/ha to kg/ha if needed)
     if 'yield' in df.columns:
-        # If median yield < 100, likely in tons/ha
-        if df['yield'].median() < 100:
-            print("\n4. Converting yield from tons/ha to kg/ha...")
+        # If median yield < 100, likely in tons/ha (unless the caller already decided)
+        if yield_in_tons is None:
+            yield_in_tons = df['yield'].median() < 100
+        if yield_in_tons:
+            log("\n4. Converting yield from tons/ha to kg/ha...")
             df['yield'] = df['yield'] * 1000
     
     # Step 7: Remove agronomic outliers
-    df = detect_agronomic_outliers(df)
+    df = detect_agronomic_outliers(df, verbose=verbose)
 
     # Step 7b: Simulate Satellite Data (if missing)
     # This allows training on legacy data while preparing model for production satellite features
@@ -211,92 +389,110 @@ def preprocess_data(df: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[str, LabelEnco
     # The cleaned dataset might miss temperature/humidity (weather) and satellite features.
     # We backfill them to ensure the model schema remains consistent with the FastAPI endpoint.
     if 'temperature' not in df.columns:
-        print("\n4a. Simulating missing weather data (Temp/Humidity)...")
+        log("\n4a. Simulating missing weather data (Temp/Humidity)...")
         # Temp: 25-35°C typical for growing seasons
-        df['temperature'] = np.random.uniform(25, 35, size=len(df))
+        df['temperature'] = rng.uniform(25, 35, size=len(df))
         # Humidity: 40-80%
-        df['humidity'] = np.random.uniform(40, 80, size=len(df))
+        df['humidity'] = rng.uniform(40, 80, size=len(df))
     
     if 'soil_type' not in df.columns:
-        print("\n4b. Simulating missing soil_type data...")
+        log("\n4b. Simulating missing soil_type data...")
         soil_types = ['clay', 'sandy', 'loamy', 'black', 'red', 'alluvial']
-        df['soil_type'] = np.random.choice(soil_types, size=len(df))
+        df['soil_type'] = pd.Categorical(rng.choice(soil_types, size=len(df)), categories=sorted(soil_types))
 
     if 'ndvi' not in df.columns:
-        print("\n4c. Simulating missing satellite data for training...")
-        np.random.seed(42)
+        log("\n4c. Simulating missing satellite data for training...")
         
         # NDVI: 0.2-0.8 based on crop and moisture
         # Healthy crops need higher NDVI
-        df['ndvi'] = np.random.uniform(0.3, 0.8, size=len(df))
+        df['ndvi'] = rng.uniform(0.3, 0.8, size=len(df))
         
         # Soil Moisture: 10-60%
-        df['soil_moisture'] = np.random.uniform(15, 45, size=len(df))
+        df['soil_moisture'] = rng.uniform(15, 45, size=len(df))
         
         # LST: 20-35°C
         if 'temperature' in df.columns:
-            df['lst'] = df['temperature'] + np.random.uniform(-2, 5, size=len(df))
+            df['lst'] = df['temperature'] + rng.uniform(-2, 5, size=len(df))
         else:
-            df['lst'] = np.random.uniform(20, 35, size=len(df))
+            df['lst'] = rng.uniform(20, 35, size=len(df))
             
-        print("  ✓ Backfilled NDVI, Soil Moisture, LST")
+        log("  ✓ Backfilled NDVI, Soil Moisture, LST")
     
-    # Step 8: Feature Engineering
-    print("\n5. Engineering features...")
-    
-    # 8a. Yield per hectare productivity index
-    if 'production' in df.columns and 'area_hectares' in df.columns:
-        df['productivity_index'] = df['production'] / (df['area_hectares'] + 1)
+    return df
+
+
+def preprocess_data(df: pd.DataFrame, copy: bool = True) -> Tuple[pd.DataFrame, Dict[str, LabelEncoder], StandardScaler]:
+    """
+    Comprehensive data preprocessing with feature engineering.
+    Pass copy=False when the caller no longer needs `df` to modify it in place.
+    Returns: (processed_df, encoders, scaler)
+    """
+    print("\n" + "=" * 70)
+    print("DATA PREPROCESSING & FEATURE ENGINEERING")
+    print("=" * 70)
     
-    # 8b. Input intensity features
-    if 'fertilizer' in df.columns:
-        df['fertilizer'] = pd.to_numeric(df['fertilizer'], errors='coerce').fillna(0)
-        df['fertilizer_intensity'] = df['fertilizer'] / (df['area_hectares'] + 1)
+    if copy:
+        df = df.copy()
     
-    if 'pesticide' in df.columns:
-        df['pesticide'] = pd.to_numeric(df['pesticide'], errors='coerce').fillna(0)
-        df['pesticide_intensity'] = df['pesticide'] / (df['area_hectares'] + 1)
+    with PROFILER.stage("clean_records", rows=len(df)):
+        df = clean_records(df)
     
-    # 8c. Rainfall categories (water stress indicator)
-    if 'rainfall' in df.columns:
-        df['rainfall'] = pd.to_numeric(df['rainfall'], errors='coerce').fillna(0)
-        df['rainfall_category'] = pd.cut(
-            df['rainfall'],
-            bins=[0, 500, 1000, 1500, 2000, float('inf')],
-            labels=['very_low', 'low', 'medium', 'high', 'very_high']
-        ).astype(str)
+    # Step 8: Feature Engineering
+    print("\n5. Engineering features...")
+    with PROFILER.stage("feature_engineering", rows=len(df)):
+        # 8a. Yield per hectare productivity index
+        if 'production' in df.columns and 'area_hectares' in df.columns:
+            df['productivity_index'] = df['production'] / (df['area_hectares'] + 1)
+        
+        # 8b. Input intensity features
+        if 'fertilizer' in df.columns:
+            df['fertilizer'] = pd.to_numeric(df['fertilizer'], errors='coerce').fillna(0)
+            df['fertilizer_intensity'] = df['fertilizer'] / (df['area_hectares'] + 1)
+        
+        if 'pesticide' in df.columns:
+            df['pesticide'] = pd.to_numeric(df['pesticide'], errors='coerce').fillna(0)
+            df['pesticide_intensity'] = df['pesticide'] / (df['area_hectares'] + 1)
+        
+        # 8c. Rainfall categories (water stress indicator)
+        if 'rainfall' in df.columns:
+            df['rainfall'] = pd.to_numeric(df['rainfall'], errors='coerce').fillna(0)
+            df['rainfall_category'] = pd.cut(
+                df['rainfall'],
+                bins=[0, 500, 1000, 1500, 2000, float('inf')],
+                labels=['very_low', 'low', 'medium', 'high', 'very_high']
+            ).astype(str)
     
     # 8d. Lagged features (previous year's data for same state-crop)
-    if 'year' in df.columns:
-        df = df.sort_values(['state', 'crop', 'year'])
-        df['prev_year_yield'] = df.groupby(['state', 'crop'])['yield'].shift(1)
-        df['yield_change'] = df['yield'] - df['prev_year_yield'].fillna(df['yield'])
-        print("  ✓ Created lagged yield features")
+    with PROFILER.stage("lag_features", rows=len(df)):
+        if 'year' in df.columns:
+            df = df.sort_values(['state', 'crop', 'year'])
+            df['prev_year_yield'] = df.groupby(['state', 'crop'], observed=True)['yield'].shift(1)
+            df['yield_change'] = df['yield'] - df['prev_year_yield'].fillna(df['yield'])
+            print("  ✓ Created lagged yield features")
     
     # Step 9: Encode categorical variables
     print("\n6. Encoding categorical features...")
-    categorical_cols = ['state', 'district', 'crop', 'season', 'region', 'soil_type']
-    encoders = {}
-    
-    for col in categorical_cols:
-        if col in df.columns:
-            le = LabelEncoder()
-            df[f'{col}_encoded'] = le.fit_transform(df[col].astype(str))
-            encoders[col] = le
-            print(f"  ✓ Encoded {col}: {len(le.classes_)} unique values")
+    with PROFILER.stage("encode_categoricals", rows=len(df)):
+        categorical_cols = ['state', 'district', 'crop', 'season', 'region', 'soil_type']
+        encoders = {}
+        
+        for col in categorical_cols:
+            if col in df.columns:
+                le, df[f'{col}_encoded'] = encode_categorical(df[col])
+                encoders[col] = le
+                print(f"  ✓ Encoded {col}: {len(le.classes_)} unique values")
     
     # Step 10: Scale numerical features
     print("\n7. Scaling numerical features...")
-    numerical_cols = ['rainfall', 'ndvi', 'soil_moisture', 'lst', 'temperature', 'humidity']
-
-    
-    scaler = StandardScaler()
-    scale_cols = [col for col in numerical_cols if col in df.columns]
-    
-    if scale_cols:
-        df[scale_cols] = df[scale_cols].fillna(0)
-        df[[f'{col}_scaled' for col in scale_cols]] = scaler.fit_transform(df[scale_cols])
-        print(f"  ✓ Scaled {len(scale_cols)} numerical features")
+    with PROFILER.stage("scale_numericals", rows=len(df)):
+        numerical_cols = ['rainfall', 'ndvi', 'soil_moisture', 'lst', 'temperature', 'humidity']
+        scaler = StandardScaler()
+        scale_cols = [col for col in numerical_cols if col in df.columns]
+        
+        if scale_cols:
+            df[scale_cols] = df[scale_cols].fillna(0)
+            df[[f'{col}_scaled' for col in scale_cols]] = scaler.fit_transform(df[scale_cols])
+            print(f"  ✓ Scaled {len(scale_cols)} numerical features")
     
     # Final stats
     print(f"\n{'='*70}")
@@ -312,6 +508,87 @@ def preprocess_data(df: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[str, LabelEnco
     return df, encoders, scaler
 
 
+# =============================================================================
+# PREPROCESSING CACHE
+# =============================================================================
+
+def preprocess_cache_key(data_path: str) -> str:
+    """Content hash of the input file combined with the preprocessing configuration."""
+    digest = hashlib.sha256()
+    with open(data_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    
+    config = {
+        'version': PREPROCESS_CACHE_VERSION,
+        'crop_yield_limits': CROP_YIELD_LIMITS,
+        'season_mapping': SEASON_MAPPING,
+        'region_mapping': REGION_MAPPING,
+    }
+    digest.update(json.dumps(config, sort_keys=True).encode())
+    return digest.hexdigest()[:32]
+
+
+def _frame_path(cache_dir: str) -> str:
+    # Parquet keeps categorical dtypes and the index; fall back to pickle without pyarrow
+    try:
+        import pyarrow  # noqa: F401
+        return os.path.join(cache_dir, "frame.parquet")
+    except ImportError:
+        return os.path.join(cache_dir, "frame.pkl")
+
+
+def load_or_preprocess(data_path: Optional[str] = None) -> Tuple[pd.DataFrame, Dict[str, LabelEncoder], StandardScaler]:
+    """
+    Return the output of preprocess_data, reusing a cached copy when the
+    input file and preprocessing config are unchanged.
+    
+    Cache entries live in PREPROCESS_CACHE_DIR/<key>/ as a Parquet frame plus
+    the fitted encoders and scaler. On a hit the CSV is not read at all.
+    """
+    data_path = data_path or resolve_data_path()
+    start = time.perf_counter()
+    
+    if not PREPROCESS_CACHE_DIR:
+        df_processed, encoders, scaler = preprocess_data(load_data(data_path), copy=False)
+        print(f"\n⏱ Preprocessing (cache disabled): {time.perf_counter() - start:.2f}s")
+        return df_processed, encoders, scaler
+    
+    cache_dir = os.path.join(PREPROCESS_CACHE_DIR, preprocess_cache_key(data_path))
+    frame_path = _frame_path(cache_dir)
+    encoders_path = os.path.join(cache_dir, "encoders.pkl")
+    scaler_path = os.path.join(cache_dir, "scaler.pkl")
+    
+    if all(os.path.exists(p) for p in [frame_path, encoders_path, scaler_path]):
+        with PROFILER.stage("read_preprocess_cache") as stage:
+            if frame_path.endswith(".parquet"):
+                df_processed = pd.read_parquet(frame_path)
+            else:
+                df_processed = pd.read_pickle(frame_path)
+            encoders = joblib.load(encoders_path)
+            scaler = joblib.load(scaler_path)
+            stage["rows"] = len(df_processed)
+        print(f"\n✓ Preprocessing cache hit: {cache_dir}")
+        print(f"⏱ Preprocessing (warm): {time.perf_counter() - start:.2f}s for {len(df_processed):,} records")
+        return df_processed, encoders, scaler
+    
+    df_processed, encoders, scaler = preprocess_data(load_data(data_path), copy=False)
+    elapsed = time.perf_counter() - start
+    
+    with PROFILER.stage("write_preprocess_cache", rows=len(df_processed)):
+        os.makedirs(cache_dir, exist_ok=True)
+        if frame_path.endswith(".parquet"):
+            df_processed.to_parquet(frame_path)
+        else:
+            df_processed.to_pickle(frame_path)
+        joblib.dump(encoders, encoders_path)
+        joblib.dump(scaler, scaler_path)
+    
+    print(f"\n✓ Preprocessing cached: {cache_dir}")
+    print(f"⏱ Preprocessing (cold): {elapsed:.2f}s for {len(df_processed):,} records")
+    return df_processed, encoders, scaler
+
+
 # =============================================================================
 # FEATURE SELECTION
 # =============================================================================
@@ -350,23 +627,94 @@ def select_features(df: pd.DataFrame) -> Tuple[pd.DataFrame, List[str]]:
 # VALIDATION STRATEGIES (LEAK-PROOF)
 # =============================================================================
 
-def temporal_cv(df: pd.DataFrame, X: pd.DataFrame, y: pd.Series, model, n_splits: int = 5) -> Dict:
-    """
-    Time-based cross-validation: Train on past years, test on future years.
-    This simulates real-world prediction scenarios.
+def _score_fold(estimator, X: np.ndarray, y: np.ndarray, train_idx: np.ndarray, test_idx: np.ndarray) -> Dict[str, float]:
+    """Fit one fold and score it. Runs in a worker process; X and y arrive memory-mapped."""
+    estimator.fit(X[train_idx], y[train_idx])
+    y_test = y[test_idx]
+    y_pred = estimator.predict(X[test_idx])
+    return {
+        'r2': float(r2_score(y_test, y_pred)),
+        'mae': float(mean_absolute_error(y_test, y_pred)),
+        'rmse': float(np.sqrt(mean_squared_error(y_test, y_pred)))
+    }
+
+
+def run_cv_folds(folds: List[Tuple[str, np.ndarray, np.ndarray]], X: pd.DataFrame, y: pd.Series, model) -> Dict:
     """
-    print("\n--- Temporal Cross-Validation (by Year) ---")
+    Evaluate `model` on precomputed (label, train_idx, test_idx) folds.
     
-    if 'year' not in df.columns:
-        print("  ⚠ No year column, using standard CV")
-        return {}
+    Folds run concurrently in a process pool. The feature matrix is
+    converted once and handed to workers memory-mapped rather than copied.
+    Each fold's scores are cached in CV_CACHE_DIR under a hash of the data,
+    the fold indices and the hyperparameters, so re-runs skip unchanged folds.
+    """
+    results = {'r2': [], 'mae': [], 'rmse': []}
+    if not folds:
+        return results
+    
+    X_values = np.ascontiguousarray(X, dtype=np.float32)
+    y_values = np.ascontiguousarray(y, dtype=np.float64)
+    
+    # n_jobs and verbose do not change the fitted model, so they stay out of the key
+    params = {k: v for k, v in model.get_params().items() if k not in ('n_jobs', 'verbose')}
+    model_key = joblib.hash((type(model).__name__, params, joblib.hash((X_values, y_values))))
+    keys = [joblib.hash((model_key, train_idx, test_idx)) for _, train_idx, test_idx in folds]
+    
+    scores = {key: _read_cv_cache(key) for key in keys}
+    todo = [i for i, key in enumerate(keys) if scores[key] is None]
+    
+    if todo:
+        n_workers = min(len(todo), effective_n_jobs(CV_N_JOBS))
+        # Split the cores between concurrent folds instead of oversubscribing them
+        inner_jobs = max(1, effective_n_jobs(-1) // n_workers)
+        # Boosting models have no n_jobs (they use OpenMP threads)
+        overrides = {'n_jobs': inner_jobs, 'verbose': 0}
+        estimator = clone(model).set_params(**{k: v for k, v in overrides.items() if k in model.get_params()})
+        
+        fold_scores = Parallel(n_jobs=n_workers, max_nbytes='1M', mmap_mode='r')(
+            delayed(_score_fold)(clone(estimator), X_values, y_values, folds[i][1], folds[i][2])
+            for i in todo
+        )
+        for i, fold_score in zip(todo, fold_scores):
+            scores[keys[i]] = fold_score
+            _write_cv_cache(keys[i], fold_score)
+    
+    computed = set(todo)
+    for i, (label, _, _) in enumerate(folds):
+        fold_score = scores[keys[i]]
+        for metric in results:
+            results[metric].append(fold_score[metric])
+        cached = "" if i in computed else " (cached)"
+        print(f"  {label}: R²={fold_score['r2']:.4f}, MAE={fold_score['mae']:.0f}{cached}")
     
+    return results
+
+
+def _read_cv_cache(key: str) -> Optional[Dict[str, float]]:
+    if not CV_CACHE_DIR:
+        return None
+    path = os.path.join(CV_CACHE_DIR, f"{key}.json")
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def _write_cv_cache(key: str, fold_score: Dict[str, float]):
+    if not CV_CACHE_DIR:
+        return
+    os.makedirs(CV_CACHE_DIR, exist_ok=True)
+    tmp_path = os.path.join(CV_CACHE_DIR, f"{key}.json.tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(fold_score, f)
+    os.replace(tmp_path, os.path.join(CV_CACHE_DIR, f"{key}.json"))
+
+
+def build_temporal_folds(df: pd.DataFrame, n_splits: int = 5) -> List[Tuple[str, np.ndarray, np.ndarray]]:
+    """Folds that train on all years before a test year, for the last `n_splits` years."""
     years = sorted(df['year'].unique())
-    if len(years) < 3:
-        print("  ⚠ Not enough years for temporal CV")
-        return {}
-    
-    results = {'r2': [], 'mae': [], 'rmse': []}
+    year_values = df['year'].to_numpy()
+    folds = []
     
     # Use last n_splits years as test sets sequentially
     for i in range(min(n_splits, len(years) - 2)):
@@ -376,23 +724,44 @@ def temporal_cv(df: pd.DataFrame, X: pd.DataFrame, y: pd.Series, model, n_splits
         if len(train_years) < 2:
             continue
         
-        train_mask = df['year'].isin(train_years)
-        test_mask = df['year'] == test_year
-        
-        X_train, X_test = X[train_mask], X[test_mask]
-        y_train, y_test = y[train_mask], y[test_mask]
+        train_idx = np.flatnonzero(year_values < test_year)
+        test_idx = np.flatnonzero(year_values == test_year)
         
-        if len(X_test) < 10:
+        if len(test_idx) < 10:
             continue
         
-        model.fit(X_train, y_train)
-        y_pred = model.predict(X_test)
-        
-        results['r2'].append(r2_score(y_test, y_pred))
-        results['mae'].append(mean_absolute_error(y_test, y_pred))
-        results['rmse'].append(np.sqrt(mean_squared_error(y_test, y_pred)))
-        
-        print(f"  Test Year {test_year}: R²={results['r2'][-1]:.4f}, MAE={results['mae'][-1]:.0f}")
+        folds.append((f"Test Year {test_year}", train_idx, test_idx))
+    
+    return folds
+
+
+def build_spatial_folds(df: pd.DataFrame, X: pd.DataFrame, y: pd.Series, n_splits: int = 5) -> List[Tuple[str, np.ndarray, np.ndarray]]:
+    """GroupKFold folds by district, so test districts are never seen in training."""
+    groups = df['district'].values
+    gkf = GroupKFold(n_splits=min(n_splits, len(df['district'].unique())))
+    return [
+        (f"Fold {fold + 1}", train_idx, test_idx)
+        for fold, (train_idx, test_idx) in enumerate(gkf.split(X, y, groups))
+    ]
+
+
+def temporal_cv(df: pd.DataFrame, X: pd.DataFrame, y: pd.Series, model, n_splits: int = 5) -> Dict:
+    """
+    Time-based cross-validation: Train on past years, test on future years.
+    This simulates real-world prediction scenarios.
+    """
+    print("\n--- Temporal Cross-Validation (by Year) ---")
+    
+    if 'year' not in df.columns:
+        print("  ⚠ No year column, using standard CV")
+        return {}
+    
+    years = sorted(df['year'].unique())
+    if len(years) < 3:
+        print("  ⚠ Not enough years for temporal CV")
+        return {}
+    
+    results = run_cv_folds(build_temporal_folds(df, n_splits), X, y, model)
     
     if results['r2']:
         print(f"\n  Mean Temporal CV R²: {np.mean(results['r2']):.4f} ± {np.std(results['r2']):.4f}")
@@ -411,26 +780,10 @@ def spatial_cv(df: pd.DataFrame, X: pd.DataFrame, y: pd.Series, model, n_splits:
         print("  ⚠ No district column, skipping spatial CV")
         return {}
     
-    # Group by district
-    groups = df['district'].values
-    gkf = GroupKFold(n_splits=min(n_splits, len(df['district'].unique())))
-    
     results = {'r2': [], 'mae': [], 'rmse': []}
     
     try:
-        for fold, (train_idx, test_idx) in enumerate(gkf.split(X, y, groups)):
-            X_train, X_test = X.iloc[train_idx], X.iloc[test_idx]
-            y_train, y_test = y.iloc[train_idx], y.iloc[test_idx]
-            
-            model.fit(X_train, y_train)
-            y_pred = model.predict(X_test)
-            
-            results['r2'].append(r2_score(y_test, y_pred))
-            results['mae'].append(mean_absolute_error(y_test, y_pred))
-            results['rmse'].append(np.sqrt(mean_squared_error(y_test, y_pred)))
-            
-            print(f"  Fold {fold + 1}: R²={results['r2'][-1]:.4f}, MAE={results['mae'][-1]:.0f}")
-        
+        results = run_cv_folds(build_spatial_folds(df, X, y, n_splits), X, y, model)
         print(f"\n  Mean Spatial CV R²: {np.mean(results['r2']):.4f} ± {np.std(results['r2']):.4f}")
     except Exception as e:
         print(f"  ⚠ Spatial CV error: {e}")
@@ -466,9 +819,144 @@ def train_baseline_models(X_train, X_test, y_train, y_test) -> Dict:
     return results
 
 
-def train_production_model(X: pd.DataFrame, y: pd.Series, df: pd.DataFrame) -> Tuple[RandomForestRegressor, Dict]:
+def native_categorical_mask(X: pd.DataFrame) -> List[bool]:
+    """
+    Encoded columns HistGradientBoosting can split as categories.
+    High-cardinality columns (district) stay ordinal.
+    """
+    return [col.endswith('_encoded') and X[col].max() < HGB_MAX_BINS for col in X.columns]
+
+
+def build_model(backend: str, X: pd.DataFrame, light: bool = False):
+    """Create the production estimator for `backend`, or a lighter one for cross-validation."""
+    if backend == 'rf':
+        if light:
+            return RandomForestRegressor(n_estimators=100, max_depth=15, random_state=42, n_jobs=-1)
+        return RandomForestRegressor(
+            n_estimators=300,           # More trees for stability
+            max_depth=20,               # Deeper for complex patterns
+            min_samples_split=10,       # Prevent overfitting
+            min_samples_leaf=5,         # Leaf size regularization
+            max_features='sqrt',        # Feature randomization
+            bootstrap=True,             # Out-of-bag estimation
+            oob_score=True,             # Enable OOB scoring
+            random_state=42,
+            n_jobs=-1,                  # Use all CPU cores
+            verbose=1
+        )
+    
+    if backend == 'hgb':
+        categorical = native_categorical_mask(X)
+        return HistGradientBoostingRegressor(
+            max_iter=200 if light else 500,
+            learning_rate=0.1,
+            max_leaf_nodes=63,
+            min_samples_leaf=20,
+            l2_regularization=1.0,
+            max_bins=HGB_MAX_BINS,
+            categorical_features=categorical if any(categorical) else None,
+            early_stopping=True,        # Stops on a 10% validation split
+            n_iter_no_change=20,
+            random_state=42
+        )
+    
+    raise ValueError(f"Unknown model backend {backend!r}, expected one of {MODEL_BACKENDS}")
+
+
+def compute_feature_importance(model, X_test: pd.DataFrame, y_test: pd.Series) -> Dict[str, float]:
+    """Impurity importance for forests, permutation importance on a test sample otherwise."""
+    if hasattr(model, 'feature_importances_'):
+        return dict(zip(X_test.columns, model.feature_importances_))
+    
+    sample = X_test.sample(min(len(X_test), 5000), random_state=42)
+    result = permutation_importance(model, sample, y_test.loc[sample.index], n_repeats=3, random_state=42)
+    return dict(zip(X_test.columns, result.importances_mean))
+
+
+def profile_serving(model, X_sample: pd.DataFrame, n_single: int = 200, batch_size: int = 10000) -> Dict[str, float]:
+    """
+    Measure what serving `model` costs: pickled size, single-row latency and
+    batch throughput. Forests are measured through the FlatForest engine,
+    as main.py serves them.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "model.pkl")
+        joblib.dump(model, path)
+        size_mb = os.path.getsize(path) / 1024 ** 2
+    
+    engine = FlatForest.from_estimator(model) if isinstance(model, RandomForestRegressor) else model
+    return {"model_size_mb": round(size_mb, 2), **time_predict(engine, X_sample, n_single, batch_size)}
+
+
+def time_predict(engine, X_sample: pd.DataFrame, n_single: int = 200, batch_size: int = 10000) -> Dict[str, float]:
+    """Median single-row latency and best-of-3 batch throughput of engine.predict."""
+    X = X_sample.to_numpy(dtype=np.float64)
+    
+    latencies = []
+    for i in range(n_single):
+        row = X[i % len(X)].reshape(1, -1)
+        start = time.perf_counter()
+        engine.predict(row)
+        latencies.append(time.perf_counter() - start)
+    
+    batch = X[:batch_size]
+    best = float('inf')
+    for _ in range(3):
+        start = time.perf_counter()
+        engine.predict(batch)
+        best = min(best, time.perf_counter() - start)
+    
+    return {
+        "single_row_latency_ms": round(float(np.median(latencies)) * 1000, 4),
+        "batch_rows_per_s": round(len(batch) / best, 1)
+    }
+
+
+def previous_serving_profile(X_sample: pd.DataFrame) -> Optional[Dict]:
+    """
+    Serving profile of the model currently in MODEL_PATH / METRICS_PATH,
+    measured now when the old metrics predate the profile.
+    """
+    if not os.path.exists(METRICS_PATH):
+        return None
+    with open(METRICS_PATH, 'r') as f:
+        previous = json.load(f)
+    
+    profile = previous.get('serving')
+    if profile is None and os.path.exists(MODEL_PATH):
+        try:
+            profile = profile_serving(joblib.load(MODEL_PATH), X_sample)
+        except Exception as e:
+            print(f"  Could not profile previous model: {e}")
+            return None
+    if profile is None:
+        return None
+    return {"model_type": previous.get('model_type', 'RandomForestRegressor'), **profile}
+
+
+def print_backend_comparison(previous: Optional[Dict], current: Dict, model_type: str):
+    print(f"\n--- Backend Comparison (vs previous {os.path.basename(METRICS_PATH)}) ---")
+    if previous is None:
+        print("  No previous model to compare against")
+        return
+    
+    rows = [
+        ("Training time (s)", "training_time_s"),
+        ("Model size (MB)", "model_size_mb"),
+        ("Single-row latency (ms)", "single_row_latency_ms"),
+        ("Batch throughput (rows/s)", "batch_rows_per_s"),
+    ]
+    print(f"  {'':28}{previous['model_type']:>32}{model_type:>32}")
+    for label, key in rows:
+        before, after = previous.get(key), current.get(key)
+        before = f"{before:,.4g}" if before is not None else "n/a"
+        after = f"{after:,.4g}" if after is not None else "n/a"
+        print(f"  {label:28}{before:>32}{after:>32}")
+
+
+def train_production_model(X: pd.DataFrame, y: pd.Series, df: pd.DataFrame, backend: str = 'rf') -> Tuple[object, Dict]:
     """
-    Train production-grade Random Forest Regressor with optimized hyperparameters.
+    Train the production model for `backend` ('rf' or 'hgb') with optimized hyperparameters.
     """
     print("\n" + "=" * 70)
     print("TRAINING PRODUCTION MODEL")
@@ -481,34 +969,32 @@ def train_production_model(X: pd.DataFrame, y: pd.Series, df: pd.DataFrame) -> T
     print(f"\nTrain size: {len(X_train):,}, Test size: {len(X_test):,}")
     
     # Train baseline models for comparison
-    baseline_results = train_baseline_models(X_train, X_test, y_train, y_test)
+    with PROFILER.stage("baseline_models", rows=len(X_train)):
+        baseline_results = train_baseline_models(X_train, X_test, y_train, y_test)
     
-    # Production Random Forest with optimized hyperparameters
-    print("\n--- Training Production Random Forest ---")
-    model = RandomForestRegressor(
-        n_estimators=300,           # More trees for stability
-        max_depth=20,               # Deeper for complex patterns
-        min_samples_split=10,       # Prevent overfitting
-        min_samples_leaf=5,         # Leaf size regularization
-        max_features='sqrt',        # Feature randomization
-        bootstrap=True,             # Out-of-bag estimation
-        oob_score=True,             # Enable OOB scoring
-        random_state=42,
-        n_jobs=-1,                  # Use all CPU cores
-        verbose=1
-    )
+    model = build_model(backend, X)
+    model_type = type(model).__name__
+    print(f"\n--- Training Production {model_type} ---")
+    if backend == 'hgb':
+        native = [col for col, is_cat in zip(X.columns, native_categorical_mask(X)) if is_cat]
+        print(f"  Native categorical features: {native}")
     
     print("Training (this may take a few minutes)...")
-    model.fit(X_train, y_train)
-    print("✓ Model trained successfully!")
+    train_start = time.perf_counter()
+    with PROFILER.stage("production_fit", rows=len(X_train)):
+        model.fit(X_train, y_train)
+    training_time = time.perf_counter() - train_start
+    print(f"✓ Model trained successfully in {training_time:.1f}s!")
     
     # Evaluate on test set
-    y_pred = model.predict(X_test)
+    with PROFILER.stage("evaluate", rows=len(X_test)):
+        y_pred = model.predict(X_test)
     
     r2 = r2_score(y_test, y_pred)
     mae = mean_absolute_error(y_test, y_pred)
     rmse = np.sqrt(mean_squared_error(y_test, y_pred))
     mape = np.mean(np.abs((y_test - y_pred) / (y_test + 1))) * 100
+    oob_score = getattr(model, 'oob_score_', None)
     
     print(f"\n{'='*70}")
     print("FINAL MODEL EVALUATION")
@@ -517,30 +1003,39 @@ def train_production_model(X: pd.DataFrame, y: pd.Series, df: pd.DataFrame) -> T
     print(f"  MAE:                {mae:.2f} kg/ha")
     print(f"  RMSE:               {rmse:.2f} kg/ha")
     print(f"  MAPE:               {mape:.2f}%")
-    print(f"  OOB Score:          {model.oob_score_:.4f}")
+    if oob_score is not None:
+        print(f"  OOB Score:          {oob_score:.4f}")
+    
+    # Serving cost, compared with the model this run replaces
+    with PROFILER.stage("serving_profile"):
+        serving = {"training_time_s": round(training_time, 2), **profile_serving(model, X_test)}
+        previous_serving = previous_serving_profile(X_test)
+    print_backend_comparison(previous_serving, serving, model_type)
     
     # Leak-proof validation
-    temporal_results = temporal_cv(df, X, y, RandomForestRegressor(n_estimators=100, max_depth=15, random_state=42, n_jobs=-1))
-    spatial_results = spatial_cv(df, X, y, RandomForestRegressor(n_estimators=100, max_depth=15, random_state=42, n_jobs=-1))
+    with PROFILER.stage("temporal_cv", rows=len(X)):
+        temporal_results = temporal_cv(df, X, y, build_model(backend, X, light=True))
+    with PROFILER.stage("spatial_cv", rows=len(X)):
+        spatial_results = spatial_cv(df, X, y, build_model(backend, X, light=True))
     
     # Feature importance
     print("\n--- Feature Importance ---")
     feature_names = list(X.columns)
-    importances = model.feature_importances_
-    importance_dict = dict(zip(feature_names, importances))
+    with PROFILER.stage("feature_importance", rows=len(X_test)):
+        importance_dict = compute_feature_importance(model, X_test, y_test)
     
     for name, imp in sorted(importance_dict.items(), key=lambda x: x[1], reverse=True):
         print(f"  {name}: {imp:.4f}")
     
     # Compile metrics
     metrics = {
-        "model_type": "RandomForestRegressor",
+        "model_type": model_type,
+        "backend": backend,
         "version": "2.0",
         "r2_score": float(r2),
         "mae": float(mae),
         "rmse": float(rmse),
         "mape": float(mape),
-        "oob_score": float(model.oob_score_),
         "temporal_cv_r2_mean": float(np.mean(temporal_results.get('r2', [r2]))),
         "temporal_cv_r2_std": float(np.std(temporal_results.get('r2', [0]))),
         "spatial_cv_r2_mean": float(np.mean(spatial_results.get('r2', [r2]))),
@@ -549,20 +1044,502 @@ def train_production_model(X: pd.DataFrame, y: pd.Series, df: pd.DataFrame) -> T
         "test_samples": int(len(X_test)),
         "total_samples": int(len(X)),
         "n_features": int(len(feature_names)),
-        "n_estimators": 300,
-        "max_depth": 20,
         "feature_importance": importance_dict,
-        "baseline_comparison": baseline_results
+        "baseline_comparison": baseline_results,
+        "serving": serving,
+        "previous_serving": previous_serving
     }
+    if backend == 'rf':
+        metrics.update({"oob_score": float(oob_score), "n_estimators": 300, "max_depth": 20})
+    else:
+        metrics.update({"n_iterations": int(model.n_iter_), "max_leaf_nodes": model.max_leaf_nodes})
     
     return model, metrics
 
 
+# =============================================================================
+# FOREST COMPRESSION
+# =============================================================================
+
+def bootstrap_indices(estimator, n_samples: int, n_bootstrap: int) -> Optional[np.ndarray]:
+    """
+    Rows of `estimator`'s bootstrap sample, rebuilt the way RandomForestRegressor
+    draws them: randint(0, n_samples, n_bootstrap) on a RandomState seeded with
+    the tree's random_state.
+    
+    Returns None if the rebuilt sample is not the one the tree was fitted on
+    (a scikit-learn release that samples differently), checked against the
+    distinct and total row counts of the tree's root node.
+    """
+    indices = np.random.RandomState(estimator.random_state).randint(0, n_samples, n_bootstrap, dtype=np.int32)
+    tree = estimator.tree_
+    if tree.n_node_samples[0] != len(np.unique(indices)) or tree.weighted_n_node_samples[0] != n_bootstrap:
+        return None
+    return indices
+
+
+def oob_masks(model: RandomForestRegressor, n_samples: int, rows: np.ndarray) -> Optional[np.ndarray]:
+    """
+    (len(rows), n_estimators) mask of the trees that left each of `rows`
+    (positions in the n_samples training rows) out of their bootstrap sample.
+    
+    Returns None when the bootstrap samples cannot be rebuilt: for forests
+    fitted without bootstrapping, or when bootstrap_indices does not
+    reproduce a tree's sample.
+    """
+    if not model.bootstrap:
+        return None
+    if model.max_samples is None:
+        n_bootstrap = n_samples
+    elif isinstance(model.max_samples, numbers.Integral):
+        n_bootstrap = model.max_samples
+    else:
+        n_bootstrap = max(round(n_samples * model.max_samples), 1)
+    masks = np.empty((len(rows), len(model.estimators_)), dtype=bool)
+    for t, estimator in enumerate(model.estimators_):
+        indices = bootstrap_indices(estimator, n_samples, n_bootstrap)
+        if indices is None:
+            return None
+        oob = np.ones(n_samples, dtype=bool)
+        oob[indices] = False
+        masks[:, t] = oob[rows]
+    return masks
+
+
+def rank_trees_by_oob(model: RandomForestRegressor, X_train: pd.DataFrame, y_train: pd.Series,
+                      rows: np.ndarray, masks: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Tree indices ordered best first by each tree's error on the out-of-bag
+    rows among `rows` (positions in X_train). `masks` is oob_masks' result
+    for `rows`, computed here when not given.
+    
+    Falls back to each tree's error on all of `rows` when the bootstrap
+    samples cannot be rebuilt.
+    """
+    per_tree = FlatForest.from_estimator(model).predict_trees(X_train.iloc[rows])
+    squared_errors = (per_tree - np.asarray(y_train)[rows, None]) ** 2
+    
+    if masks is None:
+        masks = oob_masks(model, len(X_train), rows)
+    if masks is None:
+        print("  Warning: bootstrap samples could not be rebuilt; ranking trees by validation error")
+        return np.argsort(squared_errors.mean(axis=0), kind='stable')
+    errors = np.array([
+        squared_errors[masks[:, t], t].mean() if masks[:, t].any() else np.inf
+        for t in range(masks.shape[1])
+    ])
+    return np.argsort(errors, kind='stable')
+
+
+def distill_forest(teacher: FlatForest, X_train: pd.DataFrame) -> FlatForest:
+    """Fit a small student forest to the full forest's predictions."""
+    student = RandomForestRegressor(
+        n_estimators=50,
+        max_depth=12,
+        min_samples_leaf=5,
+        max_features='sqrt',
+        random_state=42,
+        n_jobs=-1
+    )
+    student.fit(X_train, teacher.predict(X_train))
+    return FlatForest.from_estimator(student)
+
+
+def compress_forest(model: RandomForestRegressor, X: pd.DataFrame, y: pd.Series,
+                    r2_tolerance: float = COMPRESSION_R2_TOLERANCE,
+                    mae_tolerance: float = COMPRESSION_MAE_TOLERANCE,
+                    distill: bool = False) -> Tuple[FlatForest, Dict]:
+    """
+    Search smaller versions of the trained forest and return the smallest one
+    whose out-of-sample R² and MAE on a validation slice of the training split
+    stay within tolerance of the full forest. The selected and full forests
+    are then reported on the test split, which plays no part in the choice.
+    
+    The forest was fitted on the validation rows, so each candidate predicts
+    a row from only the trees that left it out of their bootstrap sample
+    (the out-of-bag rows rank_trees_by_oob rebuilds). In-sample errors would
+    favour the deep full forest, which memorises its training rows. The
+    distilled student is fitted on the other training rows and scored
+    directly.
+    
+    Candidates combine the best-ranked trees (by OOB error), a depth cap and
+    merging of near-identical sibling leaves, plus optionally a distilled
+    student. All work on the flattened arrays, so no tree is retrained.
+    Returns: (selected_forest, report)
+    """
+    print("\n" + "=" * 70)
+    print("FOREST COMPRESSION")
+    print("=" * 70)
+    
+    # Same split as train_production_model
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    rng = np.random.default_rng(42)
+    n_val = max(min(len(X_train) // 5, COMPRESSION_SAMPLE_ROWS), 1)
+    val_rows = np.sort(rng.choice(len(X_train), size=n_val, replace=False))
+    X_eval = X_test.iloc[:COMPRESSION_SAMPLE_ROWS]
+    y_eval = y_test.iloc[:COMPRESSION_SAMPLE_ROWS]
+    
+    full = FlatForest.from_estimator(model)
+    tree_counts = [k for k in COMPRESSION_TREE_COUNTS if k < full.n_estimators] + [full.n_estimators]
+    depth_caps = [None] + [d for d in COMPRESSION_DEPTH_CAPS if d < full.max_depth]
+    
+    masks = oob_masks(model, len(X_train), val_rows)
+    ranking = rank_trees_by_oob(model, X_train, y_train, val_rows, masks)
+    if masks is None:
+        print("  Warning: bootstrap samples could not be rebuilt; validation errors are in-sample")
+        masks = np.ones((len(val_rows), full.n_estimators), dtype=bool)
+    else:
+        # Keep rows every candidate has an out-of-bag tree for (the smallest subset is a prefix of the rest)
+        covered = masks[:, ranking[:tree_counts[0]]].any(axis=1)
+        val_rows, masks = val_rows[covered], masks[covered]
+    X_val, y_val = X_train.iloc[val_rows], y_train.iloc[val_rows]
+    
+    def oob_predict(forest: FlatForest, trees: np.ndarray) -> np.ndarray:
+        """Mean over the out-of-bag trees of each validation row; trees[i] is forest tree i's original index."""
+        mask = masks[:, trees]
+        return (forest.predict_trees(X_val) * mask).sum(axis=1) / mask.sum(axis=1)
+    
+    def evaluate(forest: FlatForest, y_part: pd.Series, y_pred: np.ndarray) -> Dict:
+        return {
+            "n_estimators": forest.n_estimators,
+            "max_depth": forest.max_depth,
+            "node_count": forest.node_count,
+            "size_mb": round(forest.nbytes / 1024 ** 2, 3),
+            "r2_score": float(r2_score(y_part, y_pred)),
+            "mae": float(mean_absolute_error(y_part, y_pred))
+        }
+    
+    reference = evaluate(full, y_val, oob_predict(full, np.arange(full.n_estimators)))
+    min_r2 = reference["r2_score"] - r2_tolerance
+    max_mae = reference["mae"] * (1 + mae_tolerance)
+    print(f"  Full forest: {reference['n_estimators']} trees, {reference['node_count']:,} nodes, "
+          f"out-of-bag validation R²={reference['r2_score']:.4f}, MAE={reference['mae']:.0f} "
+          f"({len(val_rows):,} rows)")
+    print(f"  Accepting validation R² >= {min_r2:.4f} and MAE <= {max_mae:.0f}")
+    
+    merge_tolerance = COMPRESSION_LEAF_MERGE_FRACTION * float(np.std(y_train))
+    
+    best_name, best_forest, best_result = "full", full, reference
+    evaluated = 0
+    
+    def consider(name: str, forest: FlatForest, trees: Optional[np.ndarray] = None):
+        nonlocal best_name, best_forest, best_result, evaluated
+        y_pred = oob_predict(forest, trees) if trees is not None else forest.predict(X_val)
+        result = evaluate(forest, y_val, y_pred)
+        evaluated += 1
+        accepted = result["r2_score"] >= min_r2 and result["mae"] <= max_mae
+        if accepted and result["node_count"] < best_result["node_count"]:
+            best_name, best_forest, best_result = name, forest, result
+    
+    for k in tree_counts:
+        trees = ranking[:k]
+        subset = full.select_trees(trees)
+        for depth in depth_caps:
+            capped = subset.cap_depth(depth) if depth is not None else subset
+            if k < full.n_estimators or depth is not None:
+                consider(f"top{k}_depth{depth or 'full'}", capped, trees)
+            consider(f"top{k}_depth{depth or 'full'}_merged", capped.merge_leaves(merge_tolerance), trees)
+    
+    if distill:
+        print("  Distilling into a 50-tree, depth-12 student...")
+        student_rows = np.setdiff1d(np.arange(len(X_train)), val_rows)
+        consider("distilled_student", distill_forest(full, X_train.iloc[student_rows]))
+    
+    print(f"  Evaluated {evaluated} candidates")
+    
+    # Accuracy and serving cost before and after, on the test split
+    full_test = evaluate(full, y_eval, full.predict(X_eval))
+    best_test = evaluate(best_forest, y_eval, best_forest.predict(X_eval))
+    full_timing = time_predict(full, X_eval)
+    best_timing = time_predict(best_forest, X_eval)
+    size_saving = 1 - best_test["size_mb"] / full_test["size_mb"]
+    latency_saving = 1 - best_timing["single_row_latency_ms"] / full_timing["single_row_latency_ms"]
+    
+    print(f"\n  Selected: {best_name}")
+    print(f"    Trees: {best_test['n_estimators']}, max depth: {best_test['max_depth']}, "
+          f"nodes: {best_test['node_count']:,}")
+    print(f"    Test R²: {best_test['r2_score']:.4f} (full {full_test['r2_score']:.4f}), "
+          f"MAE: {best_test['mae']:.0f} (full {full_test['mae']:.0f})")
+    print(f"    Size: {best_test['size_mb']:.1f} MB (full {full_test['size_mb']:.1f} MB, -{size_saving*100:.1f}%)")
+    print(f"    Single-row latency: {best_timing['single_row_latency_ms']:.3f} ms "
+          f"(full {full_timing['single_row_latency_ms']:.3f} ms, -{latency_saving*100:.0f}%)")
+    print(f"    Batch throughput: {best_timing['batch_rows_per_s']:,.0f} rows/s "
+          f"(full {full_timing['batch_rows_per_s']:,.0f} rows/s)")
+    
+    report = {
+        "selected": best_name,
+        "r2_tolerance": r2_tolerance,
+        "mae_tolerance": mae_tolerance,
+        "candidates_evaluated": evaluated,
+        "validation": {"full": reference, "compressed": best_result},
+        "full": {**full_test, **full_timing},
+        "compressed": {**best_test, **best_timing},
+        "size_saving_pct": round(size_saving * 100, 1),
+        "latency_saving_pct": round(latency_saving * 100, 1)
+    }
+    return best_forest, report
+
+
+# =============================================================================
+# QUANTILE REGRESSION FOREST
+# =============================================================================
+
+def build_quantile_index(model: RandomForestRegressor, X: pd.DataFrame, y: pd.Series,
+                         n_bins: int = QUANTILE_BINS) -> Tuple[QuantileIndex, Dict]:
+    """
+    Build the per-leaf target histograms that turn the forest into a quantile
+    regression forest, and check the calibration of the predicted quantiles.
+    
+    The index is built from the training split only; on the test split each
+    predicted quantile q should lie above roughly a fraction q of the targets.
+    Returns: (index, report)
+    """
+    print("\n" + "=" * 70)
+    print("QUANTILE REGRESSION FOREST")
+    print("=" * 70)
+    
+    # Same split as train_production_model
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    X_eval = X_test.iloc[:COMPRESSION_SAMPLE_ROWS]
+    y_eval = y_test.iloc[:COMPRESSION_SAMPLE_ROWS].to_numpy()
+    
+    forest = FlatForest.from_estimator(model)
+    start = time.time()
+    index = QuantileIndex.build(forest, X_train.to_numpy(), y_train.to_numpy(), n_bins)
+    build_time = time.time() - start
+    
+    predicted = index.predict_quantiles(forest, X_eval, QUANTILE_CHECK_LEVELS)
+    coverage = {
+        f"p{q * 100:g}": round(float(np.mean(y_eval <= predicted[:, i])), 4)
+        for i, q in enumerate(QUANTILE_CHECK_LEVELS)
+    }
+    
+    print(f"  Built from {len(X_train):,} training rows in {build_time:.1f}s")
+    print(f"  Bins: {index.n_bins}, entries: {len(index.bins):,}, "
+          f"size: {index.nbytes / 1024**2:.1f} MB (forest {forest.nbytes / 1024**2:.1f} MB)")
+    print("  Test-set coverage (share of targets at or below each quantile):")
+    for key, value in coverage.items():
+        print(f"    {key}: {value:.3f}")
+    
+    report = {
+        "n_bins": index.n_bins,
+        "entries": int(len(index.bins)),
+        "size_mb": round(index.nbytes / 1024**2, 2),
+        "build_time_s": round(build_time, 2),
+        "coverage": coverage
+    }
+    return index, report
+
+
+# =============================================================================
+# STREAMING (OUT-OF-CORE) TRAINING
+# =============================================================================
+
+def _clean_chunks(data_path: str, chunksize: int):
+    """
+    Yield cleaned chunks of the dataset.
+    
+    Each chunk gets its own generator seeded from its index (the simulated
+    columns in clean_records draw from it), so every pass over the file sees
+    exactly the same records.
+    """
+    yield_in_tons = None
+    for i, chunk in enumerate(iter_chunks(data_path, chunksize)):
+        rng = np.random.default_rng([42, i])
+        chunk.columns = chunk.columns.str.strip().str.lower().str.replace(' ', '_')
+        if yield_in_tons is None and 'yield' in chunk.columns:
+            # Decided once from the first chunk, as preprocess_data does for the whole file
+            yield_in_tons = bool(chunk['yield'].median() < 100)
+        chunk = clean_records(chunk, yield_in_tons=yield_in_tons, verbose=False, rng=rng)
+        if len(chunk):
+            yield chunk
+
+
+def scan_dataset(data_path: str, chunksize: int) -> Tuple[Dict[str, LabelEncoder], StandardScaler, List[str], int, int]:
+    """
+    First streaming pass: collect every category and fit the scaler incrementally.
+    Returns: (encoders, scaler, scale_cols, n_records, n_chunks)
+    """
+    categorical_cols = ['state', 'district', 'crop', 'season', 'region', 'soil_type']
+    numerical_cols = ['rainfall', 'ndvi', 'soil_moisture', 'lst', 'temperature', 'humidity']
+    categories = {}
+    scaler = StandardScaler()
+    scale_cols = None
+    n_records = n_chunks = 0
+    
+    for chunk in _clean_chunks(data_path, chunksize):
+        for col in categorical_cols:
+            if col in chunk.columns:
+                categories.setdefault(col, set()).update(
+                    chunk[col].cat.remove_unused_categories().cat.categories
+                )
+        if scale_cols is None:
+            scale_cols = [col for col in numerical_cols if col in chunk.columns]
+        if 'rainfall' in chunk.columns:
+            chunk['rainfall'] = pd.to_numeric(chunk['rainfall'], errors='coerce')
+        if scale_cols:
+            scaler.partial_fit(chunk[scale_cols].fillna(0))
+        n_records += len(chunk)
+        n_chunks += 1
+        print(f"  Scanned chunk {n_chunks}: {n_records:,} records so far")
+    
+    if n_chunks == 0:
+        raise ValueError(f"No usable records in {data_path}")
+    
+    # Sorted classes give the same codes as encode_categorical on the full frame
+    encoders = {}
+    for col, values in categories.items():
+        le = LabelEncoder()
+        le.classes_ = np.asarray(sorted(values), dtype=object)
+        encoders[col] = le
+        print(f"  ✓ Encoded {col}: {len(le.classes_)} unique values")
+    
+    return encoders, scaler, scale_cols or [], n_records, n_chunks
+
+
+def transform_chunk(chunk: pd.DataFrame, encoders: Dict[str, LabelEncoder], scaler: StandardScaler,
+                    scale_cols: List[str]) -> pd.DataFrame:
+    """Add the encoded and scaled columns of preprocess_data (steps 9-10) using fitted artifacts."""
+    for col, le in encoders.items():
+        chunk[f'{col}_encoded'] = pd.Categorical(chunk[col], categories=le.classes_).codes.astype(np.int64)
+    if 'rainfall' in chunk.columns:
+        chunk['rainfall'] = pd.to_numeric(chunk['rainfall'], errors='coerce')
+    if scale_cols:
+        chunk[scale_cols] = chunk[scale_cols].fillna(0)
+        chunk[[f'{col}_scaled' for col in scale_cols]] = scaler.transform(chunk[scale_cols])
+    return chunk
+
+
+def train_streaming_model(data_path: Optional[str] = None, chunksize: int = STREAMING_CHUNKSIZE
+                          ) -> Tuple[RandomForestRegressor, Dict, StandardScaler, Dict, List[str]]:
+    """
+    Train the production forest without holding the dataset in memory.
+    
+    Two passes over the file, one chunk in memory at a time:
+    1. scan_dataset collects the encoder classes and fits the scaler.
+    2. Each chunk grows its share of STREAMING_N_ESTIMATORS new trees with
+       warm_start, so every tree sees one chunk and the result is a single
+       RandomForestRegressor in the usual artifact format.
+    
+    A random STREAMING_HOLDOUT_FRACTION of rows, capped at
+    STREAMING_HOLDOUT_MAX_ROWS, is held out for evaluation. Temporal and
+    spatial CV need the full frame and are skipped in this mode.
+    Returns: (model, encoders, scaler, metrics, feature_names)
+    """
+    print("\n" + "=" * 70)
+    print("STREAMING TRAINING (OUT-OF-CORE)")
+    print("=" * 70)
+    
+    data_path = data_path or resolve_data_path()
+    print(f"Data: {data_path}, chunk size: {chunksize:,} rows")
+    
+    print("\n--- Pass 1: categories and scaler ---")
+    with PROFILER.stage("scan_dataset") as stage:
+        encoders, scaler, scale_cols, n_records, n_chunks = scan_dataset(data_path, chunksize)
+        stage["rows"] = n_records
+    trees_per_chunk = max(1, int(np.ceil(STREAMING_N_ESTIMATORS / n_chunks)))
+    
+    print(f"\n--- Pass 2: growing {trees_per_chunk} trees per chunk over {n_chunks} chunks ---")
+    model = RandomForestRegressor(
+        n_estimators=trees_per_chunk,
+        max_depth=20,
+        min_samples_split=10,
+        min_samples_leaf=5,
+        max_features='sqrt',
+        bootstrap=True,
+        warm_start=True,            # Each fit adds trees and keeps the existing ones
+        random_state=42,
+        n_jobs=-1
+    )
+    rng = np.random.default_rng(42)
+    feature_names = None
+    holdout_X, holdout_y = [], []
+    n_train = n_holdout = 0
+    
+    with PROFILER.stage("streaming_fit") as stage:
+        for chunk in _clean_chunks(data_path, chunksize):
+            chunk = transform_chunk(chunk, encoders, scaler, scale_cols)
+            if feature_names is None:
+                _, feature_names = select_features(chunk)
+            X_chunk = chunk[feature_names].fillna(0).astype(np.float32)
+            y_chunk = chunk['yield'].to_numpy(dtype=np.float64)
+            del chunk
+            
+            test = rng.random(len(X_chunk)) < STREAMING_HOLDOUT_FRACTION
+            test &= np.cumsum(test) <= STREAMING_HOLDOUT_MAX_ROWS - n_holdout
+            if test.any():
+                holdout_X.append(X_chunk[test])
+                holdout_y.append(y_chunk[test])
+                n_holdout += int(test.sum())
+            
+            train = ~test
+            if train.sum() < 2 * model.min_samples_leaf:
+                continue
+            if hasattr(model, 'estimators_'):
+                model.n_estimators = len(model.estimators_) + trees_per_chunk
+            model.fit(X_chunk[train], y_chunk[train])
+            n_train += int(train.sum())
+            print(f"  Trees: {len(model.estimators_)}, trained on {n_train:,} records, "
+                  f"holdout {n_holdout:,}, peak RSS {peak_rss_mb():,.0f} MB")
+        stage["rows"] = n_train
+    
+    if not hasattr(model, 'estimators_'):
+        raise ValueError("Not enough records to train a model")
+    model.warm_start = False
+    
+    # Evaluate on the bounded holdout
+    if n_holdout > 1:
+        X_test = pd.concat(holdout_X)
+        y_test = np.concatenate(holdout_y)
+        with PROFILER.stage("evaluate", rows=len(X_test)):
+            y_pred = model.predict(X_test)
+        r2 = r2_score(y_test, y_pred)
+        mae = mean_absolute_error(y_test, y_pred)
+        rmse = np.sqrt(mean_squared_error(y_test, y_pred))
+        mape = np.mean(np.abs((y_test - y_pred) / (y_test + 1))) * 100
+    else:
+        r2 = mae = rmse = mape = float('nan')
+    
+    print(f"\n{'='*70}")
+    print("FINAL MODEL EVALUATION (holdout)")
+    print(f"{'='*70}")
+    print(f"  R² Score:           {r2:.4f} ({r2*100:.2f}%)")
+    print(f"  MAE:                {mae:.2f} kg/ha")
+    print(f"  RMSE:               {rmse:.2f} kg/ha")
+    print(f"  MAPE:               {mape:.2f}%")
+    print(f"  Peak RSS:           {peak_rss_mb():,.0f} MB")
+    
+    importance_dict = dict(zip(feature_names, model.feature_importances_))
+    
+    metrics = {
+        "model_type": "RandomForestRegressor",
+        "version": "2.0",
+        "training_mode": "streaming",
+        "r2_score": float(r2),
+        "mae": float(mae),
+        "rmse": float(rmse),
+        "mape": float(mape),
+        "training_samples": n_train,
+        "test_samples": n_holdout,
+        "total_samples": n_records,
+        "n_features": int(len(feature_names)),
+        "n_estimators": int(len(model.estimators_)),
+        "max_depth": 20,
+        "chunksize": int(chunksize),
+        "n_chunks": int(n_chunks),
+        "peak_rss_mb": float(peak_rss_mb()),
+        "feature_importance": importance_dict
+    }
+    
+    return model, encoders, scaler, metrics, feature_names
+
+
 # =============================================================================
 # SAVE ARTIFACTS
 # =============================================================================
 
-def save_artifacts(model, encoders: Dict, scaler: StandardScaler, metrics: Dict, feature_names: List[str]):
+def save_artifacts(model, encoders: Dict, scaler: StandardScaler, metrics: Dict, feature_names: List[str],
+                   compressed: Optional[FlatForest] = None, quantile_index: Optional[QuantileIndex] = None):
     """Save all model artifacts for deployment."""
     print("\n--- Saving Model Artifacts ---")
     
@@ -572,6 +1549,28 @@ def save_artifacts(model, encoders: Dict, scaler: StandardScaler, metrics: Dict,
     joblib.dump(model, MODEL_PATH)
     print(f"  ✓ Model saved: {MODEL_PATH}")
     
+    # Save flattened trees for the array-backed inference engine
+    if isinstance(model, RandomForestRegressor):
+        FlatForest.from_estimator(model).save(FOREST_DIR)
+        print(f"  ✓ Flattened forest saved: {FOREST_DIR}")
+    elif os.path.isdir(FOREST_DIR):
+        # A forest export from an earlier run no longer matches the model
+        shutil.rmtree(FOREST_DIR)
+        print(f"  ✓ Removed stale flattened forest: {FOREST_DIR}")
+    
+    # Save the compressed forest next to the full one
+    if compressed is not None:
+        compressed.save(COMPRESSED_FOREST_DIR)
+        print(f"  ✓ Compressed forest saved: {COMPRESSED_FOREST_DIR}")
+    
+    # Save the quantile index; one from an earlier run would not match the new forest
+    if quantile_index is not None:
+        quantile_index.save(QUANTILE_INDEX_DIR)
+        print(f"  ✓ Quantile index saved: {QUANTILE_INDEX_DIR}")
+    elif os.path.isdir(QUANTILE_INDEX_DIR):
+        shutil.rmtree(QUANTILE_INDEX_DIR)
+        print(f"  ✓ Removed stale quantile index: {QUANTILE_INDEX_DIR}")
+    
     # Save encoders
     joblib.dump(encoders, ENCODERS_PATH)
     print(f"  ✓ Encoders saved: {ENCODERS_PATH}")
@@ -598,28 +1597,87 @@ def save_artifacts(model, encoders: Dict, scaler: StandardScaler, metrics: Dict,
 # MAIN PIPELINE
 # =============================================================================
 
-def main():
+def main(argv: Optional[List[str]] = None):
     """Execute the complete ML training pipeline."""
+    parser = argparse.ArgumentParser(description="Train the crop yield model")
+    parser.add_argument("--data", help="Dataset CSV (default: data/cleaned_crop_data.csv)")
+    parser.add_argument("--backend", choices=MODEL_BACKENDS, default='rf',
+                        help="Model backend: random forest or histogram gradient boosting (default: rf)")
+    parser.add_argument("--compress", action="store_true",
+                        help="Also save the smallest pruned forest within tolerance of the full one")
+    parser.add_argument("--distill", action="store_true",
+                        help="With --compress, also try a distilled student forest")
+    parser.add_argument("--r2-tolerance", type=float, default=COMPRESSION_R2_TOLERANCE,
+                        help=f"Max R² drop accepted by --compress (default: {COMPRESSION_R2_TOLERANCE})")
+    parser.add_argument("--mae-tolerance", type=float, default=COMPRESSION_MAE_TOLERANCE,
+                        help=f"Max relative MAE increase accepted by --compress (default: {COMPRESSION_MAE_TOLERANCE})")
+    parser.add_argument("--quantiles", action="store_true",
+                        help="Also save a quantile regression forest index for /predict/quantiles")
+    parser.add_argument("--streaming", action="store_true",
+                        help="Train out-of-core, one chunk in memory at a time (no temporal/spatial CV)")
+    parser.add_argument("--chunksize", type=int, default=STREAMING_CHUNKSIZE,
+                        help=f"Rows per chunk in streaming mode (default: {STREAMING_CHUNKSIZE:,})")
+    parser.add_argument("--profile-stage", metavar="STAGE",
+                        help="Run this stage (e.g. production_fit or train/temporal_cv) under cProfile "
+                             "and save the stats to model/profiles/")
+    args = parser.parse_args(argv)
+    if args.streaming and args.backend != 'rf':
+        parser.error("--streaming grows a random forest chunk by chunk and only supports --backend rf")
+    if args.compress and args.backend != 'rf':
+        parser.error("--compress prunes random forests and only supports --backend rf")
+    if args.quantiles and args.backend != 'rf':
+        parser.error("--quantiles indexes the leaves of a random forest and only supports --backend rf")
+    
     print("\n" + "=" * 70)
     print("🌾 INDIAN CROP YIELD PREDICTION MODEL v2.0")
-    print("   Production-Grade Random Forest with Leak-Proof Validation")
+    print("   Production-Grade Tree Ensemble with Leak-Proof Validation")
     print("=" * 70)
     
-    # 1. Load data
-    df = load_data()
-    
-    # 2. Preprocess
-    df_processed, encoders, scaler = preprocess_data(df)
-    
-    # 3. Select features
-    X, feature_names = select_features(df_processed)
-    y = df_processed['yield']
-    
-    # 4. Train model
-    model, metrics = train_production_model(X, y, df_processed)
+    PROFILER.reset(args.profile_stage)
+    
+    if args.streaming:
+        # 1-4. Stream the dataset: preprocessing and training chunk by chunk
+        with PROFILER.stage("streaming_training"):
+            model, encoders, scaler, metrics, feature_names = train_streaming_model(args.data, args.chunksize)
+    else:
+        # 1-2. Load and preprocess data (skipped on a preprocessing cache hit)
+        with PROFILER.stage("preprocess") as stage:
+            df_processed, encoders, scaler = load_or_preprocess(args.data)
+            stage["rows"] = len(df_processed)
+        
+        # 3. Select features
+        with PROFILER.stage("select_features", rows=len(df_processed)):
+            X, feature_names = select_features(df_processed)
+            y = df_processed['yield']
+        
+        # 4. Train model
+        with PROFILER.stage("train", rows=len(X)):
+            model, metrics = train_production_model(X, y, df_processed, args.backend)
+    
+    # 4b. Optionally compress the forest into a smaller serving artifact
+    compressed = None
+    if args.compress:
+        if args.streaming:
+            print("\n--compress needs the in-memory training split; skipped in streaming mode")
+        else:
+            with PROFILER.stage("compress_forest", rows=len(X)):
+                compressed, metrics["compression"] = compress_forest(
+                    model, X, y, args.r2_tolerance, args.mae_tolerance, distill=args.distill
+                )
+    
+    # 4c. Optionally index the training targets per leaf for quantile predictions
+    quantile_index = None
+    if args.quantiles:
+        if args.streaming:
+            print("\n--quantiles needs the in-memory training split; skipped in streaming mode")
+        else:
+            with PROFILER.stage("quantile_index", rows=len(X)):
+                quantile_index, metrics["quantile_index"] = build_quantile_index(model, X, y)
     
-    # 5. Save artifacts
-    save_artifacts(model, encoders, scaler, metrics, feature_names)
+    # 5. Save artifacts (the stage profile covers everything before saving)
+    metrics["stage_profile"] = PROFILER.report()
+    with PROFILER.stage("save_artifacts"):
+        save_artifacts(model, encoders, scaler, metrics, feature_names, compressed, quantile_index)
     
     # Final summary
     print("\n" + "=" * 70)
@@ -628,8 +1686,10 @@ def main():
     print(f"  Total samples:        {metrics['total_samples']:,}")
     print(f"  R² Score:             {metrics['r2_score']:.4f}")
     print(f"  MAE:                  {metrics['mae']:.0f} kg/ha")
-    print(f"  Temporal CV R²:       {metrics['temporal_cv_r2_mean']:.4f} ± {metrics['temporal_cv_r2_std']:.4f}")
-    print(f"  Spatial CV R²:        {metrics['spatial_cv_r2_mean']:.4f} ± {metrics['spatial_cv_r2_std']:.4f}")
+    if 'temporal_cv_r2_mean' in metrics:
+        print(f"  Temporal CV R²:       {metrics['temporal_cv_r2_mean']:.4f} ± {metrics['temporal_cv_r2_std']:.4f}")
+        print(f"  Spatial CV R²:        {metrics['spatial_cv_r2_mean']:.4f} ± {metrics['spatial_cv_r2_std']:.4f}")
+    PROFILER.print_summary()
     print("=" * 70)
     
     return model, encoders, scaler, metrics
@@ -0,0 +1,276 @@
+"""
+Yield Surface Index
+
+Precomputed predictions over a rainfall x temperature x humidity grid for
+the most common (state, district, crop, season, soil_type) combinations,
+so what-if queries that move those three inputs are answered by
+interpolation instead of a model call:
+- values.npy: float32 (combinations, rainfall, temperature, humidity) predictions
+- meta.json:  grid axes, the fixed values of the other numerical features
+              and the combination -> row map
+
+The other numerical features (ndvi, soil_moisture, lst) are held at the
+API defaults, so only requests with exactly those values are answered from
+the surface. Between grid points the surface is multilinear; tree models
+are piecewise constant, so interpolated values are within the change of
+the model across one grid cell. values.npy is memory-mapped, and pages of
+combinations nobody asks for are never read.
+
+Usage:
+    python yield_surface.py model/yield_surface [--data data.csv] [--top 200]
+    (scores the grid with the artifacts in MODEL_DIR)
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import itertools
+from bisect import bisect_right
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+VALUES_FILE = "values.npy"
+META_FILE = "meta.json"
+
+SURFACE_FEATURES = ("rainfall", "temperature", "humidity")
+COMBINATION_FEATURES = ("state", "district", "crop", "season", "soil_type")
+
+# (start, stop, points) per axis, inside the ranges the API accepts
+DEFAULT_AXES = {
+    "rainfall": (0.0, 3000.0, 31),
+    "temperature": (0.0, 50.0, 26),
+    "humidity": (0.0, 100.0, 21),
+}
+DEFAULT_TOP = 200
+
+# Grid points scored per model call while building
+SCORE_BLOCK = 50_000
+# Cells re-scored at load time to check the surface against the model
+PROBE_CELLS = 16
+
+# (2^d, d) offsets of the corners of a grid cell
+_CORNERS = np.array(list(itertools.product((0, 1), repeat=len(SURFACE_FEATURES))))
+
+# score(categorical, numerical) -> predictions: label lists per combination
+# feature and float arrays per numerical feature, all of the same length
+ScoreFunction = Callable[[Dict[str, Sequence[str]], Dict[str, np.ndarray]], np.ndarray]
+
+
+def default_axes() -> Dict[str, np.ndarray]:
+    return {name: np.linspace(*DEFAULT_AXES[name]) for name in SURFACE_FEATURES}
+
+
+def grid_points(axes: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    Cartesian product of `axes` as one flat column per axis, in C order
+    (the last axis varies fastest), so results reshape to the axis lengths.
+    """
+    if not axes:
+        return {}
+    mesh = np.meshgrid(*axes.values(), indexing='ij')
+    return {name: values.ravel() for name, values in zip(axes, mesh)}
+
+
+def combination_key(values: Sequence[str]) -> str:
+    """Normalized lookup key of a (state, district, crop, season, soil_type) combination."""
+    return "|".join(str(value).lower().strip() for value in values)
+
+
+class YieldSurface:
+    """Predicted yield on a fixed grid for a set of category combinations."""
+
+    def __init__(self, axes: Dict[str, np.ndarray], fixed: Dict[str, float],
+                 combinations: List[str], values: np.ndarray):
+        self.axes = {name: np.asarray(axes[name], dtype=np.float64) for name in SURFACE_FEATURES}
+        self.fixed = {name: float(value) for name, value in fixed.items()}
+        self.combinations = list(combinations)
+        self.values = values
+        self._rows = {key: row for row, key in enumerate(self.combinations)}
+        # Plain lists for the scalar fast path of single-point queries
+        self._axis_lists = [axis.tolist() for axis in self.axes.values()]
+
+    @property
+    def shape(self) -> tuple:
+        return tuple(len(axis) for axis in self.axes.values())
+
+    @property
+    def nbytes(self) -> int:
+        return self.values.nbytes
+
+    @classmethod
+    def build(cls, score: ScoreFunction, combinations: Sequence[Sequence[str]],
+              axes: Dict[str, np.ndarray], fixed: Dict[str, float]) -> "YieldSurface":
+        """Score every grid point of every combination with `score`, many combinations per call."""
+        points = grid_points({name: axes[name] for name in SURFACE_FEATURES})
+        cells = len(points[SURFACE_FEATURES[0]])
+        values = np.empty((len(combinations), cells), dtype=np.float32)
+
+        per_call = max(1, SCORE_BLOCK // cells)
+        for start in range(0, len(combinations), per_call):
+            block = combinations[start:start + per_call]
+            n = len(block) * cells
+            categorical = {
+                col: np.repeat([combination[j] for combination in block], cells)
+                for j, col in enumerate(COMBINATION_FEATURES)
+            }
+            numerical = {name: np.tile(column, len(block)) for name, column in points.items()}
+            numerical.update({name: np.full(n, value) for name, value in fixed.items()})
+            values[start:start + len(block)] = np.asarray(score(categorical, numerical)).reshape(len(block), cells)
+
+        surface = cls(axes, fixed, [combination_key(c) for c in combinations], values)
+        surface.values = values.reshape((len(combinations),) + surface.shape)
+        return surface
+
+    def save(self, path: str):
+        """Save the surface as values.npy plus a meta.json in directory `path`."""
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, VALUES_FILE), np.ascontiguousarray(self.values, dtype=np.float32))
+        with open(os.path.join(path, META_FILE), 'w') as f:
+            json.dump({
+                "axes": {name: axis.tolist() for name, axis in self.axes.items()},
+                "fixed": self.fixed,
+                "combinations": self.combinations
+            }, f, indent=2)
+
+    @classmethod
+    def load(cls, path: str, mmap_mode: Optional[str] = 'r') -> "YieldSurface":
+        """Load a surface saved with `save`, memory-mapped read-only by default."""
+        with open(os.path.join(path, META_FILE), 'r') as f:
+            meta = json.load(f)
+        # np.asarray drops the np.memmap subclass, whose indexing is much slower
+        values = np.asarray(np.load(os.path.join(path, VALUES_FILE), mmap_mode=mmap_mode))
+        return cls(meta["axes"], meta["fixed"], meta["combinations"], values)
+
+    def matches(self, score: ScoreFunction, cells: int = PROBE_CELLS) -> bool:
+        """True if `score` reproduces a spread of stored cells, i.e. the surface was built for this model."""
+        if not self.combinations:
+            return False
+        flat = np.unique(np.linspace(0, self.values.size - 1, cells).astype(np.int64))
+        rows, *indices = np.unravel_index(flat, self.values.shape)
+        combinations = [self.combinations[row].split("|") for row in rows]
+        categorical = {col: [c[j] for c in combinations] for j, col in enumerate(COMBINATION_FEATURES)}
+        numerical = {name: axis[i] for (name, axis), i in zip(self.axes.items(), indices)}
+        numerical.update({name: np.full(len(flat), value) for name, value in self.fixed.items()})
+        predicted = np.asarray(score(categorical, numerical), dtype=np.float32)
+        return bool(np.allclose(predicted, self.values[(rows, *indices)], rtol=1e-5, atol=1e-2))
+
+    def row(self, categorical: Sequence[str]) -> Optional[int]:
+        """Row of a combination given in COMBINATION_FEATURES order, or None if it was not precomputed."""
+        return self._rows.get(combination_key(categorical))
+
+    def covers(self, numerical: Dict[str, np.ndarray]) -> bool:
+        """True if the fixed features match and every point lies inside the grid."""
+        for name, value in self.fixed.items():
+            low, high = _value_range(numerical[name])
+            if low != value or high != value:
+                return False
+        for name, axis in self.axes.items():
+            low, high = _value_range(numerical[name])
+            if low < axis[0] or high > axis[-1]:
+                return False
+        return True
+
+    def interpolate(self, row: int, numerical: Dict[str, np.ndarray]) -> np.ndarray:
+        """
+        Multilinear interpolation of combination `row`. `numerical` holds a
+        scalar or an array per surface feature; the result has their
+        broadcast shape. Points must be covered by the grid.
+        """
+        if not any(isinstance(numerical[name], np.ndarray) for name in self.axes):
+            return np.float64(self._interpolate_point(row, [numerical[name] for name in self.axes]))
+
+        points = np.broadcast_arrays(*(np.asarray(numerical[name], dtype=np.float64) for name in self.axes))
+        lower, fraction = [], []
+        for x, axis in zip(points, self.axes.values()):
+            i = np.clip(np.searchsorted(axis, x, side='right') - 1, 0, len(axis) - 2)
+            lower.append(i)
+            fraction.append((x - axis[i]) / (axis[i + 1] - axis[i]))
+        lower, fraction = np.stack(lower), np.stack(fraction)
+
+        # Weighted sum over the 2^d corners of the cell around each point, gathered in one indexing call
+        offsets = _CORNERS.reshape(_CORNERS.shape + (1,) * (lower.ndim - 1))
+        indices = lower[None] + offsets
+        weights = np.where(offsets == 1, fraction[None], 1.0 - fraction[None]).prod(axis=1)
+        corner_values = self.values[row][tuple(indices[:, k] for k in range(len(self.axes)))]
+        return (weights * corner_values).sum(axis=0)
+
+    def _interpolate_point(self, row: int, point: List[float]) -> float:
+        """interpolate() for one point in plain Python, avoiding numpy's per-call overhead on scalars."""
+        grid = self.values[row]
+        lower, fraction = [], []
+        for x, axis in zip(point, self._axis_lists):
+            i = min(max(bisect_right(axis, x) - 1, 0), len(axis) - 2)
+            lower.append(i)
+            fraction.append((x - axis[i]) / (axis[i + 1] - axis[i]))
+
+        result = 0.0
+        for corner in _CORNERS.tolist():
+            weight = 1.0
+            for upper, f in zip(corner, fraction):
+                weight *= f if upper else 1.0 - f
+            if weight:
+                result += weight * float(grid[tuple(i + upper for i, upper in zip(lower, corner))])
+        return result
+
+
+def _value_range(values) -> tuple:
+    """(min, max) of an array, or (x, x) for a scalar."""
+    if isinstance(values, np.ndarray):
+        return values.min(), values.max()
+    return values, values
+
+
+def popular_combinations(data_path: Optional[str], top: int) -> List[tuple]:
+    """The `top` most frequent combinations in the training data, cleaned as train_model_v2.py does."""
+    import train_model_v2
+
+    df = train_model_v2.clean_records(train_model_v2.load_data(data_path), verbose=False)
+    counts = df.groupby(list(COMBINATION_FEATURES), observed=True).size()
+    return [tuple(str(value) for value in key) for key in counts.nlargest(top).index]
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute the yield surface index for /predict/surface")
+    parser.add_argument("output", help="Output directory (serve it as model/yield_surface)")
+    parser.add_argument("--data", default=None, help="Training data for the combination counts (default: the training dataset)")
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP, help="Number of most frequent combinations")
+    for name in SURFACE_FEATURES:
+        parser.add_argument(f"--{name}", type=float, nargs=3, metavar=("START", "STOP", "POINTS"),
+                            default=DEFAULT_AXES[name], help=f"{name} grid (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    import main
+    b = main.load_bundle()
+    if b.model is None or b.encoders is None:
+        print(f"No model to score in {main.MODEL_DIR}")
+        return 1
+
+    axes = {}
+    for name in SURFACE_FEATURES:
+        start, stop, points = getattr(args, name)
+        if int(points) < 2:
+            print(f"--{name} needs at least 2 points")
+            return 1
+        axes[name] = np.linspace(start, stop, int(points))
+    fixed = {
+        col: main.PredictionRequest.model_fields[col].default
+        for col in main.NUMERICAL_FEATURES if col not in SURFACE_FEATURES
+    }
+
+    combinations = popular_combinations(args.data, args.top)
+    start = time.perf_counter()
+    surface = YieldSurface.build(lambda c, n: main.score_columns(c, n, b), combinations, axes, fixed)
+    surface.save(args.output)
+    cells = len(combinations) * int(np.prod(surface.shape))
+    print(f"✓ Scored {len(combinations)} combinations x {'x'.join(map(str, surface.shape))} grid "
+          f"({cells:,} points) in {time.perf_counter() - start:.1f}s")
+    print(f"✓ Yield surface saved to {args.output} ({surface.nbytes / 1024 ** 2:.1f} MB)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())